@@ -1,6 +1,16 @@
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask
 from backend.api.routes import api
 from backend.config import Config
+from backend.utils.dataset_store import DatasetStore
+from backend.utils.job_queue import JobQueue
+from backend.utils.model_registry import ModelRegistry
+from backend.utils.batch_predictor import MicroBatchPredictor
+from backend.utils.response_cache import ResponseCache
+from backend.utils.static_render import RenderPool
+from backend.utils.startup import StartupTimer, preload_modules, warm_up
 import os
 import logging
 
@@ -8,15 +18,82 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Time spent importing Flask, pandas and the light backend modules
+_import_seconds = time.perf_counter() - _import_started
+
 def create_app(config_class=Config):
     """
     Create and configure the Flask application
     """
+    timer = StartupTimer()
+    timer.record('imports', _import_seconds)
+    
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    extensions_started = time.perf_counter()
+    
+    # Shared store for uploaded datasets, reused across endpoints by dataset_id
+    app.extensions['dataset_store'] = DatasetStore(
+        max_bytes=app.config['DATASET_STORE_MAX_BYTES'],
+        spill_path=app.config['DATASET_SPILL_PATH']
+    )
+    
+    # Versioned models, kept in memory once loaded for prediction
+    app.extensions['model_registry'] = ModelRegistry(
+        root_path=app.config['MODEL_SAVE_PATH'],
+        max_bytes=app.config['MODEL_CACHE_MAX_BYTES']
+    )
+    
+    # Coalesce concurrent predictions into vectorized batches (optional)
+    app.extensions['prediction_batcher'] = MicroBatchPredictor(
+        max_batch_rows=app.config['PREDICT_MAX_BATCH_ROWS'],
+        max_wait_ms=app.config['PREDICT_MAX_WAIT_MS']
+    ) if app.config['PREDICT_BATCHING'] else None
+    
+    # Cache of repeated process/visualize/compare responses (optional)
+    app.extensions['response_cache'] = ResponseCache(
+        max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+        disk_path=app.config['RESPONSE_CACHE_PATH'],
+        disk_max_bytes=app.config['RESPONSE_CACHE_DISK_MAX_BYTES'],
+        ttl=app.config['RESPONSE_CACHE_TTL']
+    ) if app.config['RESPONSE_CACHE_ENABLED'] else None
+    
+    # Static chart rendering, cached by content hash of data and options
+    app.extensions['render_pool'] = RenderPool(
+        cache=ResponseCache(
+            max_bytes=app.config['RENDER_CACHE_MAX_BYTES'],
+            disk_path=app.config['RENDER_CACHE_PATH'],
+            ttl=app.config['RENDER_CACHE_TTL']
+        ),
+        max_workers=app.config['RENDER_WORKERS']
+    )
+    
+    # Background jobs for training and model comparison
+    app.extensions['job_queue'] = JobQueue(
+        state_path=app.config['JOB_STATE_PATH'],
+        max_workers=app.config['JOB_WORKERS'],
+        max_pending=app.config['JOB_QUEUE_SIZE'],
+        result_ttl=app.config['JOB_RESULT_TTL']
+    )
+    
+    timer.record('extensions', time.perf_counter() - extensions_started)
+    
     # Register blueprints
-    app.register_blueprint(api, url_prefix=app.config['API_PREFIX'])
+    with timer.phase('blueprints'):
+        app.register_blueprint(api, url_prefix=app.config['API_PREFIX'])
+    
+    # Load the heavy modules the endpoints import lazily, and build each figure
+    # type once. With gunicorn --preload this runs before the workers fork, so
+    # they start warm and share these pages.
+    if app.config['PRELOAD_ON_STARTUP']:
+        with timer.phase('preload'):
+            app.extensions['preloaded_modules'] = preload_modules()
+        with timer.phase('warm_up'):
+            warm_up()
+    
+    app.extensions['startup_report'] = timer.report()
+    logger.info(f"App ready in {app.extensions['startup_report']['total_ms']} ms: {timer.phases}")
     
     # Add CORS headers for development
     @app.after_request
@@ -24,6 +101,7 @@ def create_app(config_class=Config):
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        response.headers.add('Access-Control-Expose-Headers', 'X-Cache')
         return response
     
     # Root endpoint
@@ -44,9 +122,16 @@ def create_app(config_class=Config):
                 'health_check': '/api/v1/health',
                 'data_processing': '/api/v1/process-data',
                 'visualization': '/api/v1/visualize',
+                'static_render': '/api/v1/render',
+                'static_render_batch': '/api/v1/render/batch',
                 'ml_training': '/api/v1/train-model',
                 'ml_comparison': '/api/v1/compare-models',
+                'ml_tuning': '/api/v1/tune-model',
+                'ml_incremental_training': '/api/v1/train-incremental',
                 'ml_prediction': '/api/v1/predict',
+                'models': '/api/v1/models',
+                'datasets': '/api/v1/datasets',
+                'jobs': '/api/v1/jobs/<job_id>',
                 'firestore_upload': '/api/v1/upload-to-firestore'
             }
         }
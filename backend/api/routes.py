@@ -1,19 +1,116 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 import pandas as pd
 import json
 import logging
-from backend.utils.data_processing import clean_data, normalize_data, encode_categorical_data, generate_summary_stats
-from backend.utils.visualization import create_bar_chart, create_scatter_plot, create_line_chart, create_histogram, create_heatmap, create_box_plot
-from backend.utils.ml_utils import MLModel, evaluate_model, compare_models
-from backend.utils.firebase_utils import FirestoreManager
+from backend.utils.downsampling import downsample_line, downsample_scatter, LINE_METHODS, SCATTER_METHODS
+from backend.utils.job_queue import JobQueueFull
+from backend.utils.model_registry import ModelNotFound
+from backend.utils.response_cache import request_cache_key
+from backend.utils.dataset_store import dataset_fingerprint
+from backend.utils.static_render import render_options, chart_columns
+from backend.utils.startup import rss_mb
+from backend.utils.data_io import (read_request_data, RequestDataError, response_stream_format, iter_ndjson,
+                                   iter_arrow_stream, to_json_safe, open_chunk_source, NDJSON_TYPE, ARROW_STREAM_TYPE)
+import os
+import base64
+from functools import wraps
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# sklearn, plotly/scipy and firebase_admin are imported inside the endpoints that
+# use them, so workers start quickly (create_app can preload them instead)
+
 # Create blueprint
 api = Blueprint('api', __name__)
 
+def load_request_dataframe(copy=False):
+    """
+    Read the request table, either inline (any supported format) or by
+    reference to a stored dataset with a `dataset_id` parameter.
+    Pass copy=True when the caller modifies the DataFrame in place.
+    """
+    df, data = read_request_data(request)
+    if df is None and data.get('dataset_id'):
+        try:
+            df = current_app.extensions['dataset_store'].get(data['dataset_id'])
+        except KeyError:
+            raise RequestDataError(f"Unknown dataset_id {data['dataset_id']}")
+        if copy:
+            df = df.copy()
+    return df, data
+
+def request_dataset_id(request):
+    """
+    dataset_id parameter of a request (JSON body, query string or form), if any
+    """
+    payload = request.get_json(silent=True) if request.mimetype == 'application/json' else None
+    if isinstance(payload, dict) and payload.get('dataset_id'):
+        return payload['dataset_id']
+    return request.args.get('dataset_id') or request.form.get('dataset_id')
+
+def cached_response(view):
+    """
+    Serve repeated identical requests from the response cache. Only complete
+    200 responses are cached (not streams or accepted jobs); the X-Cache
+    header reports HIT (with the tier), MISS or BYPASS. Send
+    'Cache-Control: no-cache' to force recomputation. Requests naming a
+    dataset_id that has since been deleted are never answered from the cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if cache is None or 'no-cache' in request.headers.get('Cache-Control', ''):
+            response = current_app.make_response(view(*args, **kwargs))
+            response.headers['X-Cache'] = 'BYPASS'
+            return response
+        
+        key = request_cache_key(request)
+        # The key covers the dataset_id, not the dataset, so check it still exists
+        dataset_id = request_dataset_id(request)
+        if dataset_id and not current_app.extensions['dataset_store'].exists(dataset_id):
+            entry, tier = None, None
+        else:
+            entry, tier = cache.get(key)
+        if entry is not None:
+            response = Response(entry['body'], mimetype=entry['mimetype'], headers=entry['headers'])
+            response.headers['X-Cache'] = f'HIT-{tier.upper()}'
+            return response
+        
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            cache.put(key, response.get_data(), response.mimetype)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+def job_n_jobs():
+    """
+    joblib processes for one job: the cores divided between the job pool's
+    processes, so concurrent jobs do not oversubscribe the machine
+    """
+    return max(1, (os.cpu_count() or 1) // current_app.config['JOB_WORKERS'])
+
+def submit_job(kind, fn, **kwargs):
+    """
+    Queue a background job and return the 202 response pointing at its status URL
+    """
+    try:
+        job_id = current_app.extensions['job_queue'].submit(kind, fn, **kwargs)
+    except JobQueueFull as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 429
+    
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job_id,
+        'status_url': f'/api/v1/jobs/{job_id}',
+        'result_url': f'/api/v1/jobs/{job_id}/result'
+    }), 202
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """
@@ -24,25 +121,38 @@ def health_check():
         'service': 'Data Processing API'
     })
 
+@api.route('/health/startup', methods=['GET'])
+def startup_report():
+    """
+    Startup timing of the app and memory of the worker serving this request
+    """
+    return jsonify({
+        'status': 'success',
+        'startup': current_app.extensions['startup_report'],
+        'preloaded_modules': current_app.extensions.get('preloaded_modules', {}),
+        'worker_pid': os.getpid(),
+        'worker_rss_mb': round(rss_mb(), 1)
+    })
+
 @api.route('/process-data', methods=['POST'])
+@cached_response
 def process_data():
     """
     Process and clean data
     """
+    from backend.utils.data_processing import clean_data, normalize_data, encode_categorical_data, generate_summary_stats
+    
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe(copy=True)
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
-        
         # Apply data processing functions
         if data.get('clean', False):
             df = clean_data(df)
@@ -53,6 +163,18 @@ def process_data():
         if data.get('encode_categorical', False):
             df = encode_categorical_data(df)
         
+        # Stream rows as they are serialized instead of building the whole response
+        stream_format = response_stream_format(request, data)
+        chunk_size = int(data.get('chunk_size', 10000))
+        if stream_format == 'ndjson':
+            # Statistics follow the rows as a trailing record
+            trailer = lambda: {'_type': 'statistics', 'statistics': generate_summary_stats(df)}
+            return Response(stream_with_context(iter_ndjson(df, chunk_size, trailer)), mimetype=NDJSON_TYPE)
+        if stream_format == 'arrow':
+            # Statistics follow the rows as the metadata of a final empty batch
+            trailer = lambda: {'statistics': generate_summary_stats(df)}
+            return Response(stream_with_context(iter_arrow_stream(df, chunk_size, trailer)), mimetype=ARROW_STREAM_TYPE)
+        
         # Generate summary statistics
         stats = generate_summary_stats(df)
         
@@ -61,9 +183,14 @@ def process_data():
         
         return jsonify({
             'status': 'success',
-            'data': processed_data,
-            'statistics': stats
+            'data': to_json_safe(processed_data),
+            'statistics': to_json_safe(stats)
         })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in process_data: {str(e)}")
         return jsonify({
@@ -72,24 +199,25 @@ def process_data():
         }), 500
 
 @api.route('/visualize', methods=['POST'])
+@cached_response
 def visualize_data():
     """
     Create visualizations
     """
+    from backend.utils.visualization import (create_bar_chart, create_scatter_plot, create_line_chart, create_histogram,
+                                            create_heatmap, create_box_plot, FIGURE_ENCODINGS)
+    
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe()
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
-        
         # Get visualization parameters
         chart_type = data.get('chart_type', 'bar')
         x_column = data.get('x_column')
@@ -102,36 +230,82 @@ def visualize_data():
                 'message': 'x_column and y_column are required for this chart type'
             }), 400
         
+        # Figure encoding: escaped JSON string (default), nested object, or nested object with typed arrays
+        encoding = data.get('encoding', 'string')
+        if encoding not in FIGURE_ENCODINGS:
+            return jsonify({
+                'status': 'error',
+                'message': f'encoding must be one of {list(FIGURE_ENCODINGS)}'
+            }), 400
+        
+        # Downsample large scatter and line charts to the point budget before building the figure
+        max_points = int(data.get('max_points', current_app.config['VIS_MAX_POINTS']) or 0)
+        reduction = None
+        if chart_type == 'line':
+            method = data.get('downsample_method', 'lttb')
+            if method not in LINE_METHODS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'downsample_method must be one of {list(LINE_METHODS)} for line charts'
+                }), 400
+            try:
+                df, reduction = downsample_line(df, x_column, y_column, max_points, method)
+            except ValueError as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e)
+                }), 400
+        elif chart_type == 'scatter':
+            method = data.get('downsample_method', 'sample')
+            if method not in SCATTER_METHODS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'downsample_method must be one of {list(SCATTER_METHODS)} for scatter plots'
+                }), 400
+            df, reduction = downsample_scatter(df, x_column, y_column, max_points, method, data.get('color_column'))
+        
         # Create visualization based on chart type
         if chart_type == 'bar':
-            chart_json = create_bar_chart(df, x_column, y_column, data.get('title', 'Bar Chart'))
+            chart_json = create_bar_chart(df, x_column, y_column, data.get('title', 'Bar Chart'), encoding)
         elif chart_type == 'scatter':
-            chart_json = create_scatter_plot(df, x_column, y_column, data.get('color_column'), data.get('title', 'Scatter Plot'))
+            chart_json = create_scatter_plot(df, x_column, y_column, data.get('color_column'), data.get('title', 'Scatter Plot'),
+                                             encoding)
         elif chart_type == 'line':
-            chart_json = create_line_chart(df, x_column, y_column, data.get('title', 'Line Chart'))
+            chart_json = create_line_chart(df, x_column, y_column, data.get('title', 'Line Chart'), encoding)
         elif chart_type == 'histogram':
             if not x_column:
                 return jsonify({
                     'status': 'error',
                     'message': 'x_column is required for histogram'
                 }), 400
-            chart_json = create_histogram(df, x_column, data.get('title', 'Histogram'))
+            chart_json = create_histogram(df, x_column, data.get('title', 'Histogram'), data.get('bins', 'auto'), encoding)
         elif chart_type == 'heatmap':
-            chart_json = create_heatmap(df, data.get('title', 'Correlation Heatmap'))
+            chart_json = create_heatmap(df, data.get('title', 'Correlation Heatmap'),
+                                        int(data.get('top_k', current_app.config['HEATMAP_MAX_COLUMNS']) or 0),
+                                        data.get('cluster', True), encoding)
         elif chart_type == 'box':
             if not x_column:
                 return jsonify({
                     'status': 'error',
                     'message': 'x_column is required for box plot'
                 }), 400
-            chart_json = create_box_plot(df, x_column, data.get('title', 'Box Plot'))
+            chart_json = create_box_plot(df, x_column, data.get('title', 'Box Plot'), int(data.get('max_outliers', 1000)),
+                                         encoding)
         else:
-            chart_json = create_bar_chart(df, x_column, y_column, data.get('title', 'Bar Chart'))
+            chart_json = create_bar_chart(df, x_column, y_column, data.get('title', 'Bar Chart'), encoding)
         
-        return jsonify({
+        response = {
             'status': 'success',
             'visualization': chart_json
-        })
+        }
+        if reduction is not None:
+            response['reduction'] = reduction
+        return jsonify(response)
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in visualize_data: {str(e)}")
         return jsonify({
@@ -139,17 +313,162 @@ def visualize_data():
             'message': str(e)
         }), 500
 
+@api.route('/render', methods=['POST'])
+def render_chart_image():
+    """
+    Render a chart as a static PNG or SVG image
+    """
+    try:
+        # Get data from request
+        df, data = load_request_dataframe()
+        
+        # Validate input
+        if df is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing data in request'
+            }), 400
+        
+        # Same chart parameters as /visualize, plus format, size and thumbnail options
+        try:
+            options = render_options({'top_k': current_app.config['HEATMAP_MAX_COLUMNS'], **data})
+            chart_columns(df, options)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        try:
+            result = current_app.extensions['render_pool'].render(df, options)
+        except ValueError as e:
+            # The data does not fit the chart (e.g. a non-numeric column to downsample)
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        response = Response(result['image'], mimetype=result['mimetype'])
+        response.headers['X-Cache'] = result['cache']
+        return response
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in render_chart_image: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/render/batch', methods=['POST'])
+def render_chart_batch():
+    """
+    Render many charts (e.g. for a report) concurrently in the render pool
+    """
+    try:
+        # Get data from request
+        df, data = load_request_dataframe()
+        charts = data.get('charts')
+        
+        # Validate input
+        if not isinstance(charts, list) or not charts:
+            return jsonify({
+                'status': 'error',
+                'message': 'charts must be a non-empty list of chart specs'
+            }), 400
+        
+        max_charts = current_app.config['RENDER_MAX_BATCH']
+        if len(charts) > max_charts:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {max_charts} charts can be rendered per request'
+            }), 400
+        
+        # Each spec may carry its own data or dataset_id; otherwise the request's table is used.
+        # Top-level render options (format, width, ...) are defaults for every chart.
+        defaults = {key: value for key, value in data.items() if key not in ('charts', 'data', 'dataset_id')}
+        defaults.setdefault('top_k', current_app.config['HEATMAP_MAX_COLUMNS'])
+        # Each table is hashed once for the cache keys of all its charts; a dataset_id already is its hash
+        request_fingerprint = None
+        jobs = []
+        for index, spec in enumerate(charts):
+            if not isinstance(spec, dict):
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Chart {index} must be an object'
+                }), 400
+            if spec.get('data') is not None:
+                chart_df = pd.DataFrame(spec['data'])
+                fingerprint = dataset_fingerprint(chart_df)
+            elif spec.get('dataset_id'):
+                try:
+                    chart_df = current_app.extensions['dataset_store'].get(spec['dataset_id'])
+                except KeyError:
+                    raise RequestDataError(f"Unknown dataset_id {spec['dataset_id']}")
+                fingerprint = spec['dataset_id']
+            elif df is not None:
+                if request_fingerprint is None:
+                    request_fingerprint = dataset_fingerprint(df)
+                chart_df, fingerprint = df, request_fingerprint
+            else:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Missing data for chart {index}'
+                }), 400
+            try:
+                options = render_options({**defaults, **spec})
+                chart_columns(chart_df, options)
+            except ValueError as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Chart {index}: {str(e)}'
+                }), 400
+            jobs.append((chart_df, options, fingerprint))
+        
+        images = []
+        for index, result in enumerate(current_app.extensions['render_pool'].render_many(jobs)):
+            if 'error' in result:
+                images.append({'index': index, 'status': 'error', 'message': str(result['error'])})
+            else:
+                images.append({
+                    'index': index,
+                    'status': 'success',
+                    'mimetype': result['mimetype'],
+                    'cache': result['cache'],
+                    'image': base64.b64encode(result['image']).decode('ascii')
+                })
+        
+        return jsonify({
+            'status': 'success',
+            'images': images
+        })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in render_chart_batch: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @api.route('/train-model', methods=['POST'])
 def train_model():
     """
     Train a machine learning model
     """
+    from backend.utils.ml_utils import MLModel, train_model_task
+    
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe()
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
@@ -161,9 +480,6 @@ def train_model():
                 'message': 'target_column is required'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
-        
         # Separate features and target
         target_column = data['target_column']
         if target_column not in df.columns:
@@ -179,6 +495,13 @@ def train_model():
         model_type = data.get('model_type', 'regression')
         algorithm = data.get('algorithm', 'random_forest')
         
+        # Long-running training can run in the background job pool
+        if data.get('async', False):
+            model_path = data.get('model_path', 'model.pkl') if data.get('save_model', False) else None
+            return submit_job('train_model', train_model_task, X=X, y=y, model_type=model_type,
+                              algorithm=algorithm, model_path=model_path, model_name=data.get('model_name'),
+                              registry_path=current_app.config['MODEL_SAVE_PATH'])
+        
         # Create and train model
         model = MLModel(model_type, algorithm)
         score = model.train(X, y)
@@ -188,12 +511,25 @@ def train_model():
             model_path = data.get('model_path', 'model.pkl')
             model.save_model(model_path)
         
-        return jsonify({
+        response = {
             'status': 'success',
             'score': score,
             'model_type': model_type,
             'algorithm': algorithm
-        })
+        }
+        
+        # Register as a new version of a named model (optional)
+        if data.get('model_name'):
+            response['model_name'] = data['model_name']
+            response['model_version'] = current_app.extensions['model_registry'].register(
+                model, data['model_name'], {'score': score})
+        
+        return jsonify(response)
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in train_model: {str(e)}")
         return jsonify({
@@ -202,16 +538,19 @@ def train_model():
         }), 500
 
 @api.route('/compare-models', methods=['POST'])
+@cached_response
 def compare_models_endpoint():
     """
     Compare different machine learning models
     """
+    from backend.utils.ml_utils import compare_models, compare_models_task, CANDIDATE_MODELS
+    
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe()
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
@@ -223,9 +562,6 @@ def compare_models_endpoint():
                 'message': 'target_column is required'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
-        
         # Separate features and target
         target_column = data['target_column']
         if target_column not in df.columns:
@@ -239,14 +575,39 @@ def compare_models_endpoint():
         
         # Get model parameters
         model_type = data.get('model_type', 'regression')
+        candidates = data.get('candidates')
+        cv = int(data.get('cv', 5))
+        n_jobs = current_app.config['ML_N_JOBS']
+        
+        if model_type not in CANDIDATE_MODELS:
+            return jsonify({
+                'status': 'error',
+                'message': "model_type must be 'regression' or 'classification'"
+            }), 400
+        
+        unknown = [key for key in (candidates or []) if key not in CANDIDATE_MODELS[model_type]]
+        if unknown:
+            return jsonify({
+                'status': 'error',
+                'message': f'Unknown candidates {unknown}; available: {list(CANDIDATE_MODELS[model_type])}'
+            }), 400
+        
+        if data.get('async', False):
+            return submit_job('compare_models', compare_models_task, X=X, y=y, model_type=model_type,
+                              candidates=candidates, cv=cv, n_jobs=job_n_jobs())
         
         # Compare models
-        comparison_result = compare_models(X, y, model_type)
+        comparison_result = compare_models(X, y, model_type, candidates=candidates, cv=cv, n_jobs=n_jobs)
         
         return jsonify({
             'status': 'success',
             'comparison': comparison_result
         })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in compare_models_endpoint: {str(e)}")
         return jsonify({
@@ -254,6 +615,171 @@ def compare_models_endpoint():
             'message': str(e)
         }), 500
 
+@api.route('/train-incremental', methods=['POST'])
+def train_incremental():
+    """
+    Train a model out of core from a stored dataset, a server-side CSV file or
+    a Firestore collection, one chunk at a time
+    """
+    from backend.utils.ml_utils import MLModel, train_incremental_task, INCREMENTAL_MODELS
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if 'target_column' not in data:
+            return jsonify({
+                'status': 'error',
+                'message': 'target_column is required'
+            }), 400
+        
+        model_type = data.get('model_type', 'regression')
+        algorithm = data.get('algorithm', 'sgd')
+        if model_type not in INCREMENTAL_MODELS or algorithm not in INCREMENTAL_MODELS[model_type]:
+            return jsonify({
+                'status': 'error',
+                'message': f'Incremental training supports {model_type} algorithms {list(INCREMENTAL_MODELS.get(model_type, {}))}'
+            }), 400
+        
+        # Build the source description; CSV paths must stay inside DATA_IMPORT_PATH
+        source = {key: data[key] for key in ('dataset_id', 'collection_name') if data.get(key)}
+        if data.get('csv_path'):
+            import_root = os.path.realpath(current_app.config['DATA_IMPORT_PATH'])
+            csv_path = os.path.realpath(os.path.join(import_root, data['csv_path']))
+            if os.path.commonpath([import_root, csv_path]) != import_root:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'csv_path must be inside the data import directory'
+                }), 400
+            source['csv_path'] = csv_path
+        if source.get('collection_name'):
+            # Parallel key-range reads of the collection
+            source['partition_count'] = int(data.get('partition_count', current_app.config['FIRESTORE_READ_PARTITIONS']))
+        
+        chunk_size = int(data.get('chunk_size', 10000))
+        epochs = int(data.get('epochs', 1))
+        credentials_path = data.get('credentials_path')
+        model_name = data.get('model_name')
+        
+        if data.get('async', False):
+            # Validate the source now so bad requests fail before they are queued
+            open_chunk_source(source, chunk_size, current_app.extensions['dataset_store'], credentials_path)
+            return submit_job('train_incremental', train_incremental_task, source=source,
+                              target_column=data['target_column'], model_type=model_type, algorithm=algorithm,
+                              chunk_size=chunk_size, epochs=epochs,
+                              dataset_spill_path=current_app.config['DATASET_SPILL_PATH'],
+                              credentials_path=credentials_path, model_name=model_name,
+                              registry_path=current_app.config['MODEL_SAVE_PATH'])
+        
+        chunk_source = open_chunk_source(source, chunk_size, current_app.extensions['dataset_store'], credentials_path)
+        model = MLModel(model_type, algorithm)
+        score = model.train_incremental(chunk_source, data['target_column'], epochs=epochs)
+        
+        response = {
+            'status': 'success',
+            'score': score,
+            'model_type': model_type,
+            'algorithm': algorithm
+        }
+        if model_name:
+            response['model_name'] = model_name
+            response['model_version'] = current_app.extensions['model_registry'].register(
+                model, model_name, {'score': score})
+        
+        return jsonify(to_json_safe(response))
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in train_incremental: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/tune-model', methods=['POST'])
+def tune_model():
+    """
+    Tune a model's hyperparameters with successive halving and register the best one
+    """
+    from backend.utils.ml_utils import MLModel, tune_model_task, CANDIDATE_MODELS
+    
+    try:
+        # Get data from request
+        df, data = load_request_dataframe()
+        
+        # Validate input
+        if df is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing data in request'
+            }), 400
+            
+        if 'target_column' not in data:
+            return jsonify({
+                'status': 'error',
+                'message': 'target_column is required'
+            }), 400
+        
+        target_column = data['target_column']
+        if target_column not in df.columns:
+            return jsonify({
+                'status': 'error',
+                'message': f'Target column {target_column} not found in data'
+            }), 400
+        
+        model_type = data.get('model_type', 'regression')
+        algorithm = data.get('algorithm', 'random_forest')
+        if model_type not in CANDIDATE_MODELS or algorithm not in CANDIDATE_MODELS[model_type]:
+            return jsonify({
+                'status': 'error',
+                'message': f'Cannot tune {model_type} algorithm {algorithm}'
+            }), 400
+            
+        X = df.drop(columns=[target_column])
+        y = df[target_column]
+        
+        # Search parameters; the time budget is capped by configuration
+        options = {
+            'model_type': model_type,
+            'algorithm': algorithm,
+            'n_candidates': int(data.get('n_candidates', 20)),
+            'time_budget': min(float(data.get('time_budget', 60)), current_app.config['TUNE_MAX_TIME_BUDGET']),
+            'cv': int(data.get('cv', 3)),
+            'n_jobs': current_app.config['ML_N_JOBS']
+        }
+        model_name = data.get('model_name') or f'{model_type}_{algorithm}_tuned'
+        
+        if data.get('async', False):
+            options['n_jobs'] = job_n_jobs()
+            return submit_job('tune_model', tune_model_task, X=X, y=y, model_name=model_name,
+                              registry_path=current_app.config['MODEL_SAVE_PATH'], **options)
+        
+        # Tune, then register the best pipeline so /predict can use it immediately
+        model = MLModel(model_type, algorithm)
+        search = model.tune(X, y, n_candidates=options['n_candidates'], time_budget=options['time_budget'],
+                            cv=options['cv'], n_jobs=options['n_jobs'])
+        search['model_name'] = model_name
+        search['model_version'] = current_app.extensions['model_registry'].register(
+            model, model_name, {'score': search['score'], 'params': search['best_params']})
+        
+        return jsonify({
+            'status': 'success',
+            'tuning': to_json_safe(search)
+        })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in tune_model: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @api.route('/predict', methods=['POST'])
 def predict():
     """
@@ -261,30 +787,53 @@ def predict():
     """
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe()
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
+        # Load model from the registry cache, by name and version or by path
+        registry = current_app.extensions['model_registry']
+        if data.get('model_name'):
+            model = registry.load(data['model_name'], data.get('model_version'))
+        else:
+            model = registry.load_path(data.get('model_path', 'model.pkl'))
         
-        # Load model
-        model_path = data.get('model_path', 'model.pkl')
-        model = MLModel()
-        model.load_model(model_path)
+        # Columns may come in any order, but every training feature is required
+        missing = model.missing_features(df)
+        if missing:
+            return jsonify({
+                'status': 'error',
+                'message': f'Missing feature columns: {missing}',
+                'missing_features': missing
+            }), 400
         
-        # Make predictions
-        predictions = model.predict(df).tolist()
+        # Make predictions, batched with concurrent requests for the same model when enabled.
+        # Cached models stay alive while in use, so the object id identifies the model.
+        batcher = current_app.extensions['prediction_batcher']
+        if batcher is not None:
+            predictions = batcher.predict(id(model), model, df).tolist()
+        else:
+            predictions = model.predict(df).tolist()
         
         return jsonify({
             'status': 'success',
             'predictions': predictions
         })
+    except ModelNotFound as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown model {e.args[0]}'
+        }), 404
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in predict: {str(e)}")
         return jsonify({
@@ -292,40 +841,251 @@ def predict():
             'message': str(e)
         }), 500
 
+@api.route('/predict/metrics', methods=['GET'])
+def predict_metrics():
+    """
+    Micro-batching metrics for this worker (batch sizes, queue delay)
+    """
+    batcher = current_app.extensions['prediction_batcher']
+    return jsonify({
+        'status': 'success',
+        'batching': batcher is not None,
+        'metrics': batcher.stats() if batcher is not None else None
+    })
+
+@api.route('/cache', methods=['GET'])
+def cache_stats():
+    """
+    Response cache statistics for this worker
+    """
+    cache = current_app.extensions.get('response_cache')
+    return jsonify({
+        'status': 'success',
+        'enabled': cache is not None,
+        'cache': cache.stats() if cache is not None else None
+    })
+
+@api.route('/cache', methods=['DELETE'])
+def clear_cache():
+    """
+    Empty the response cache (this worker's memory tier and the shared disk tier)
+    """
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.clear()
+    return jsonify({
+        'status': 'success',
+        'message': 'Response cache cleared'
+    })
+
+@api.route('/models', methods=['GET'])
+def list_models():
+    """
+    List registered models and their versions
+    """
+    registry = current_app.extensions['model_registry']
+    return jsonify({
+        'status': 'success',
+        'models': registry.list_models(),
+        'cache': registry.stats()
+    })
+
+@api.route('/models/<model_name>', methods=['GET'])
+@api.route('/models/<model_name>/<model_version>', methods=['GET'])
+def get_model_info(model_name, model_version=None):
+    """
+    Describe a registered model version (default: latest)
+    """
+    registry = current_app.extensions['model_registry']
+    try:
+        info = registry.info(model_name, model_version)
+        versions = registry.versions(model_name)
+    except ModelNotFound as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown model {e.args[0]}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'model': info,
+        'versions': versions
+    })
+
 @api.route('/upload-to-firestore', methods=['POST'])
 def upload_to_firestore():
     """
     Upload data to Firestore
     """
+    from backend.utils.firebase_utils import FirestoreManager
+    
     try:
         # Get data from request
-        data = request.get_json()
+        df, data = load_request_dataframe()
         
         # Validate input
-        if not data or 'data' not in data:
+        if df is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Missing data in request'
             }), 400
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
-        
-        # Initialize Firestore manager
+        # Initialize Firestore manager (the client is shared by all requests in this worker)
         credentials_path = data.get('credentials_path')
         firestore_manager = FirestoreManager(credentials_path)
         
-        # Upload to Firestore
+        # Upload to Firestore with several batch commits in flight
         collection_name = data.get('collection_name', 'default_collection')
-        result = firestore_manager.upload_dataframe(df, collection_name)
+        max_in_flight = int(data.get('max_in_flight', current_app.config['FIRESTORE_MAX_IN_FLIGHT']))
+        result = firestore_manager.upload_dataframe(df, collection_name, int(data.get('batch_size', 500)),
+                                                    min(max_in_flight, current_app.config['FIRESTORE_MAX_IN_FLIGHT']))
         
         return jsonify({
             'status': 'success',
-            'message': result
+            'message': result.pop('message'),
+            'upload': to_json_safe(result)
         })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in upload_to_firestore: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@api.route('/datasets', methods=['POST'])
+def upload_dataset():
+    """
+    Upload a dataset once and get a dataset_id to use in place of inline data
+    """
+    try:
+        # Get data from request
+        df, data = read_request_data(request)
+        
+        # Validate input
+        if df is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing data in request'
+            }), 400
+        
+        dataset_id = current_app.extensions['dataset_store'].put(df)
+        
+        return jsonify({
+            'status': 'success',
+            'dataset_id': dataset_id,
+            'rows': len(df),
+            'columns': list(df.columns)
+        })
+    except RequestDataError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in upload_dataset: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/datasets/<dataset_id>', methods=['GET'])
+def get_dataset_info(dataset_id):
+    """
+    Describe a stored dataset
+    """
+    try:
+        info = current_app.extensions['dataset_store'].info(dataset_id)
+    except KeyError:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown dataset_id {dataset_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'dataset': info
+    })
+
+@api.route('/datasets/<dataset_id>', methods=['DELETE'])
+def delete_dataset(dataset_id):
+    """
+    Remove a stored dataset
+    """
+    if not current_app.extensions['dataset_store'].delete(dataset_id):
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown dataset_id {dataset_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'message': f'Deleted dataset {dataset_id}'
+    })
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Report the state and progress of a background job
+    """
+    job = current_app.extensions['job_queue'].status(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job_id {job_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
+@api.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Return the result of a completed background job
+    """
+    job_queue = current_app.extensions['job_queue']
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job_id {job_id}'
+        }), 404
+    
+    if job['state'] != 'completed':
+        return jsonify({
+            'status': 'error',
+            'message': f"Job {job_id} is {job['state']}",
+            'job': job
+        }), 409
+    
+    result = job_queue.result(job_id)
+    if result is None:
+        # Pruned (or removed) after the status check
+        return jsonify({
+            'status': 'error',
+            'message': f'Result of job {job_id} is no longer available'
+        }), 410
+    return jsonify(dict(result, status='success', job_id=job_id))
+
+@api.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running background job
+    """
+    job = current_app.extensions['job_queue'].cancel(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job_id {job_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
@@ -2,22 +2,29 @@ from flask import Flask, request, jsonify
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 import firebase_admin
 from firebase_admin import credentials, firestore
 import os
+import sys
 import io
 import base64
 import json
 
+# Make the backend package importable when run as `python backend/app.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import Config
+from backend.utils.model_registry import ModelRegistry, ModelNotFound
+
 # Initialize Flask app
 app = Flask(__name__)
 
+# Registered models are loaded once and kept in memory between requests
+model_registry = ModelRegistry(Config.MODEL_SAVE_PATH, Config.MODEL_CACHE_MAX_BYTES)
+
 # Initialize Firebase Admin SDK with error handling
 db = None
 if not firebase_admin._apps:
@@ -50,25 +57,38 @@ def predict():
         # Get data from request
         data = request.get_json()
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
+        # Predict with a registered model: {"model_name": ..., "model_version": ..., "data": [...]}.
+        # A plain list of records, or a request without model_name, uses the only
+        # registered model; models are trained through /api/v1/train-model.
+        if not isinstance(data, dict):
+            data = {'data': data}
+        model_name = data.get('model_name')
+        if not model_name:
+            models = model_registry.list_models()
+            if len(models) != 1:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'No model registered' if not models else 'Several models registered; send model_name',
+                    'models': sorted(models)
+                }), 400
+            model_name = next(iter(models))
         
-        # Perform prediction (sample implementation)
-        # In a real scenario, you would load a pre-trained model
-        X = df.drop('target', axis=1, errors='ignore')
-        y = df.get('target', pd.Series([0]*len(df)))
-        
-        # Train a simple model
-        model = RandomForestRegressor(n_estimators=100)
-        model.fit(X, y)
+        # Convert to DataFrame
+        df = pd.DataFrame(data.get('data') or [])
         
-        # Make predictions
-        predictions = model.predict(X).tolist()
+        model = model_registry.load(model_name, data.get('model_version'))
+        predictions = model.predict(df).tolist()
         
         return jsonify({
             'status': 'success',
+            'model_name': model_name,
             'predictions': predictions
         })
+    except ModelNotFound as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown model {e.args[0]}'
+        }), 404
     except Exception as e:
         return jsonify({
             'status': 'error',
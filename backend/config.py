@@ -11,6 +11,8 @@ class Config:
     
     # Firebase configuration
     FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH') or 'path/to/serviceAccountKey.json'
+    FIRESTORE_MAX_IN_FLIGHT = int(os.environ.get('FIRESTORE_MAX_IN_FLIGHT') or 8)  # concurrent batch commits per upload
+    FIRESTORE_READ_PARTITIONS = int(os.environ.get('FIRESTORE_READ_PARTITIONS') or 4)  # parallel key ranges per collection read
     
     # Database configuration (if needed)
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
@@ -22,8 +24,50 @@ class Config:
     # File upload configuration
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
     
+    # Dataset store configuration
+    DATASET_STORE_MAX_BYTES = int(os.environ.get('DATASET_STORE_MAX_BYTES') or 512 * 1024 * 1024)  # 512MB in memory
+    DATASET_SPILL_PATH = os.environ.get('DATASET_SPILL_PATH') or 'datasets/'
+    
+    # Response cache for process-data, visualize and compare-models
+    RESPONSE_CACHE_ENABLED = (os.environ.get('RESPONSE_CACHE_ENABLED') or 'true').lower() == 'true'
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES') or 128 * 1024 * 1024)  # per worker
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH')  # optional disk tier shared by workers, e.g. 'cache/'
+    RESPONSE_CACHE_DISK_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_DISK_MAX_BYTES') or 1024 * 1024 * 1024)
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 3600)  # seconds
+    
+    # Point budget for scatter and line charts (0 disables downsampling)
+    VIS_MAX_POINTS = int(os.environ.get('VIS_MAX_POINTS') or 5000)
+    HEATMAP_MAX_COLUMNS = int(os.environ.get('HEATMAP_MAX_COLUMNS') or 60)  # top-k columns in correlation heatmaps
+    
+    # Static PNG/SVG rendering for reports
+    RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS') or 2)  # processes in the render pool
+    RENDER_MAX_BATCH = int(os.environ.get('RENDER_MAX_BATCH') or 100)  # charts per /render/batch request
+    RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES') or 64 * 1024 * 1024)  # per worker
+    RENDER_CACHE_PATH = os.environ.get('RENDER_CACHE_PATH') or 'renders/'  # rendered images shared by workers
+    RENDER_CACHE_TTL = int(os.environ.get('RENDER_CACHE_TTL') or 7 * 24 * 3600)  # seconds
+    
+    # Server-side CSV files readable by incremental training
+    DATA_IMPORT_PATH = os.environ.get('DATA_IMPORT_PATH') or 'data/'
+    
     # Model configuration
     MODEL_SAVE_PATH = os.environ.get('MODEL_SAVE_PATH') or 'models/'
+    ML_N_JOBS = int(os.environ.get('ML_N_JOBS') or -1)  # processes for model comparison and tuning (-1: all cores)
+    TUNE_MAX_TIME_BUDGET = float(os.environ.get('TUNE_MAX_TIME_BUDGET') or 300)  # seconds per tuning request
+    MODEL_CACHE_MAX_BYTES = int(os.environ.get('MODEL_CACHE_MAX_BYTES') or 256 * 1024 * 1024)  # loaded models per worker
+    
+    # Micro-batching of concurrent /predict requests (needs a threaded server, e.g. gunicorn --threads)
+    PREDICT_BATCHING = (os.environ.get('PREDICT_BATCHING') or 'false').lower() == 'true'
+    PREDICT_MAX_BATCH_ROWS = int(os.environ.get('PREDICT_MAX_BATCH_ROWS') or 256)
+    PREDICT_MAX_WAIT_MS = float(os.environ.get('PREDICT_MAX_WAIT_MS') or 5)
+    
+    # Background job configuration
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)  # processes in the job pool
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE') or 8)  # queued + running jobs per API worker
+    JOB_STATE_PATH = os.environ.get('JOB_STATE_PATH') or 'jobs/'
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL') or 3600)  # seconds to keep finished jobs
+    
+    # Import heavy modules and warm up plotly in create_app (use with gunicorn --preload)
+    PRELOAD_ON_STARTUP = (os.environ.get('PRELOAD_ON_STARTUP') or 'false').lower() == 'true'
     
     # Logging configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
\ No newline at end of file
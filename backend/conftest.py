@@ -0,0 +1,34 @@
+"""
+Shared pytest fixtures for the backend tests
+"""
+
+import pytest
+from backend import create_app
+from backend.config import Config
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Build apps whose models, datasets, jobs and render cache live in a
+    temporary directory, with the response cache off. Keyword arguments
+    override further config values.
+    """
+    def factory(**overrides):
+        settings = {
+            'MODEL_SAVE_PATH': str(tmp_path / 'models'),
+            'DATASET_SPILL_PATH': str(tmp_path / 'datasets'),
+            'JOB_STATE_PATH': str(tmp_path / 'jobs'),
+            'RENDER_CACHE_PATH': str(tmp_path / 'renders'),
+            'RESPONSE_CACHE_ENABLED': False
+        }
+        settings.update(overrides)
+        return create_app(type('TestConfig', (Config,), settings))
+    return factory
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
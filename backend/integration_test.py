@@ -6,6 +6,7 @@ This script tests all the major components of the backend
 
 import sys
 import os
+import io
 import json
 import pandas as pd
 import numpy as np
@@ -13,6 +14,7 @@ from backend.utils.data_processing import clean_data, normalize_data, encode_cat
 from backend.utils.ml_utils import MLModel, compare_models
 from backend.utils.visualization import create_bar_chart, create_scatter_plot
 from backend.utils.firebase_utils import FirestoreManager
+from backend.utils.data_io import dataframe_from_bytes, dataframe_from_json, PYARROW_AVAILABLE
 
 def test_data_processing():
     """Test data processing utilities"""
@@ -100,6 +102,44 @@ def test_visualization():
     
     print("  ✓ Visualization utilities working correctly\n")
 
+def test_request_formats():
+    """Test decoding of columnar request payloads"""
+    print("Testing request formats...")
+    
+    sample_data = pd.DataFrame({
+        'category': ['A', 'B', 'C'],
+        'value': [10, 25, 30]
+    })
+    
+    # Column-oriented JSON
+    decoded = dataframe_from_json(sample_data.to_dict(orient='list'))
+    assert decoded.equals(sample_data)
+    
+    # CSV
+    decoded = dataframe_from_bytes(sample_data.to_csv(index=False).encode(), 'csv')
+    assert decoded.equals(sample_data)
+    
+    if PYARROW_AVAILABLE:
+        import pyarrow as pa
+        import pyarrow.ipc as pa_ipc
+        
+        # Arrow IPC stream
+        table = pa.Table.from_pandas(sample_data)
+        sink = pa.BufferOutputStream()
+        with pa_ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        decoded = dataframe_from_bytes(sink.getvalue().to_pybytes(), 'arrow_stream')
+        assert decoded.equals(sample_data)
+        
+        # Parquet
+        buffer = io.BytesIO()
+        sample_data.to_parquet(buffer)
+        decoded = dataframe_from_bytes(buffer.getvalue(), 'parquet')
+        assert decoded.equals(sample_data)
+        print("  ✓ Arrow and Parquet payloads decoded")
+    
+    print("  ✓ Request formats working correctly\n")
+
 def test_firebase_utils():
     """Test Firebase utilities"""
     print("Testing Firebase utilities...")
@@ -123,6 +163,7 @@ def main():
         test_data_processing()
         test_ml_utilities()
         test_visualization()
+        test_request_formats()
         test_firebase_utils()
         
         print("🎉 All integration tests passed!")
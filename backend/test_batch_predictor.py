@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for micro-batched predictions
+"""
+
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from backend.utils.batch_predictor import MicroBatchPredictor
+
+class DoublingModel:
+    """Predicts twice the 'value' column and records each call's row count"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, df):
+        self.calls.append(len(df))
+        if df['value'].isna().any():
+            raise ValueError('value must not be missing')
+        return df['value'].to_numpy() * 2
+
+def _predict_concurrently(batcher, model, frames):
+    results = [None] * len(frames)
+    barrier = threading.Barrier(len(frames))
+
+    def call(index):
+        barrier.wait()
+        try:
+            results[index] = batcher.predict('doubling', model, frames[index])
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(frames))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_batch_slicing():
+    """Test that concurrent requests share a batch and get their own rows back"""
+    print("Testing prediction batch slicing...")
+
+    model = DoublingModel()
+    batcher = MicroBatchPredictor(max_batch_rows=1000, max_wait_ms=200)
+    frames = [pd.DataFrame({'value': np.arange(size, dtype=float) + 100 * index})
+              for index, size in enumerate([1, 5, 3, 10])]
+    results = _predict_concurrently(batcher, model, frames)
+
+    for df, result in zip(frames, results):
+        assert np.array_equal(result, df['value'].to_numpy() * 2)
+    assert sum(model.calls) == 19 and len(model.calls) < len(frames)
+    stats = batcher.stats()
+    assert stats['requests'] == 4 and stats['rows'] == 19 and stats['fallbacks'] == 0
+
+    print("  ✓ Batch slicing working correctly\n")
+
+def test_per_request_fallback():
+    """Test that one failing request does not fail the rest of its batch"""
+    print("Testing prediction batch fallback...")
+
+    model = DoublingModel()
+    batcher = MicroBatchPredictor(max_batch_rows=1000, max_wait_ms=200)
+    frames = [
+        pd.DataFrame({'value': [1.0, 2.0]}),
+        pd.DataFrame({'value': [np.nan]}),
+        pd.DataFrame({'value': [3.0]})
+    ]
+    results = _predict_concurrently(batcher, model, frames)
+
+    assert np.array_equal(results[0], [2.0, 4.0])
+    assert isinstance(results[1], ValueError)
+    assert np.array_equal(results[2], [6.0])
+    assert batcher.stats()['fallbacks'] >= 1
+
+    print("  ✓ Per-request fallback working correctly\n")
+
+def test_max_batch_rows():
+    """Test that a batch is closed once it holds max_batch_rows rows"""
+    print("Testing prediction batch size limit...")
+
+    model = DoublingModel()
+    batcher = MicroBatchPredictor(max_batch_rows=4, max_wait_ms=200)
+    frames = [pd.DataFrame({'value': [float(index)] * 4}) for index in range(3)]
+    results = _predict_concurrently(batcher, model, frames)
+
+    for df, result in zip(frames, results):
+        assert np.array_equal(result, df['value'].to_numpy() * 2)
+    assert model.calls == [4, 4, 4]
+
+    print("  ✓ Batch size limit enforced\n")
+
+if __name__ == "__main__":
+    test_batch_slicing()
+    test_per_request_fallback()
+    test_max_batch_rows()
+    sys.exit(0)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for request body decoding and streamed responses
+"""
+
+import json
+import sys
+from io import BytesIO
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+import pytest
+from flask import Flask, request
+from backend.utils.data_io import read_request_data, RequestDataError
+
+def _incidents(n=250):
+    return pd.DataFrame({
+        'week': range(n),
+        'incidents': [i % 7 for i in range(n)],
+        'site': [f's{i % 3}' for i in range(n)]
+    })
+
+def _read(app, **kwargs):
+    with app.test_request_context('/api/v1/process-data', method='POST', **kwargs):
+        return read_request_data(request)
+
+def test_request_formats():
+    """Test that every body format decodes to the same typed table"""
+    print("Testing request body formats...")
+
+    app = Flask(__name__)
+    df = _incidents(20)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    parquet, arrow_stream, arrow_file = BytesIO(), BytesIO(), BytesIO()
+    pq.write_table(table, parquet)
+    with pa_ipc.new_stream(arrow_stream, table.schema) as writer:
+        writer.write_table(table)
+    with pa_ipc.new_file(arrow_file, table.schema) as writer:
+        writer.write_table(table)
+
+    bodies = [
+        {'json': {'data': df.to_dict(orient='records'), 'clean': True}},
+        {'json': {'data': df.to_dict(orient='list'), 'clean': True}},
+        {'query_string': {'clean': 'true'}, 'data': df.to_csv(index=False), 'content_type': 'text/csv'},
+        {'query_string': {'clean': 'true'}, 'data': parquet.getvalue(), 'content_type': 'application/vnd.apache.parquet'},
+        {'query_string': {'clean': 'true'}, 'data': arrow_stream.getvalue(),
+         'content_type': 'application/vnd.apache.arrow.stream'},
+        {'query_string': {'clean': 'true'}, 'data': arrow_file.getvalue(), 'content_type': 'application/vnd.apache.arrow.file'},
+        {'data': {'clean': 'true', 'file': (BytesIO(parquet.getvalue()), 'incidents.parquet')},
+         'content_type': 'multipart/form-data'}
+    ]
+    for body in bodies:
+        decoded, params = _read(app, **body)
+        assert params == {'clean': True}
+        pd.testing.assert_frame_equal(decoded[df.columns], df)
+
+    assert _read(app, json={'clean': True}) == (None, {'clean': True})
+    for body in ({'data': b'not parquet', 'content_type': 'application/vnd.apache.parquet'},
+                 {'data': b'<rows/>', 'content_type': 'application/xml'},
+                 {'data': {'file': (BytesIO(b'x'), 'incidents.xlsx')}, 'content_type': 'multipart/form-data'}):
+        try:
+            _read(app, **body)
+            raise AssertionError(f"{body['content_type']} body was accepted")
+        except RequestDataError:
+            pass
+
+    print("  ✓ Request formats decoded correctly\n")
+
+def test_streamed_statistics(client):
+    """Test that both streaming formats send the statistics after the rows"""
+    print("Testing streamed process-data responses...")
+
+    df = _incidents()
+    expected = client.post('/api/v1/process-data', data=df.to_csv(index=False), content_type='text/csv').get_json()
+
+    response = client.post('/api/v1/process-data?stream=ndjson&chunk_size=100', data=df.to_csv(index=False),
+                           content_type='text/csv')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.mimetype == 'application/x-ndjson' and len(lines) == len(df) + 1
+    assert lines[-1] == {'_type': 'statistics', 'statistics': expected['statistics']}
+
+    response = client.post('/api/v1/process-data?stream=arrow&chunk_size=100', data=df.to_csv(index=False),
+                           content_type='text/csv')
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    assert 'X-Statistics' not in response.headers
+    reader = pa_ipc.open_stream(pa.BufferReader(response.get_data()))
+    batches = []
+    while True:
+        try:
+            batches.append(reader.read_next_batch_with_custom_metadata())
+        except StopIteration:
+            break
+    assert [batch.num_rows for batch, _ in batches] == [100, 100, 50, 0]
+    assert all(metadata is None for _, metadata in batches[:-1])
+    assert json.loads(batches[-1][1][b'statistics']) == expected['statistics']
+    streamed = pa.Table.from_batches([batch for batch, _ in batches]).to_pandas()
+    pd.testing.assert_frame_equal(streamed, df)
+
+    print("  ✓ Streamed statistics working correctly\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the client fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
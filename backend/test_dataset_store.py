@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory dataset store and its disk spill
+"""
+
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from backend.utils.dataset_store import DatasetStore, dataset_fingerprint
+
+def _frame(seed, rows=1000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'value': rng.normal(size=rows), 'site': rng.choice(['a', 'b', 'c'], size=rows)})
+
+def test_fingerprint():
+    """Test that dataset IDs depend on the content only"""
+    print("Testing dataset fingerprint...")
+
+    df = _frame(0)
+    assert dataset_fingerprint(df) == dataset_fingerprint(df.copy())
+    assert dataset_fingerprint(df) != dataset_fingerprint(_frame(1))
+    assert dataset_fingerprint(df) != dataset_fingerprint(df.rename(columns={'value': 'other'}))
+    assert len(dataset_fingerprint(df)) == 32
+
+    print("  ✓ Fingerprint working correctly\n")
+
+def test_lru_eviction():
+    """Test that the least recently used dataset is evicted past the byte budget"""
+    print("Testing dataset store LRU eviction...")
+
+    frames = [_frame(seed) for seed in range(3)]
+    size = int(frames[0].memory_usage(deep=True).sum())
+    store = DatasetStore(max_bytes=int(size * 2.5))
+
+    first, second = store.put(frames[0]), store.put(frames[1])
+    # Reading the first one makes the second the least recently used
+    store.get(first)
+    third = store.put(frames[2])
+
+    assert store.stats()['datasets_in_memory'] == 2
+    assert store.stats()['memory_bytes'] <= store.max_bytes
+    store.get(first)
+    store.get(third)
+    try:
+        store.get(second)
+        raise AssertionError("An evicted dataset without a spill path was returned")
+    except KeyError:
+        pass
+
+    # Storing the same content again reuses its ID
+    assert store.put(frames[0].copy()) == first
+    assert store.stats()['datasets_in_memory'] == 2
+
+    print("  ✓ LRU eviction working correctly\n")
+
+def test_spill_round_trip():
+    """Test that evicted datasets are loaded back from the spill directory"""
+    print("Testing dataset store spill round trip...")
+
+    with tempfile.TemporaryDirectory() as spill_path:
+        frames = [_frame(seed) for seed in range(3)]
+        size = int(frames[0].memory_usage(deep=True).sum())
+        store = DatasetStore(max_bytes=int(size * 1.5), spill_path=spill_path)
+        ids = [store.put(df) for df in frames]
+        assert store.stats()['datasets_in_memory'] == 1
+
+        loaded = store.get(ids[0])
+        pd.testing.assert_frame_equal(loaded, frames[0])
+        assert store.info(ids[0])['in_memory']
+
+        # Another worker process sees the same datasets through the spill directory
+        other = DatasetStore(spill_path=spill_path)
+        pd.testing.assert_frame_equal(other.get(ids[1]), frames[1])
+
+        assert store.delete(ids[2])
+        assert not store.delete(ids[2])
+        for dataset_id in (ids[2], '../etc/passwd'):
+            try:
+                other.get(dataset_id)
+                raise AssertionError(f"Dataset {dataset_id} was returned")
+            except KeyError:
+                pass
+
+    print("  ✓ Spill round trip working correctly\n")
+
+if __name__ == "__main__":
+    test_fingerprint()
+    test_lru_eviction()
+    test_spill_round_trip()
+    sys.exit(0)
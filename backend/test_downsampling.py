@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for line and scatter downsampling
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from backend.utils.downsampling import downsample_line, downsample_scatter
+
+def _series(n=10000):
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=n))
+    y[1234] = y.max() + 50
+    y[8765] = y.min() - 50
+    # Shuffled so the reduction has to order the rows by x
+    return pd.DataFrame({'x': np.arange(n), 'y': y}).sample(frac=1, random_state=0)
+
+def test_line_downsampling():
+    """Test that LTTB and minmax stay within budget and keep the extremes"""
+    print("Testing line downsampling...")
+
+    df = _series()
+    for method in ('lttb', 'minmax'):
+        reduced, reduction = downsample_line(df, 'x', 'y', 500, method)
+        assert len(reduced) <= 500 and reduction['points'] == len(reduced)
+        assert reduction['method'] == method and reduction['original_points'] == len(df)
+        assert reduced['x'].is_monotonic_increasing
+        assert reduced['x'].iloc[0] == 0 and reduced['x'].iloc[-1] == len(df) - 1
+        assert reduced['y'].max() == df['y'].max() and reduced['y'].min() == df['y'].min()
+
+    # minmax keeps both extremes of every bucket, so the budget is nearly used up
+    reduced, _ = downsample_line(df, 'x', 'y', 500, 'minmax')
+    assert len(reduced) >= 450
+    reduced, _ = downsample_line(df, 'x', 'y', 500, 'lttb')
+    assert len(reduced) == 500
+
+    # Under the budget nothing changes
+    reduced, reduction = downsample_line(df, 'x', 'y', len(df))
+    assert reduced is df and reduction['method'] is None
+
+    print("  ✓ Line downsampling working correctly\n")
+
+def test_non_numeric_line(client):
+    """Test that a non-numeric y is rejected, and answered with 400 by /visualize"""
+    print("Testing line downsampling with text values...")
+
+    df = pd.DataFrame({'x': range(100), 'y': [f'level {i % 5}' for i in range(100)]})
+    try:
+        downsample_line(df, 'x', 'y', 10)
+        raise AssertionError("A text y column was downsampled")
+    except ValueError:
+        pass
+
+    dates = pd.DataFrame({'x': range(100), 'y': pd.date_range('2024-01-01', periods=100, freq='D')})
+    reduced, _ = downsample_line(dates, 'x', 'y', 10)
+    assert len(reduced) == 10
+
+    request = {'data': df.to_dict(orient='records'), 'chart_type': 'line', 'x_column': 'x', 'y_column': 'y'}
+    assert client.post('/api/v1/visualize', json={**request, 'max_points': 10}).status_code == 400
+    assert client.post('/api/v1/render', json={**request, 'max_points': 10}).status_code == 400
+    # Small enough not to be downsampled
+    assert client.post('/api/v1/visualize', json={**request, 'max_points': 0}).status_code == 200
+
+    print("  ✓ Non-numeric line values rejected\n")
+
+def test_scatter_downsampling():
+    """Test that both scatter methods stay within budget"""
+    print("Testing scatter downsampling...")
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'x': rng.normal(size=20000), 'y': rng.normal(size=20000),
+                       'group': rng.choice(['a', 'b'], size=20000)})
+    df.loc[0, ['x', 'y']] = [40.0, -40.0]
+
+    reduced, reduction = downsample_scatter(df, 'x', 'y', 1000, 'sample')
+    assert len(reduced) == 1000 and reduction['points'] == 1000
+
+    reduced, reduction = downsample_scatter(df, 'x', 'y', 1000, 'bin', 'group')
+    assert len(reduced) <= 1000 and 'grid' in reduction
+    # An isolated outlier has a grid cell to itself
+    assert 0 in reduced.index
+
+    print("  ✓ Scatter downsampling working correctly\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the client fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
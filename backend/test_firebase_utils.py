@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Firestore client and the batched uploader
+"""
+
+import sys
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+import pandas as pd
+from backend.utils import firebase_utils
+from backend.utils.firebase_utils import FirestoreManager, get_firestore_client
+
+def _fake_app():
+    return SimpleNamespace(project_id='demo-project', credential=SimpleNamespace(get_credential=lambda: None))
+
+def test_client_shared_per_process():
+    """Test that a process reuses its client and a forked process builds a new one"""
+    print("Testing Firestore client per process...")
+    
+    app = _fake_app()
+    with mock.patch.object(firebase_utils.firebase_admin, '_apps', {'[DEFAULT]': app}), \
+            mock.patch.object(firebase_utils.firebase_admin, 'get_app', return_value=app), \
+            mock.patch.object(firebase_utils.firestore, 'Client', side_effect=lambda **kwargs: object()) as client_class, \
+            mock.patch.object(firebase_utils, '_client', None), \
+            mock.patch.object(firebase_utils, '_client_pid', None):
+        with mock.patch.object(firebase_utils.os, 'getpid', return_value=1000):
+            parent = get_firestore_client()
+            assert get_firestore_client() is parent
+            assert FirestoreManager().db is parent
+        
+        # A different pid is a forked child: it must not reuse the parent's client
+        with mock.patch.object(firebase_utils.os, 'getpid', return_value=1001):
+            child = get_firestore_client()
+            assert child is not parent
+            assert get_firestore_client() is child
+        assert client_class.call_count == 2
+    
+    print("  ✓ Firestore client shared per process\n")
+
+class _FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+    
+    def set(self, ref, record):
+        self.writes.append((ref, record))
+    
+    def commit(self):
+        self.db.committed.append(len(self.writes))
+
+class _FakeCollection:
+    def __init__(self, name):
+        self.name = name
+    
+    def document(self, doc_id):
+        return f'{self.name}/{doc_id}'
+
+class _FakeDB:
+    def __init__(self):
+        self.committed = []
+    
+    def batch(self):
+        return _FakeBatch(self)
+    
+    def collection(self, name):
+        return _FakeCollection(name)
+
+def test_upload_batches():
+    """Test that concurrent uploads write every record once in bounded batches"""
+    print("Testing batched Firestore upload...")
+    
+    manager = FirestoreManager.__new__(FirestoreManager)
+    manager.db = _FakeDB()
+    df = pd.DataFrame({'value': range(1234)})
+    result = manager.upload_dataframe(df, 'incidents', batch_size=1000, max_in_flight=3)
+    
+    # Batches are capped at Firestore's 500 writes
+    assert result['batch_size'] == 500
+    assert result['records'] == 1234
+    assert result['batches'] == 3
+    assert sorted(manager.db.committed) == [234, 500, 500]
+    
+    print("  ✓ Batched upload working correctly\n")
+
+class _FakeDoc:
+    def __init__(self, doc_id, record, nested=False):
+        self.id = doc_id
+        self.record = record
+        # Documents of a same-named subcollection have a parent document
+        self.reference = SimpleNamespace(parent=SimpleNamespace(parent='sites/north' if nested else None))
+    
+    def to_dict(self):
+        return dict(self.record)
+
+class _FakeQuery:
+    def __init__(self, docs, fail=False):
+        self.docs = docs
+        self.fail = fail
+    
+    def where(self, field, operator, value):
+        matches = (lambda v: v == value) if operator == '==' else (lambda v: v in value)
+        return _FakeQuery([doc for doc in self.docs if matches(doc.record.get(field))], self.fail)
+    
+    def stream(self):
+        for doc in self.docs:
+            if self.fail:
+                raise RuntimeError('deadline exceeded')
+            yield doc
+
+class _FakeReadDB:
+    """Stands in for a Firestore client with partition queries over a key-ordered collection"""
+    
+    def __init__(self, n=1000, partitioning=True, failing_partition=None):
+        self.top_level = [_FakeDoc(f'doc{i:04d}', {'value': i, 'site': ['north', 'south', 'east'][i % 3]})
+                          for i in range(n)]
+        nested = [_FakeDoc(f'sub{i}', {'value': -i, 'site': 'north'}, nested=True) for i in range(20)]
+        self.all_docs = self.top_level + nested
+        self.partitioning = partitioning
+        self.failing_partition = failing_partition
+    
+    def collection(self, name):
+        return _FakeQuery(self.top_level)
+    
+    def collection_group(self, name):
+        def get_partitions(split_points):
+            if not self.partitioning:
+                raise RuntimeError('partition queries are not enabled')
+            ranges = np.array_split(np.arange(len(self.all_docs)), split_points + 1)
+            queries = [_FakeQuery([self.all_docs[i] for i in rows], fail=k == self.failing_partition)
+                       for k, rows in enumerate(ranges)]
+            return [SimpleNamespace(query=lambda query=query: query) for query in queries]
+        return SimpleNamespace(get_partitions=get_partitions)
+
+def _manager(db):
+    manager = FirestoreManager.__new__(FirestoreManager)
+    manager.db = db
+    return manager
+
+def test_partitioned_reads():
+    """Test that partitioned reads return every top-level document once, as one cursor does"""
+    print("Testing partitioned Firestore reads...")
+    
+    manager = _manager(_FakeReadDB())
+    single = manager.download_collection('incidents')
+    parallel = manager.download_collection('incidents', partition_count=4)
+    assert len(parallel) == len(single) == 1000
+    assert sorted(parallel['id']) == sorted(single['id'])
+    pd.testing.assert_frame_equal(parallel.sort_values('id').reset_index(drop=True), single[parallel.columns])
+    
+    chunks = list(manager.iter_partitioned_chunks('incidents', 4, chunk_size=100))
+    assert max(len(chunk) for chunk in chunks) == 100 and sum(len(chunk) for chunk in chunks) == 1000
+    
+    for operator, value in (('==', 'north'), ('in', ['south', 'east'])):
+        single = manager.query_collection('incidents', 'site', operator, value)
+        parallel = manager.query_collection('incidents', 'site', operator, value, partition_count=3)
+        assert sorted(parallel['id']) == sorted(single['id']) and len(single) > 0
+    try:
+        list(manager.iter_partitioned_chunks('incidents', 4, field='value', operator='>', value=3))
+        raise AssertionError("A range filter was partitioned")
+    except ValueError:
+        pass
+    
+    # Without partition queries the collection is read with one cursor
+    fallback = _manager(_FakeReadDB(partitioning=False)).download_collection('incidents', partition_count=4)
+    assert len(fallback) == 1000
+    
+    # A failing range fails the whole read instead of returning part of the collection
+    try:
+        _manager(_FakeReadDB(failing_partition=2)).download_collection('incidents', partition_count=4)
+        raise AssertionError("A failed partition read was ignored")
+    except Exception as e:
+        assert 'deadline exceeded' in str(e)
+    
+    print("  ✓ Partitioned reads working correctly\n")
+
+if __name__ == "__main__":
+    test_client_shared_per_process()
+    test_upload_batches()
+    test_partitioned_reads()
+    sys.exit(0)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job queue and the job status API
+"""
+
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pytest
+from backend.utils.data_io import ChunkSource, iter_dataframe_chunks
+from backend.utils.job_queue import JobQueue, JobQueueFull
+from backend.utils.ml_utils import train_incremental_task
+
+def add_task(context, a, b):
+    context.report(0.5, 'Adding')
+    return {'sum': a + b}
+
+def failing_task(context):
+    raise RuntimeError('bad input')
+
+def slow_task(context, steps=200):
+    for step in range(steps):
+        context.report(step / steps)
+        time.sleep(0.02)
+    return {'steps': steps}
+
+class RecordingContext:
+    """Stands in for a JobContext and keeps the reported progress"""
+
+    def __init__(self):
+        self.reports = []
+
+    def report(self, progress, message=None):
+        self.reports.append(progress)
+
+def _wait(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = queue.status(job_id)
+        if state['state'] in ('completed', 'failed', 'cancelled'):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_submit_status_result():
+    """Test that completed, failed and cancelled jobs report their state"""
+    print("Testing job queue lifecycle...")
+    
+    with tempfile.TemporaryDirectory() as state_path:
+        queue = JobQueue(state_path, max_workers=1, max_pending=4)
+        
+        job_id = queue.submit('add', add_task, a=2, b=3)
+        state = _wait(queue, job_id)
+        assert state['state'] == 'completed' and state['progress'] == 1.0
+        assert queue.result(job_id) == {'sum': 5}
+        
+        job_id = queue.submit('fail', failing_task)
+        state = _wait(queue, job_id)
+        assert state['state'] == 'failed' and 'bad input' in state['error']
+        assert queue.result(job_id) is None
+        
+        job_id = queue.submit('slow', slow_task)
+        while queue.status(job_id)['state'] == 'queued':
+            time.sleep(0.02)
+        queue.cancel(job_id)
+        assert _wait(queue, job_id)['state'] == 'cancelled'
+        
+        assert queue.status('0' * 32) is None
+        assert queue.status('../etc/passwd') is None
+    
+    print("  ✓ Job lifecycle working correctly\n")
+
+def test_queue_full():
+    """Test that submissions beyond max_pending are rejected"""
+    print("Testing job queue limit...")
+    
+    with tempfile.TemporaryDirectory() as state_path:
+        queue = JobQueue(state_path, max_workers=1, max_pending=1)
+        job_id = queue.submit('slow', slow_task)
+        try:
+            queue.submit('slow', slow_task)
+            raise AssertionError("A second job was accepted by a full queue")
+        except JobQueueFull:
+            pass
+        queue.cancel(job_id)
+        _wait(queue, job_id)
+    
+    print("  ✓ Job queue limit enforced\n")
+
+def test_result_endpoint_after_prune(app, client):
+    """Test that the result endpoint answers 410 when the result file is gone"""
+    print("Testing job result endpoint...")
+    
+    queue = app.extensions['job_queue']
+    job_id = queue.submit('add', add_task, a=1, b=1)
+    _wait(queue, job_id)
+    
+    response = client.get(f'/api/v1/jobs/{job_id}/result')
+    assert response.status_code == 200 and response.get_json()['sum'] == 2
+    
+    # The TTL sweep can remove the result between the status and result reads
+    os.remove(os.path.join(app.config['JOB_STATE_PATH'], f'{job_id}.result.json'))
+    response = client.get(f'/api/v1/jobs/{job_id}/result')
+    assert response.status_code == 410
+    
+    assert client.get(f"/api/v1/jobs/{'0' * 32}/result").status_code == 404
+    
+    print("  ✓ Job result endpoint working correctly\n")
+
+def test_incremental_progress(tmp_path):
+    """Test that incremental training reports the share of rows or epochs done"""
+    print("Testing incremental training progress...")
+    
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'hours': rng.normal(40, 5, 1000), 'site': rng.choice(['north', 'south'], 1000)})
+    df['incidents'] = df['hours'] * 0.5 + rng.normal(0, 1, 1000)
+    csv_path = str(tmp_path / 'incidents.csv')
+    df.to_csv(csv_path, index=False)
+    
+    context = RecordingContext()
+    train_incremental_task(context, {'csv_path': csv_path}, 'incidents', chunk_size=100, epochs=2)
+    # Initial report, then one per chunk over both epochs
+    assert len(context.reports) == 21
+    np.testing.assert_allclose(context.reports[1:], 0.9 * np.arange(1, 21) / 20)
+    
+    # Without a row count (as for Firestore collections) progress moves per epoch
+    context = RecordingContext()
+    source = ChunkSource(lambda: iter_dataframe_chunks(df, 250))
+    with mock.patch('backend.utils.data_io.open_chunk_source', return_value=source):
+        train_incremental_task(context, {'collection_name': 'incidents'}, 'incidents', epochs=2)
+    assert context.reports[1:] == [0.0] * 4 + [0.45] * 4
+    
+    print("  ✓ Incremental progress reported correctly\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the app fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
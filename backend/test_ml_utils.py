@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests for persisted preprocessing pipelines and prediction input checks
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from backend.utils.data_io import iter_dataframe_chunks
+from backend.utils.ml_utils import MLModel, compare_models, successive_halving_search
+
+def _training_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'hours': rng.normal(40, 5, 200),
+        'site': rng.choice(['north', 'south'], 200)
+    })
+    y = X['hours'] * 2 + (X['site'] == 'north') * 3
+    return X, y
+
+def _high_cardinality_data(n=400):
+    # Enough categories that one-hot encoding comes out as a sparse matrix
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({
+        'hours': rng.normal(40, 5, n),
+        'site': rng.choice([f'site_{i}' for i in range(40)], n),
+        'department': rng.choice([f'dept_{i}' for i in range(25)], n)
+    })
+    y = X['hours'] * 2 + X['site'].str[5:].astype(int) * 0.1 + rng.normal(0, 1, n)
+    return X, y
+
+def test_feature_alignment():
+    """Test that predictions reorder and drop columns but reject missing ones"""
+    print("Testing prediction feature alignment...")
+    
+    X, y = _training_data()
+    model = MLModel('regression', 'linear')
+    model.train(X, y)
+    
+    # Reordered columns plus an extra one give the same predictions
+    shuffled = X[['site', 'hours']].assign(extra=1)
+    assert np.allclose(model.predict(shuffled), model.predict(X))
+    
+    assert model.missing_features(X[['hours']]) == ['site']
+    try:
+        model.predict(X[['hours']])
+        raise AssertionError("predict accepted a frame without the 'site' feature")
+    except ValueError as e:
+        assert 'site' in str(e)
+    
+    print("  ✓ Feature alignment working correctly\n")
+
+def test_predict_missing_features(app, client):
+    """Test that /predict returns 400 listing missing feature columns"""
+    print("Testing /predict with missing features...")
+    
+    X, y = _training_data()
+    model = MLModel('regression', 'linear')
+    model.train(X, y)
+    app.extensions['model_registry'].register(model, 'hours_model')
+    
+    response = client.post('/api/v1/predict', json={'model_name': 'hours_model', 'data': [{'zzz': 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['missing_features'] == ['hours', 'site']
+    
+    response = client.post('/api/v1/predict', json={'model_name': 'hours_model',
+                                                    'data': [{'site': 'north', 'hours': 40, 'zzz': 1}]})
+    assert response.status_code == 200
+    assert len(response.get_json()['predictions']) == 1
+    
+    print("  ✓ /predict rejects missing features\n")
+
+def test_train_high_cardinality(app, client):
+    """Test that gradient boosting trains, registers and predicts on high-cardinality columns"""
+    print("Testing gradient boosting training with high-cardinality categories...")
+    
+    X, y = _high_cardinality_data()
+    model = MLModel('regression', 'gradient_boosting')
+    score = model.train(X, y)
+    assert score['r2'] > 0.5
+    assert len(model.predict(X.head(5))) == 5
+    
+    response = client.post('/api/v1/train-model', json={
+        'data': X.assign(target=y).to_dict(orient='records'),
+        'target_column': 'target',
+        'algorithm': 'gradient_boosting',
+        'model_name': 'hours_gb'
+    })
+    assert response.status_code == 200
+    
+    response = client.post('/api/v1/predict', json={
+        'model_name': 'hours_gb',
+        'data': X.head(3).to_dict(orient='records')
+    })
+    assert response.status_code == 200 and len(response.get_json()['predictions']) == 3
+    
+    print("  ✓ High-cardinality training working correctly\n")
+
+def test_compare_models_high_cardinality(client):
+    """Test that gradient boosting is compared on one-hot encoded high-cardinality columns"""
+    print("Testing model comparison with high-cardinality categories...")
+    
+    X, y = _high_cardinality_data()
+    candidates = ['random_forest', 'gradient_boosting', 'linear']
+    comparison = compare_models(X, y, candidates=candidates, cv=3, n_jobs=1)
+    assert [result['key'] for result in comparison['results']] == candidates
+    assert all(np.isfinite(result['mean_score']) for result in comparison['results'])
+    
+    labels = (y > y.median()).astype(int)
+    comparison = compare_models(X, labels, 'classification', candidates=['gradient_boosting', 'logistic'], cv=3, n_jobs=1)
+    assert comparison['results'][0]['mean_score'] > 0.5
+    
+    response = client.post('/api/v1/compare-models', json={
+        'data': X.assign(target=y).to_dict(orient='records'),
+        'target_column': 'target',
+        'candidates': ['gradient_boosting'],
+        'cv': 3
+    })
+    assert response.status_code == 200
+    assert response.get_json()['comparison']['best_model'] == 'Gradient Boosting'
+    
+    print("  ✓ High-cardinality comparison working correctly\n")
+
+def test_successive_halving(client):
+    """Test that each round keeps a third of the candidates on three times the rows"""
+    print("Testing successive halving search...")
+    
+    X, y = _training_data()
+    X, y = pd.concat([X] * 3, ignore_index=True), pd.concat([y] * 3, ignore_index=True)
+    search = successive_halving_search(X, y, 'regression', 'ridge', n_candidates=9, cv=3, n_jobs=1)
+    rounds = search['rounds']
+    assert [r['n_candidates'] for r in rounds] == [9, 3, 1]
+    assert [r['n_evaluated'] for r in rounds] == [9, 3, 1]
+    assert rounds[0]['n_rows'] < rounds[1]['n_rows'] < rounds[2]['n_rows'] == len(X)
+    assert not search['timed_out'] and set(search['best_params']) == {'alpha'}
+    
+    # Nothing is fully evaluated within a zero budget
+    try:
+        successive_halving_search(X, y, 'regression', 'ridge', n_candidates=9, time_budget=0, n_jobs=1)
+        raise AssertionError("A search without time to evaluate a candidate succeeded")
+    except Exception as e:
+        assert 'too short' in str(e)
+    
+    response = client.post('/api/v1/tune-model', json={
+        'data': X.assign(target=y).to_dict(orient='records'),
+        'target_column': 'target',
+        'algorithm': 'ridge',
+        'n_candidates': 4,
+        'model_name': 'hours_tuned'
+    })
+    tuning = response.get_json()['tuning']
+    assert response.status_code == 200 and tuning['model_version'] == 1
+    response = client.post('/api/v1/predict', json={'model_name': 'hours_tuned', 'data': X.head(2).to_dict(orient='records')})
+    assert response.status_code == 200 and len(response.get_json()['predictions']) == 2
+    assert client.post('/api/v1/tune-model', json={'data': [{'a': 1}], 'target_column': 'a',
+                                                   'algorithm': 'svm'}).status_code == 400
+    
+    print("  ✓ Successive halving working correctly\n")
+
+def test_incremental_training(client):
+    """Test out-of-core training from chunks, with classes only seen in later chunks"""
+    print("Testing incremental training...")
+    
+    X, y = _training_data()
+    X, y = pd.concat([X] * 5, ignore_index=True), pd.concat([y] * 5, ignore_index=True)
+    df = X.assign(target=y)
+    model = MLModel('regression', 'sgd')
+    score = model.train_incremental(lambda: iter_dataframe_chunks(df, 100), 'target', epochs=10)
+    assert score['chunks'] == 100 and score['rows'] == 10000
+    # Every chunk of the first epoch but the first is scored before training
+    assert score['progressive_rows'] == 900 and np.isfinite(score['rmse'])
+    residuals = model.predict(X) - y
+    assert 1 - (residuals ** 2).sum() / ((y - y.mean()) ** 2).sum() > 0.95
+    
+    # The rarest class only appears in the last chunk
+    labels = df.assign(target=np.where(df['site'] == 'north', 'north', 'south'))
+    labels.loc[labels.index[-5:], 'target'] = 'east'
+    model = MLModel('classification', 'sgd')
+    score = model.train_incremental(lambda: iter_dataframe_chunks(labels, 100), 'target')
+    assert list(model.model.named_steps['estimator'].classes_) == ['east', 'north', 'south']
+    assert score['accuracy'] > 0.8
+    
+    dataset_id = client.post('/api/v1/datasets', json={'data': df.to_dict(orient='records')}).get_json()['dataset_id']
+    response = client.post('/api/v1/train-incremental', json={
+        'dataset_id': dataset_id, 'target_column': 'target', 'chunk_size': 250, 'model_name': 'hours_sgd'
+    })
+    assert response.status_code == 200 and response.get_json()['score']['chunks'] == 4
+    response = client.post('/api/v1/predict', json={'model_name': 'hours_sgd', 'data': X.head(2).to_dict(orient='records')})
+    assert response.status_code == 200 and len(response.get_json()['predictions']) == 2
+    
+    for request in ({'dataset_id': dataset_id},
+                    {'dataset_id': dataset_id, 'target_column': 'target', 'algorithm': 'random_forest'},
+                    {'csv_path': '../../etc/passwd', 'target_column': 'target'},
+                    {'dataset_id': '0' * 32, 'target_column': 'target'}):
+        assert client.post('/api/v1/train-incremental', json=request).status_code == 400
+    
+    print("  ✓ Incremental training working correctly\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the app fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned model registry and its in-memory cache
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from backend.utils.ml_utils import MLModel
+from backend.utils.model_registry import ModelRegistry, ModelNotFound
+
+def _trained_model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'hours': rng.normal(40, 5, 100), 'crew': rng.integers(2, 10, 100)})
+    model = MLModel('regression', 'linear')
+    model.train(X, X['hours'] * 2 + X['crew'])
+    return model
+
+def test_versioning():
+    """Test that versions increase, resolve and delete per model name"""
+    print("Testing model registry versioning...")
+
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        assert registry.register(_trained_model(0), 'incidents') == 1
+        assert registry.register(_trained_model(1), 'incidents', {'note': 'retrained'}) == 2
+        assert registry.register(_trained_model(2), 'hours') == 1
+
+        assert registry.list_models() == {'hours': [1], 'incidents': [1, 2]}
+        assert registry.resolve_version('incidents') == 2
+        assert registry.resolve_version('incidents', 'latest') == 2
+        assert registry.resolve_version('incidents', '1') == 1
+        info = registry.info('incidents')
+        assert info['note'] == 'retrained' and info['feature_names'] == ['hours', 'crew']
+
+        for name, version in (('incidents', 3), ('incidents', 'first'), ('unknown', None), ('../models', None)):
+            try:
+                registry.resolve_version(name, version)
+                raise AssertionError(f"{name}:{version} resolved")
+            except ModelNotFound:
+                pass
+
+        registry.delete('incidents', 2)
+        assert registry.versions('incidents') == [1]
+        assert registry.resolve_version('incidents') == 1
+
+    print("  ✓ Model versioning working correctly\n")
+
+def test_cache_budget():
+    """Test that loaded models are cached and evicted by the byte budget"""
+    print("Testing model registry cache...")
+
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        for seed in range(3):
+            registry.register(_trained_model(seed), 'incidents')
+        size = os.path.getsize(registry._artifact_file('incidents', 1))
+        registry.max_bytes = int(size * 2.5)
+
+        first = registry.load('incidents', 1)
+        assert registry.load('incidents', 1) is first
+        assert registry.stats()['hits'] == 1 and registry.stats()['misses'] == 1
+
+        registry.load('incidents', 2)
+        # Using version 1 again makes version 2 the least recently used
+        registry.load('incidents', 1)
+        registry.load('incidents', 3)
+        stats = registry.stats()
+        assert stats['models_in_memory'] == 2 and stats['memory_bytes'] <= stats['max_bytes']
+        assert registry.info('incidents', 1)['cached']
+        assert not registry.info('incidents', 2)['cached']
+
+        # An evicted model loads again from disk and predicts the same
+        X = pd.DataFrame({'hours': [38.0, 45.0], 'crew': [3, 7]})
+        reloaded = registry.load('incidents', 2)
+        assert np.allclose(reloaded.predict(X), _trained_model(1).predict(X))
+
+    print("  ✓ Model cache working correctly\n")
+
+def test_legacy_predict():
+    """Test that the standalone app predicts with registered models and never trains"""
+    print("Testing standalone /api/predict...")
+
+    from backend import app as standalone
+    records = [{'hours': 38.0, 'crew': 3}, {'hours': 45.0, 'crew': 7}]
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        client = standalone.app.test_client()
+        with mock.patch.object(standalone, 'model_registry', registry):
+            response = client.post('/api/predict', json=records)
+            assert response.status_code == 400 and response.get_json()['models'] == []
+
+            model = _trained_model(0)
+            registry.register(model, 'incidents')
+            expected = model.predict(pd.DataFrame(records)).tolist()
+            # The only registered model is used by default
+            response = client.post('/api/predict', json=records)
+            assert response.status_code == 200 and response.get_json()['predictions'] == expected
+
+            registry.register(_trained_model(1), 'hours')
+            assert client.post('/api/predict', json={'data': records}).status_code == 400
+            response = client.post('/api/predict', json={'model_name': 'incidents', 'data': records})
+            assert response.get_json()['predictions'] == expected
+            assert client.post('/api/predict', json={'model_name': 'unknown', 'data': records}).status_code == 404
+
+    print("  ✓ Standalone predictions working correctly\n")
+
+if __name__ == "__main__":
+    test_versioning()
+    test_cache_budget()
+    test_legacy_predict()
+    sys.exit(0)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for the response cache and its request keys
+"""
+
+import sys
+import tempfile
+import time
+from unittest import mock
+import pytest
+from flask import Flask, request
+from backend.utils.response_cache import ResponseCache, request_cache_key
+
+def _key(app, path='/api/v1/process', **kwargs):
+    with app.test_request_context(path, method='POST', **kwargs):
+        return request_cache_key(request)
+
+def test_request_keys():
+    """Test that equivalent requests share a key and different ones do not"""
+    print("Testing response cache keys...")
+
+    app = Flask(__name__)
+    key = _key(app, data='{"b": 1, "a": [1, 2]}', content_type='application/json')
+    # Key order and whitespace of a JSON body do not matter
+    assert _key(app, data='{"a":[1,2],"b":1}', content_type='application/json') == key
+    assert _key(app, data='{"a": [2, 1], "b": 1}', content_type='application/json') != key
+    assert _key(app, '/api/v1/visualize', data='{"a":[1,2],"b":1}', content_type='application/json') != key
+    assert _key(app, '/api/v1/process?format=csv', data='{"a":[1,2],"b":1}',
+                content_type='application/json') != key
+    assert _key(app, data='{"a":[1,2],"b":1}', content_type='application/json',
+                headers={'Accept': 'application/x-ndjson'}) != key
+    assert _key(app, data='a,b\n1,2\n', content_type='text/csv') != _key(app, data='a,b\n1,3\n', content_type='text/csv')
+
+    print("  ✓ Request keys working correctly\n")
+
+def test_memory_tier():
+    """Test the byte-bounded LRU and TTL expiry of the memory tier"""
+    print("Testing response cache memory tier...")
+
+    cache = ResponseCache(max_bytes=10, ttl=60)
+    cache.put('a', b'12345', 'application/json')
+    cache.put('b', b'12345', 'application/json')
+    assert cache.get('a')[1] == 'memory'
+    # 'b' is now the least recently used entry
+    cache.put('c', b'123', 'application/json')
+    assert cache.get('b') == (None, None)
+    assert cache.get('a')[0]['body'] == b'12345' and cache.get('c')[1] == 'memory'
+    assert cache.stats()['memory_bytes'] <= 10
+
+    # Bodies larger than the whole budget are not kept
+    cache.put('big', b'x' * 11, 'application/json')
+    assert cache.get('big') == (None, None)
+
+    now = time.time()
+    with mock.patch('backend.utils.response_cache.time.time', return_value=now + 61):
+        assert cache.get('a') == (None, None)
+
+    print("  ✓ Memory tier working correctly\n")
+
+def test_disk_tier():
+    """Test that entries are shared through the disk tier and expire there too"""
+    print("Testing response cache disk tier...")
+
+    with tempfile.TemporaryDirectory() as disk_path:
+        writer = ResponseCache(disk_path=disk_path, ttl=60)
+        writer.put('key', b'{"status": "success"}', 'application/json', {'X-Extra': '1'})
+
+        # Another worker process has an empty memory tier
+        reader = ResponseCache(disk_path=disk_path, ttl=60)
+        entry, tier = reader.get('key')
+        assert tier == 'disk' and entry['body'] == b'{"status": "success"}'
+        assert entry['headers'] == {'X-Extra': '1'}
+        assert reader.get('key')[1] == 'memory'
+
+        now = time.time()
+        with mock.patch('backend.utils.response_cache.time.time', return_value=now + 61):
+            assert ResponseCache(disk_path=disk_path, ttl=60).get('key') == (None, None)
+
+        writer.clear()
+        assert ResponseCache(disk_path=disk_path, ttl=60).get('key') == (None, None)
+
+    print("  ✓ Disk tier working correctly\n")
+
+def test_cached_endpoint(make_app, tmp_path):
+    """Test the X-Cache header of a cached endpoint"""
+    print("Testing cached endpoint...")
+
+    client = make_app(RESPONSE_CACHE_ENABLED=True, RESPONSE_CACHE_PATH=str(tmp_path / 'responses')).test_client()
+    payload = {'data': [{'x': 1, 'y': 2}, {'x': 2, 'y': 3}], 'chart_type': 'bar', 'x_column': 'x', 'y_column': 'y'}
+
+    first = client.post('/api/v1/visualize', json=payload)
+    second = client.post('/api/v1/visualize', json=payload)
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT-MEMORY'
+    assert first.get_data() == second.get_data()
+
+    forced = client.post('/api/v1/visualize', json=payload, headers={'Cache-Control': 'no-cache'})
+    assert forced.headers['X-Cache'] == 'BYPASS'
+
+    # Errors are not cached
+    invalid = {'data': payload['data'], 'chart_type': 'bar'}
+    assert client.post('/api/v1/visualize', json=invalid).headers['X-Cache'] == 'MISS'
+    assert client.post('/api/v1/visualize', json=invalid).headers['X-Cache'] == 'MISS'
+
+    print("  ✓ Cached endpoint working correctly\n")
+
+def test_deleted_dataset_not_cached(make_app, tmp_path):
+    """Test that requests naming a deleted dataset are not answered from the cache"""
+    print("Testing cached responses after a dataset is deleted...")
+
+    client = make_app(RESPONSE_CACHE_ENABLED=True, RESPONSE_CACHE_PATH=str(tmp_path / 'responses')).test_client()
+    dataset_id = client.post('/api/v1/datasets', json={'data': [{'x': 1, 'y': 2}, {'x': 2, 'y': 3}]}).get_json()['dataset_id']
+    payload = {'dataset_id': dataset_id, 'chart_type': 'bar', 'x_column': 'x', 'y_column': 'y'}
+
+    assert client.post('/api/v1/visualize', json=payload).headers['X-Cache'] == 'MISS'
+    assert client.post('/api/v1/visualize', json=payload).headers['X-Cache'] == 'HIT-MEMORY'
+    assert client.post('/api/v1/process-data?dataset_id=' + dataset_id).status_code == 200
+
+    assert client.delete(f'/api/v1/datasets/{dataset_id}').status_code == 200
+    response = client.post('/api/v1/visualize', json=payload)
+    assert response.status_code == 400 and response.headers['X-Cache'] == 'MISS'
+    assert client.post('/api/v1/process-data?dataset_id=' + dataset_id).status_code == 400
+
+    print("  ✓ Deleted datasets bypass the cache\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the make_app fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Tests for safety analytics report deduplication and result storage
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+import safety_analytics
+from safety_analytics import (detect_duplicate_reports, deduplicate_reports, save_analytics_results,
+                               load_analytics_results, load_analytics_section, perform_maintenance_interval_analysis,
+                               perform_hotspot_analysis, dataframe_chunk_source, generate_compliance_scorecard,
+                               link_near_miss_precursors)
+
+def _reports():
+    reports = [
+        ('r1', 'Warehouse', '2024-03-01', 'Forklift struck a pallet rack near loading bay 3'),
+        ('r2', 'Warehouse', '2024-03-02', 'forklift struck pallet rack near loading bay 3!'),
+        # Same text, but outside the date window
+        ('r3', 'Warehouse', '2024-03-20', 'Forklift struck a pallet rack near loading bay 3'),
+        # Same text and date, but another location
+        ('r4', 'Workshop', '2024-03-01', 'Forklift struck a pallet rack near loading bay 3'),
+        ('r5', 'Warehouse', '2024-03-01', 'Chemical spill in the paint store during transfer'),
+        ('r6', 'Warehouse', '2024-03-03', 'Chemical spill in paint store during transfer'),
+        ('r7', 'Warehouse', '2024-03-02', 'Worker slipped on wet floor in the canteen')
+    ]
+    return pd.DataFrame(reports, columns=['id', 'location', 'date', 'description'])
+
+def test_duplicate_clusters():
+    """Test that near-identical reports in one location and date window are clustered"""
+    print("Testing duplicate report detection...")
+
+    df = _reports()
+    clusters = detect_duplicate_reports(df)
+    assert list(clusters) == ['r1', 'r1', 'r3', 'r4', 'r5', 'r5', 'r7']
+    # Only reports sharing a block and enough n-grams are scored
+    assert 0 < clusters.attrs['candidate_pairs'] < len(df) * (len(df) - 1) // 2
+    assert clusters.attrs['duplicate_pairs'] == 2
+
+    # Row order does not change which reports are grouped
+    shuffled = df.sample(frac=1, random_state=1)
+    reordered = detect_duplicate_reports(shuffled)
+    groups = lambda ids: sorted(sorted(group) for group in shuffled['id'].groupby(ids.to_numpy()).agg(list))
+    assert groups(reordered) == groups(clusters.loc[shuffled.index])
+
+    print("  ✓ Duplicate detection working correctly\n")
+
+def test_subset_reports_kept():
+    """Test that a short report is not merged into longer reports containing its words"""
+    print("Testing near-subset reports...")
+
+    df = pd.DataFrame([
+        ('s1', 'Warehouse', '2024-03-01', 'Slip'),
+        ('s2', 'Warehouse', '2024-03-01', 'Slip in warehouse'),
+        ('s3', 'Warehouse', '2024-03-01', 'Worker slipped on wet floor'),
+        ('s4', 'Warehouse', '2024-03-01', 'Worker slipped on wet floor near the canteen exit'),
+        ('s5', 'Warehouse', '2024-03-02', 'Worker slipped on the wet floor')
+    ], columns=['id', 'location', 'date', 'description'])
+    clusters = detect_duplicate_reports(df)
+    assert list(clusters) == ['s1', 's2', 's3', 's4', 's3']
+
+    print("  ✓ Near-subset reports kept apart\n")
+
+def test_deduplicate_reports():
+    """Test that one report per cluster is kept with a summary of the merge"""
+    print("Testing report deduplication...")
+
+    deduplicated, stats = deduplicate_reports(_reports())
+    assert list(deduplicated['id']) == ['r1', 'r3', 'r4', 'r5', 'r7']
+    assert stats['total_reports'] == 7 and stats['unique_reports'] == 5
+    assert stats['duplicates_removed'] == 2 and stats['duplicate_clusters'] == 2
+
+    empty, stats = deduplicate_reports(pd.DataFrame())
+    assert empty.empty and stats['duplicates_removed'] == 0
+
+    print("  ✓ Report deduplication working correctly\n")
+
+def test_compliance_scorecard():
+    """Test the per-dimension compliance rates against a row-by-row count"""
+    print("Testing compliance scorecard...")
+
+    rng = np.random.default_rng(2)
+    n = 500
+    statuses = {'Compliant': True, 'PASS': True, ' compliant ': True, 'Non-Compliant': False, 'Failed': False, None: False}
+    inspections = pd.DataFrame({
+        'department': rng.choice(['Logistics', 'Maintenance', None], n),
+        'location': rng.choice(['North', 'South', 'East'], n),
+        'inspection_date': pd.date_range('2024-01-01', periods=n, freq='17h').astype(str),
+        'compliance_status': rng.choice(list(statuses), n)
+    })
+    trainings = pd.DataFrame({
+        'department': rng.choice(['Logistics', 'Maintenance'], 40),
+        'status': rng.choice(['Completed', 'Incomplete', 'In progress', 'completed'], 40)
+    })
+    scorecard = generate_compliance_scorecard(inspections, trainings)
+
+    expected = {'department': {}, 'location': {}, 'month': {}}
+    for row in inspections.itertuples():
+        keys = {'department': row.department or 'Unknown', 'location': row.location,
+                'month': row.inspection_date[:7]}
+        for dimension, key in keys.items():
+            counts = expected[dimension].setdefault(key, {'total': 0, 'positive': 0})
+            counts['total'] += 1
+            counts['positive'] += int(statuses[row.compliance_status])
+    for dimension, groups in expected.items():
+        by_dimension = scorecard[f'compliance_by_{dimension}']
+        assert set(by_dimension) == set(groups)
+        for key, counts in groups.items():
+            assert by_dimension[key]['total'] == counts['total'] and by_dimension[key]['positive'] == counts['positive']
+            assert np.isclose(by_dimension[key]['rate'], counts['positive'] / counts['total'] * 100)
+
+    positive = sum(statuses[status] for status in inspections['compliance_status'])
+    assert scorecard['compliant_inspections'] == positive
+    assert scorecard['non_compliant_inspections'] == n - positive
+    assert scorecard['completed_trainings'] == trainings['status'].str.lower().eq('completed').sum()
+    assert set(scorecard['training_completion_by_department']) == {'Logistics', 'Maintenance'}
+
+    print("  ✓ Compliance scorecard working correctly\n")
+
+def test_precursor_links():
+    """Test the near-miss precursor join against a brute-force cross join"""
+    print("Testing near-miss precursor links...")
+
+    rng = np.random.default_rng(3)
+    start = pd.Timestamp('2024-01-01')
+    def reports(prefix, n):
+        return pd.DataFrame({
+            'id': [f'{prefix}{i}' for i in range(n)],
+            'location': rng.choice(['Warehouse', 'Workshop', 'Yard', None], n),
+            'date': (start + pd.to_timedelta(rng.integers(0, 120 * 86400, n), unit='s')).strftime('%Y-%m-%d %H:%M:%S')
+        })
+    incidents, near_misses = reports('i', 150), reports('n', 400)
+    # A near-miss at the same instant as an incident is not its precursor
+    incidents.loc[0, 'location'] = near_misses.loc[0, 'location'] = 'Yard'
+    near_misses.loc[0, 'date'] = incidents.loc[0, 'date']
+
+    links = link_near_miss_precursors(incidents, near_misses, window_days=10)
+
+    pairs = incidents.dropna().merge(near_misses.dropna(), on='location', suffixes=('_incident', '_near_miss'))
+    lead = (pd.to_datetime(pairs['date_incident']) - pd.to_datetime(pairs['date_near_miss'])) / pd.Timedelta(days=1)
+    pairs = pairs[(lead > 0) & (lead <= 10)]
+    expected = sorted(zip(pairs['id_incident'], pairs['id_near_miss'], lead[pairs.index].round(6)))
+    assert len(expected) > 100
+    assert sorted(zip(links['incident_id'], links['near_miss_id'], links['lead_time_days'].round(6))) == expected
+
+    print("  ✓ Precursor links match the brute-force join\n")
+
+def test_maintenance_date_columns():
+    """Test that maintenance windows come from date columns, not lookalike names"""
+    print("Testing maintenance date column detection...")
+
+    maintenance = pd.DataFrame({
+        'asset_id': ['a1', 'a2'],
+        'vendor': ['Acme Lifts', 'Acme Lifts'],
+        'spend': [1200.0, 800.0],
+        'pending': ['no', 'no'],
+        'downtime_hours': [48, 24],
+        'StartDate': ['2024-03-01', '2024-03-09'],
+        'EndDate': ['2024-03-03', '2024-03-11']
+    })
+    incidents = pd.DataFrame({
+        'asset_id': ['a1', 'a1', 'a2', 'a2'],
+        'date': ['2024-03-02', '2024-03-20', '2024-03-10', '2024-03-25']
+    })
+    windows = perform_maintenance_interval_analysis(incidents, maintenance)['maintenance_windows']
+    assert windows['join_key'] == 'asset_id'
+    assert windows['incidents_inside'] == 2 and windows['incidents_outside'] == 2
+    # Two windows of two days each
+    assert windows['window_key_days'] == 4
+
+    print("  ✓ Maintenance date columns detected correctly\n")
+
+def _hotspot_reports(n=300):
+    rng = np.random.default_rng(0)
+    return {
+        'Incidents': pd.DataFrame({
+            'location': rng.choice(['Warehouse', 'Workshop', 'Yard'], n),
+            'department': rng.choice(['Logistics', 'Maintenance'], n),
+            'category': rng.choice(['slip', 'struck by', 'chemical'], n),
+            'date': pd.date_range('2024-01-01', periods=n, freq='7h').astype(str),
+            'severity': rng.choice(['low', 'medium', 'high'], n)
+        }),
+        'Near-Miss Reports': pd.DataFrame({
+            'location': rng.choice(['Warehouse', 'Yard'], n // 2),
+            'date': pd.date_range('2024-01-01', periods=n // 2, freq='13h').astype(str)
+        })
+    }
+
+def test_hotspot_model_path():
+    """Test that the hotspot model is kept at its configured path, not in the working directory"""
+    print("Testing hotspot model location...")
+
+    assert os.path.isabs(safety_analytics.HOTSPOT_MODEL_PATH)
+    source = dataframe_chunk_source(_hotspot_reports(), ['Incidents', 'Near-Miss Reports'], chunk_size=100)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as workdir:
+        model_path = os.path.join(root, 'models', 'hotspots.joblib')
+        os.chdir(workdir)
+        try:
+            first = perform_hotspot_analysis(source, model_path, n_clusters=4)
+            second = perform_hotspot_analysis(source, model_path, n_clusters=4)
+        finally:
+            os.chdir(cwd)
+        assert first['model_refit'] and not second['model_refit']
+        assert os.listdir(os.path.join(root, 'models')) == ['hotspots.joblib']
+        assert os.listdir(workdir) == []
+
+    print("  ✓ Hotspot model stored at its configured path\n")
+
+def _results():
+    rng = np.random.default_rng(0)
+    metrics = pd.DataFrame(rng.normal(size=(50, 4)), columns=['incidents', 'inspections', 'trainings', 'audits'])
+    return {
+        'correlation_analysis': {
+            'matrix': metrics.corr().to_dict(),
+            'strongest_pair': ['incidents', 'audits']
+        },
+        'trend_analysis': {
+            'monthly_incidents': {f'2024-{month:02d}': int(count) for month, count in enumerate(rng.integers(0, 20, 12), 1)},
+            'weekly_rate': [float(rate) for rate in rng.random(10)],
+            'summary': {'total': 123, 'mean': 10.25, 'trend': 'decreasing', 'flagged': True}
+        }
+    }
+
+def test_binary_round_trip():
+    """Test that results saved to the .npz container load back unchanged"""
+    print("Testing analytics results round trip...")
+
+    results = _results()
+    with tempfile.TemporaryDirectory() as root:
+        paths = {
+            'json_path': os.path.join(root, 'results.json'),
+            'index_path': os.path.join(root, 'results.index.json'),
+            'arrays_path': os.path.join(root, 'results.npz')
+        }
+        saved = save_analytics_results(results, 'both', **paths)
+        assert set(saved) == set(paths.values())
+        # Numeric blocks live in the arrays file, not in the index
+        assert os.path.getsize(paths['index_path']) < os.path.getsize(paths['json_path'])
+
+        loaded = load_analytics_results(paths['index_path'])
+        assert loaded.keys() == results.keys()
+        trend = loaded['trend_analysis']
+        assert trend['monthly_incidents'] == results['trend_analysis']['monthly_incidents']
+        assert np.allclose(trend['weekly_rate'], results['trend_analysis']['weekly_rate'])
+        assert trend['summary'] == results['trend_analysis']['summary']
+        matrix = pd.DataFrame(loaded['correlation_analysis']['matrix'])
+        pd.testing.assert_frame_equal(matrix, pd.DataFrame(results['correlation_analysis']['matrix']))
+        assert loaded['correlation_analysis']['strongest_pair'] == ['incidents', 'audits']
+
+        section = load_analytics_section('correlation_analysis', paths['index_path'], as_frames=True)
+        assert isinstance(section['matrix'], pd.DataFrame) and section['matrix'].shape == (4, 4)
+        try:
+            load_analytics_section('missing', paths['index_path'])
+            raise AssertionError("A missing section was loaded")
+        except KeyError:
+            pass
+
+        # No temporary files are left behind
+        assert sorted(os.listdir(root)) == ['results.index.json', 'results.json', 'results.npz']
+
+    print("  ✓ Results round trip working correctly\n")
+
+def test_integer_counts_round_trip():
+    """Test that count tables keep integer values in the binary container"""
+    print("Testing integer counts round trip...")
+
+    departments = [f'dept_{i}' for i in range(6)]
+    results = {
+        'compliance_analysis': {
+            'by_department': {dept: {'total': 10 + i, 'positive': i, 'rate': i / (10 + i) * 100}
+                              for i, dept in enumerate(departments)},
+            'by_month': {dept: {'2024-01': i, '2024-02': 2 * i} for i, dept in enumerate(departments)}
+        }
+    }
+    with tempfile.TemporaryDirectory() as root:
+        index_path = os.path.join(root, 'results.index.json')
+        arrays_path = os.path.join(root, 'results.npz')
+        save_analytics_results(results, 'binary', index_path=index_path, arrays_path=arrays_path)
+        assert set(np.load(arrays_path).keys()) == {'compliance_analysis/by_department', 'compliance_analysis/by_month'}
+        assert np.load(arrays_path)['compliance_analysis/by_month'].dtype == np.int64
+
+        loaded = load_analytics_results(index_path)['compliance_analysis']
+        assert loaded == results['compliance_analysis']
+        for counts in list(loaded['by_department'].values()) + list(loaded['by_month'].values()):
+            assert all(type(counts[key]) is int for key in counts if key != 'rate')
+
+    print("  ✓ Integer counts round trip working correctly\n")
+
+if __name__ == "__main__":
+    test_duplicate_clusters()
+    test_subset_reports_kept()
+    test_deduplicate_reports()
+    test_compliance_scorecard()
+    test_precursor_links()
+    test_maintenance_date_columns()
+    test_hotspot_model_path()
+    test_binary_round_trip()
+    test_integer_counts_round_trip()
+    sys.exit(0)
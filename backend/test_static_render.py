@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for static chart rendering and the render endpoints
+"""
+
+import json
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from backend.utils.static_render import render_options, chart_columns, _draw
+from backend.utils.visualization import box_statistics, create_box_plot
+
+class RecordingAxes:
+    """Stands in for matplotlib axes and keeps the box statistics drawn"""
+
+    def bxp(self, boxes, **kwargs):
+        self.boxes = boxes
+
+def test_render_options_bins():
+    """Test that bins accepts a count or a numpy rule, as /visualize does"""
+    print("Testing render bins option...")
+
+    base = {'chart_type': 'histogram', 'x_column': 'x'}
+    assert render_options(base)['bins'] == 'auto'
+    assert render_options({**base, 'bins': 'fd'})['bins'] == 'fd'
+    assert render_options({**base, 'bins': 'sturges'})['bins'] == 'sturges'
+    assert render_options({**base, 'bins': '25'})['bins'] == 25
+    for bins in ('many', 0):
+        try:
+            render_options({**base, 'bins': bins})
+            raise AssertionError(f"bins={bins!r} was accepted")
+        except ValueError:
+            pass
+
+    print("  ✓ Bins option working correctly\n")
+
+def test_chart_columns():
+    """Test that a chart only sends the columns it draws"""
+    print("Testing chart column selection...")
+
+    df = pd.DataFrame({'x': [1, 2], 'y': [3, 4], 'group': ['a', 'b'], 'note': ['n', 'm']})
+    scatter = render_options({'chart_type': 'scatter', 'x_column': 'x', 'y_column': 'y', 'color_column': 'group'})
+    assert chart_columns(df, scatter) == ['x', 'y', 'group']
+    assert chart_columns(df, render_options({'chart_type': 'box', 'x_column': 'y'})) == ['y']
+    assert chart_columns(df, render_options({'chart_type': 'heatmap'})) == ['x', 'y']
+    try:
+        chart_columns(df, render_options({'chart_type': 'histogram', 'x_column': 'missing'}))
+        raise AssertionError("A missing column was accepted")
+    except ValueError:
+        pass
+
+    print("  ✓ Chart columns selected correctly\n")
+
+def test_box_outliers_shared():
+    """Test that both renderers draw the same capped outliers, extremes included"""
+    print("Testing shared box plot statistics...")
+
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 1, 5000), rng.normal(0, 40, 400)])
+    df = pd.DataFrame({'value': values})
+
+    stats = box_statistics(df['value'], max_outliers=40)
+    assert len(stats['outliers']) <= 40
+    assert stats['outliers'].min() == values.min() and stats['outliers'].max() == values.max()
+
+    figure = json.loads(create_box_plot(df, 'value', max_outliers=40))
+    np.testing.assert_allclose(figure['data'][1]['y'], stats['outliers'])
+
+    ax = RecordingAxes()
+    _draw(ax, df, render_options({'chart_type': 'box', 'x_column': 'value', 'max_outliers': 40}))
+    np.testing.assert_allclose(ax.boxes[0]['fliers'], stats['outliers'])
+    assert ax.boxes[0]['whishi'] == stats['upper_fence']
+
+    print("  ✓ Box plot statistics shared by both renderers\n")
+
+def test_render_endpoint(client):
+    """Test /render with a named bins rule and /render/batch caching"""
+    print("Testing render endpoints...")
+
+    records = [{'week': i, 'incidents': i % 7, 'site': f's{i % 3}'} for i in range(200)]
+
+    response = client.post('/api/v1/render', json={
+        'data': records, 'chart_type': 'histogram', 'x_column': 'incidents', 'bins': 'fd'
+    })
+    assert response.status_code == 200 and response.mimetype == 'image/png'
+    assert response.headers['X-Cache'] == 'MISS'
+
+    response = client.post('/api/v1/render', json={
+        'data': records, 'chart_type': 'histogram', 'x_column': 'missing'
+    })
+    assert response.status_code == 400
+
+    response = client.post('/api/v1/render/batch', json={
+        'data': records,
+        'charts': [
+            {'chart_type': 'histogram', 'x_column': 'incidents', 'bins': 'fd'},
+            {'chart_type': 'box', 'x_column': 'incidents'},
+            {'chart_type': 'histogram', 'x_column': 'site'}
+        ]
+    })
+    images = response.get_json()['images']
+    assert response.status_code == 200
+    assert [image['status'] for image in images] == ['success'] * 3
+    # Same data and options as the /render request above
+    assert images[0]['cache'] == 'HIT' and images[1]['cache'] == 'MISS'
+
+    print("  ✓ Render endpoints working correctly\n")
+
+if __name__ == "__main__":
+    # The endpoint test uses the client fixture from conftest.py
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for server-side chart aggregation and heatmap correlations
+"""
+
+import sys
+import json
+import base64
+import numpy as np
+import pandas as pd
+from backend.utils.visualization import (create_histogram, histogram_counts, correlation_matrix, select_correlations,
+                                        create_scatter_plot, create_heatmap,
+                                        MAX_HISTOGRAM_BINS, MAX_HISTOGRAM_CATEGORIES)
+
+def test_histogram_bounded_size():
+    """Test that histogram payloads do not grow with the number of rows"""
+    print("Testing histogram sizes...")
+    
+    rng = np.random.default_rng(0)
+    n = 100000
+    df = pd.DataFrame({
+        'value': rng.normal(size=n),
+        'reported_at': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, n), unit='min'),
+        'site': rng.integers(0, 5000, n).astype(str)
+    })
+    
+    for column in df.columns:
+        small = create_histogram(df.iloc[:n // 10], column, bins=50)
+        large = create_histogram(df, column, bins=50)
+        assert len(large) < 1.5 * len(small), column
+    
+    histogram = histogram_counts(df['reported_at'], bins=10000)
+    assert histogram['kind'] == 'datetime'
+    assert len(histogram['counts']) == MAX_HISTOGRAM_BINS
+    assert histogram['counts'].sum() == n
+    assert histogram['edges'][0] == df['reported_at'].min()
+    
+    histogram = histogram_counts(df['site'])
+    assert len(histogram['labels']) == MAX_HISTOGRAM_CATEGORIES + 1
+    assert histogram['labels'][-1].startswith('Other')
+    assert histogram['counts'].sum() == n
+    
+    # Few categories keep their order of appearance
+    assert histogram_counts(pd.Series(['b', 'a', 'b']))['labels'] == ['b', 'a']
+    
+    figure = json.loads(create_histogram(df, 'reported_at', bins=12))
+    assert len(figure['data'][0]['x']) == 12
+    
+    print("  ✓ Histogram sizes bounded\n")
+
+def test_correlations_with_missing_values():
+    """Test that chunked correlations match pandas' pairwise-complete DataFrame.corr"""
+    print("Testing heatmap correlations with missing values...")
+    
+    rng = np.random.default_rng(0)
+    n = 5000
+    a = rng.normal(size=n)
+    df = pd.DataFrame({
+        'a': a,
+        'b': a + 0.1 * rng.normal(size=n),
+        'c': rng.normal(size=n),
+        'd': -3 * a + rng.normal(size=n),
+        'e': rng.normal(size=n)
+    })
+    df.loc[::2, 'a'] = np.nan
+    df.loc[100:900, 'c'] = np.nan
+    # 'e' shares a single row with 'a', too few for a correlation
+    df.loc[df.index[1::2][1:], 'e'] = np.nan
+    df['site'] = 'north'
+    
+    correlations = correlation_matrix(df, chunk_size=700)
+    expected = df.corr(numeric_only=True)
+    assert list(correlations.columns) == list(expected.columns)
+    np.testing.assert_allclose(correlations.to_numpy(), expected.to_numpy(), atol=1e-4)
+    assert correlations.loc['a', 'b'] > 0.99
+    
+    # Constant columns are left out and clustering copes with missing pairs
+    selected = select_correlations(df.assign(constant=1.0), top_k=4)
+    assert 'constant' not in selected.columns and len(selected) == 4
+    
+    print("  ✓ Correlations match pandas\n")
+
+def _decode_typed(value):
+    # Reverse of the typed encoding: {"dtype", "bdata", "shape"} back to lists
+    if isinstance(value, dict):
+        if 'bdata' in value:
+            array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype('<' + value['dtype']))
+            if 'shape' in value:
+                array = array.reshape([int(size) for size in value['shape'].split(',')])
+            return array.tolist()
+        return {key: _decode_typed(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_typed(item) for item in value]
+    return value
+
+def test_typed_figure_encoding():
+    """Test that typed figures are smaller and decode to the plain figure's values"""
+    print("Testing typed array figure encoding...")
+    
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({'x': np.arange(n), 'y': rng.normal(size=n), 'crew': rng.integers(2, 12, n)})
+    plain = create_scatter_plot(df, 'x', 'y', encoding='object')
+    typed = create_scatter_plot(df, 'x', 'y', encoding='typed')
+    assert len(json.dumps(typed)) < len(json.dumps(plain)) / 2
+    
+    trace = typed['data'][0]
+    # Integers use the smallest type that holds them; plotly.js has no 64-bit integers
+    assert trace['x']['dtype'] == 'i2'
+    assert _decode_typed(trace['x']) == plain['data'][0]['x']
+    # Floats only drop to float32 when that cannot change the chart
+    np.testing.assert_allclose(_decode_typed(trace['y']), plain['data'][0]['y'], atol=1e-6 * np.ptp(df['y']))
+    
+    # Matrices keep their shape
+    z = create_heatmap(df, encoding='typed')['data'][0]['z']
+    assert z['shape'] == '3,3'
+    np.testing.assert_allclose(_decode_typed(z), create_heatmap(df, encoding='object')['data'][0]['z'], atol=1e-6)
+    
+    # NaN and short arrays stay plain JSON lists
+    with_gaps = df.head(20).astype({'y': float})
+    with_gaps.loc[3, 'y'] = np.nan
+    trace = create_scatter_plot(with_gaps, 'x', 'y', encoding='typed')['data'][0]
+    assert isinstance(trace['y'], list) and trace['y'][3] is None
+    trace = create_scatter_plot(df.head(5), 'x', 'y', encoding='typed')['data'][0]
+    assert isinstance(trace['x'], list)
+    
+    print("  ✓ Typed array encoding working correctly\n")
+
+if __name__ == "__main__":
+    test_histogram_bounded_size()
+    test_correlations_with_missing_values()
+    test_typed_figure_encoding()
+    sys.exit(0)
@@ -0,0 +1,157 @@
+import pandas as pd
+import numpy as np
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _BatchMetrics:
+    """
+    Counters and recent samples of batch sizes and queue delays
+    """
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self._batch_sizes = deque(maxlen=window)
+        self._queue_delays = deque(maxlen=window)
+
+    def record(self, n_requests, n_rows, queue_delays):
+        with self._lock:
+            self.batches += 1
+            self.requests += n_requests
+            self.rows += n_rows
+            self._batch_sizes.append(n_rows)
+            self._queue_delays.extend(queue_delays)
+
+    def snapshot(self):
+        with self._lock:
+            sizes = np.array(self._batch_sizes, dtype=float)
+            delays = np.array(self._queue_delays, dtype=float) * 1000
+            counters = {
+                'batches': self.batches,
+                'requests': self.requests,
+                'rows': self.rows,
+                'fallbacks': self.fallbacks
+            }
+        summary = lambda values: {
+            'mean': float(values.mean()),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(values.max())
+        } if len(values) else None
+        counters['batch_rows'] = summary(sizes)
+        counters['queue_delay_ms'] = summary(delays)
+        counters['requests_per_batch'] = self.requests / self.batches if self.batches else None
+        return counters
+
+class MicroBatchPredictor:
+    """
+    Coalesces concurrent prediction requests for the same model into one
+    vectorized model.predict call.
+
+    Each model gets a worker thread. The first queued request opens a batch,
+    which is closed after max_wait_ms or once it holds max_batch_rows rows;
+    every caller then receives its own slice of the predictions. Workers exit
+    after idle_timeout seconds without requests.
+    """
+
+    def __init__(self, max_batch_rows=256, max_wait_ms=5, idle_timeout=60, request_timeout=30):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.idle_timeout = idle_timeout
+        self.request_timeout = request_timeout
+        self.metrics = _BatchMetrics()
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def predict(self, model_key, model, df):
+        """
+        Predict df with model, batched with concurrent calls for the same model_key
+        """
+        future = Future()
+        with self._lock:
+            requests = self._queues.get(model_key)
+            if requests is None:
+                requests = self._queues[model_key] = queue.Queue()
+                threading.Thread(target=self._worker, args=(model_key, requests),
+                                 name=f"predict-batcher-{model_key}", daemon=True).start()
+            requests.put((model, df, time.monotonic(), future))
+        return future.result(timeout=self.request_timeout)
+
+    def _worker(self, model_key, requests):
+        while True:
+            try:
+                first = requests.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # Re-check under the lock: predict() only enqueues while holding it
+                    if requests.empty():
+                        del self._queues[model_key]
+                        return
+                continue
+
+            batch = [first]
+            n_rows = len(first[1])
+            deadline = first[2] + self.max_wait
+            while n_rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_rows += len(item[1])
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        queue_delays = [started - queued_at for _, _, queued_at, _ in batch]
+        model = batch[0][0]
+        frames = [df for _, df, _, _ in batch]
+        try:
+            predictions = np.asarray(model.predict(pd.concat(frames, ignore_index=True)))
+        except Exception:
+            # One malformed request should not fail the others: fall back to
+            # predicting each request separately so errors reach only their caller
+            with self.metrics._lock:
+                self.metrics.fallbacks += 1
+            self.metrics.record(len(batch), sum(len(df) for df in frames), queue_delays)
+            for item_model, df, _, future in batch:
+                try:
+                    future.set_result(np.asarray(item_model.predict(df)))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        self.metrics.record(len(batch), len(predictions), queue_delays)
+        offset = 0
+        for _, df, _, future in batch:
+            future.set_result(predictions[offset:offset + len(df)])
+            offset += len(df)
+
+    def stats(self):
+        """
+        Batching configuration and metrics for this worker process
+        """
+        with self._lock:
+            active_models = len(self._queues)
+        metrics = self.metrics.snapshot()
+        metrics.update({
+            'max_batch_rows': self.max_batch_rows,
+            'max_wait_ms': self.max_wait * 1000,
+            'active_models': active_models
+        })
+        return metrics
@@ -0,0 +1,324 @@
+import pandas as pd
+import numpy as np
+import importlib.util
+import json
+import os
+from io import BytesIO
+import logging
+
+# Arrow and Parquet support is optional. pyarrow is imported on first use, so
+# workers that never see those formats do not pay for loading it.
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Content types accepted for tabular request bodies
+JSON_TYPES = {'application/json'}
+CSV_TYPES = {'text/csv', 'application/csv'}
+ARROW_STREAM_TYPES = {'application/vnd.apache.arrow.stream', 'application/x-arrow-stream'}
+ARROW_FILE_TYPES = {'application/vnd.apache.arrow.file', 'application/x-arrow', 'application/octet-stream+arrow'}
+PARQUET_TYPES = {'application/vnd.apache.parquet', 'application/x-parquet', 'application/parquet'}
+MULTIPART_TYPES = {'multipart/form-data'}
+
+# File extensions for multipart uploads
+EXTENSION_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow_file',
+    '.feather': 'arrow_file',
+    '.ipc': 'arrow_file',
+    '.arrows': 'arrow_stream',
+    '.json': 'json'
+}
+
+class RequestDataError(ValueError):
+    """
+    Raised when a request body cannot be decoded into a DataFrame
+    """
+    pass
+
+def _require_pyarrow(format_name):
+    """
+    Import and return pyarrow with its IPC module loaded
+    """
+    if not PYARROW_AVAILABLE:
+        raise RequestDataError(f"{format_name} payloads require pyarrow, which is not installed")
+    import pyarrow as pa
+    import pyarrow.ipc
+    return pa
+
+def dataframe_from_json(data):
+    """
+    Build a DataFrame from the JSON 'data' field: either a list of row objects
+    or a column-oriented object mapping column names to equal-length arrays
+    """
+    if isinstance(data, dict):
+        # Column-oriented JSON is converted column by column, skipping
+        # per-row dict handling and object-dtype inference across rows
+        return pd.DataFrame({column: pd.Series(values) for column, values in data.items()})
+    return pd.DataFrame(data)
+
+def dataframe_from_bytes(body, data_format):
+    """
+    Decode a binary or text table body into a DataFrame with typed columns
+    """
+    if data_format == 'csv':
+        return pd.read_csv(BytesIO(body))
+    if data_format == 'parquet':
+        _require_pyarrow('Parquet')
+        import pyarrow.parquet as pq
+        return pq.read_table(BytesIO(body)).to_pandas()
+    if data_format == 'arrow_stream':
+        pa = _require_pyarrow('Arrow')
+        return pa.ipc.open_stream(pa.BufferReader(body)).read_all().to_pandas()
+    if data_format == 'arrow_file':
+        pa = _require_pyarrow('Arrow')
+        return pa.ipc.open_file(pa.BufferReader(body)).read_all().to_pandas()
+    if data_format == 'json':
+        payload = json.loads(body)
+        return dataframe_from_json(payload['data'] if isinstance(payload, dict) and 'data' in payload else payload)
+    raise RequestDataError(f"Unsupported data format: {data_format}")
+
+def _format_for_content_type(content_type):
+    if content_type in CSV_TYPES:
+        return 'csv'
+    if content_type in PARQUET_TYPES:
+        return 'parquet'
+    if content_type in ARROW_STREAM_TYPES:
+        return 'arrow_stream'
+    if content_type in ARROW_FILE_TYPES:
+        return 'arrow_file'
+    if content_type in JSON_TYPES:
+        return 'json'
+    return None
+
+def _parse_param(value):
+    """
+    Decode a query-string or form parameter ('true', '5', '["a"]') into a JSON value
+    """
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+def request_params(request):
+    """
+    Collect non-data parameters from the query string and form fields
+    """
+    params = {key: _parse_param(value) for key, value in request.args.items()}
+    params.update({key: _parse_param(value) for key, value in request.form.items()})
+    return params
+
+def read_request_data(request):
+    """
+    Read the tabular payload and parameters of a request.
+
+    The body format is selected by Content-Type:
+    - application/json: {"data": [...rows...] or {"column": [...]}, ...params}
+    - text/csv, Parquet and Arrow IPC (stream or file) bodies, with parameters
+      in the query string
+    - multipart/form-data with the table in a 'file' field (format from its
+      content type or extension) and parameters in form fields
+
+    Returns (DataFrame or None when no data was sent, params dict).
+    """
+    content_type = request.mimetype
+
+    if content_type in JSON_TYPES or not content_type:
+        payload = request.get_json(force=not content_type, silent=True)
+        if not isinstance(payload, dict):
+            return None, request_params(request)
+        params = {key: value for key, value in payload.items() if key != 'data'}
+        params.update(request_params(request))
+        if 'data' not in payload:
+            return None, params
+        return dataframe_from_json(payload['data']), params
+
+    if content_type in MULTIPART_TYPES:
+        params = request_params(request)
+        upload = request.files.get('file') or request.files.get('data')
+        if upload is None:
+            return None, params
+        data_format = _format_for_content_type(upload.mimetype)
+        if data_format is None:
+            extension = os.path.splitext(upload.filename or '')[1].lower()
+            data_format = EXTENSION_FORMATS.get(extension)
+        if data_format is None:
+            raise RequestDataError(f"Cannot determine the format of uploaded file {upload.filename}")
+        return _decode_body(upload.read(), data_format), params
+
+    data_format = _format_for_content_type(content_type)
+    if data_format is None:
+        raise RequestDataError(f"Unsupported Content-Type: {content_type}")
+    params = request_params(request)
+    body = request.get_data(cache=False)
+    if not body:
+        return None, params
+    return _decode_body(body, data_format), params
+
+def _decode_body(body, data_format):
+    try:
+        return dataframe_from_bytes(body, data_format)
+    except RequestDataError:
+        raise
+    except Exception as e:
+        raise RequestDataError(f"Failed to decode {data_format} payload: {str(e)}")
+
+# Streaming response formats
+NDJSON_TYPE = 'application/x-ndjson'
+ARROW_STREAM_TYPE = 'application/vnd.apache.arrow.stream'
+STREAM_FORMATS = {'ndjson': NDJSON_TYPE, 'arrow': ARROW_STREAM_TYPE}
+
+def to_json_safe(value):
+    """
+    Convert numpy/pandas values (scalars, dtypes, NaN, tuples) into plain JSON types
+    """
+    if isinstance(value, dict):
+        return {str(key): to_json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(item) for item in value]
+    if isinstance(value, (str, bool, int)) or value is None:
+        return value
+    if isinstance(value, float):
+        return None if np.isnan(value) else value
+    if isinstance(value, np.generic):
+        return to_json_safe(value.item())
+    if value is pd.NaT:
+        return None
+    return str(value)
+
+def response_stream_format(request, params):
+    """
+    Streaming format requested with the 'stream' parameter ('ndjson' or
+    'arrow') or an Accept header naming one of the streaming types.
+    Returns None for a regular JSON response.
+    """
+    requested = params.get('stream')
+    if requested in STREAM_FORMATS:
+        return requested
+    accept = request.accept_mimetypes
+    for format_name, mimetype in STREAM_FORMATS.items():
+        if accept[mimetype] > accept['application/json']:
+            return format_name
+    return None
+
+def iter_ndjson(df, chunk_size=10000, trailer=None):
+    """
+    Yield a DataFrame as newline-delimited JSON, one chunk of rows at a time.
+    trailer is an optional callable returning a final record (for example the
+    summary statistics); it is only evaluated after every row has been sent.
+    """
+    for start in range(0, len(df), chunk_size):
+        lines = df.iloc[start:start + chunk_size].to_json(orient='records', lines=True, date_format='iso')
+        yield lines if lines.endswith('\n') else lines + '\n'
+    if trailer is not None:
+        yield json.dumps(to_json_safe(trailer())) + '\n'
+
+def iter_arrow_stream(df, chunk_size=10000, trailer=None):
+    """
+    Yield a DataFrame as an Arrow IPC stream: the schema message first, then
+    one record batch per chunk of rows. trailer is an optional callable
+    returning a dict that is sent, after every row, as the JSON-encoded custom
+    metadata of a final empty record batch.
+    """
+    pa = _require_pyarrow('Arrow')
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    sink = BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def flush():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield flush()
+    for start in range(0, len(df), chunk_size):
+        batch = pa.RecordBatch.from_pandas(df.iloc[start:start + chunk_size], schema=schema, preserve_index=False)
+        writer.write_batch(batch)
+        yield flush()
+    if trailer is not None:
+        metadata = {key: json.dumps(to_json_safe(value)) for key, value in trailer().items()}
+        empty = pa.RecordBatch.from_pandas(df.iloc[:0], schema=schema, preserve_index=False)
+        writer.write_batch(empty, custom_metadata=metadata)
+        yield flush()
+    writer.close()
+    yield flush()
+
+def iter_dataframe_chunks(df, chunk_size=10000):
+    """
+    Yield consecutive row slices of an in-memory DataFrame
+    """
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def iter_csv_chunks(path, chunk_size=10000):
+    """
+    Yield a CSV file as DataFrames of at most chunk_size rows, reading one chunk at a time
+    """
+    with pd.read_csv(path, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield chunk
+
+def count_csv_rows(path, block_size=1 << 20):
+    """
+    Estimate the data rows of a CSV file from its line breaks, without parsing
+    it (quoted values spanning several lines are counted once per line)
+    """
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    # The first line is the header
+    return max(lines - 1, 0)
+
+class ChunkSource:
+    """
+    Re-iterable chunk source: calling it returns a fresh iterator of
+    DataFrames. row_count is the (estimated) number of rows of one pass when
+    it is known up front, otherwise None.
+    """
+
+    def __init__(self, iterate, row_count=None):
+        self.iterate = iterate
+        self.row_count = row_count
+
+    def __call__(self):
+        return self.iterate()
+
+def open_chunk_source(source, chunk_size=10000, dataset_store=None, credentials_path=None):
+    """
+    Turn a source description into a ChunkSource, a callable returning a
+    fresh iterator of DataFrames each time it is called.
+
+    source is one of {'dataset_id': ...}, {'csv_path': ...} or
+    {'collection_name': ...}. Dataset IDs are looked up in dataset_store.
+    Collections are read as source['partition_count'] parallel key ranges
+    when that is above 1; their size is not known in advance.
+    """
+    if source.get('dataset_id'):
+        if dataset_store is None:
+            raise RequestDataError("No dataset store is available")
+        try:
+            df = dataset_store.get(source['dataset_id'])
+        except KeyError:
+            raise RequestDataError(f"Unknown dataset_id {source['dataset_id']}")
+        return ChunkSource(lambda: iter_dataframe_chunks(df, chunk_size), len(df))
+    if source.get('csv_path'):
+        if not os.path.isfile(source['csv_path']):
+            raise RequestDataError(f"CSV file {source['csv_path']} not found")
+        return ChunkSource(lambda: iter_csv_chunks(source['csv_path'], chunk_size), count_csv_rows(source['csv_path']))
+    if source.get('collection_name'):
+        # Imported here so Firebase is only loaded when a Firestore source is used
+        from backend.utils.firebase_utils import FirestoreManager
+        manager = FirestoreManager(credentials_path)
+        partition_count = int(source.get('partition_count', 1))
+        return ChunkSource(lambda: manager.iter_collection_chunks(source['collection_name'], chunk_size, partition_count))
+    raise RequestDataError("A dataset_id, csv_path or collection_name source is required")
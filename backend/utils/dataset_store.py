@@ -0,0 +1,149 @@
+import pandas as pd
+import hashlib
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATASET_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+def dataset_fingerprint(df):
+    """
+    Content hash of a DataFrame (column names, dtypes and values), used as its dataset ID
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+class DatasetStore:
+    """
+    Byte-budgeted LRU store of DataFrames keyed by content-addressed dataset IDs.
+
+    Datasets are kept in memory up to max_bytes; the least recently used ones are
+    evicted first. When spill_path is set every dataset is also written there, so
+    evicted datasets (and datasets uploaded through another worker process) can be
+    loaded back from disk.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, spill_path=None):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.current_bytes = 0
+        self._datasets = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        if spill_path:
+            os.makedirs(spill_path, exist_ok=True)
+
+    def _spill_file(self, dataset_id):
+        return os.path.join(self.spill_path, f"{dataset_id}.pkl")
+
+    def _insert(self, dataset_id, df, size):
+        # Caller holds the lock
+        if dataset_id in self._datasets:
+            self._datasets.move_to_end(dataset_id)
+            return
+        self._datasets[dataset_id] = df
+        self._sizes[dataset_id] = size
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes and len(self._datasets) > 1:
+            evicted_id, _ = self._datasets.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(evicted_id)
+            logger.info(f"Evicted dataset {evicted_id} from memory")
+
+    def put(self, df):
+        """
+        Store a DataFrame and return its dataset ID
+        """
+        dataset_id = dataset_fingerprint(df)
+        size = int(df.memory_usage(deep=True).sum())
+
+        if self.spill_path and not os.path.exists(self._spill_file(dataset_id)):
+            # Write to a temporary file first so other workers never read a partial file
+            tmp_file = f"{self._spill_file(dataset_id)}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_file)
+            os.replace(tmp_file, self._spill_file(dataset_id))
+
+        with self._lock:
+            self._insert(dataset_id, df, size)
+        return dataset_id
+
+    def get(self, dataset_id):
+        """
+        Return the DataFrame for a dataset ID, loading it from disk if it was
+        evicted from memory. Raises KeyError for unknown IDs.
+        """
+        if not DATASET_ID_PATTERN.match(str(dataset_id)):
+            raise KeyError(dataset_id)
+        with self._lock:
+            if dataset_id in self._datasets:
+                self._datasets.move_to_end(dataset_id)
+                return self._datasets[dataset_id]
+
+        if self.spill_path and os.path.isfile(self._spill_file(dataset_id)):
+            df = pd.read_pickle(self._spill_file(dataset_id))
+            size = int(df.memory_usage(deep=True).sum())
+            with self._lock:
+                self._insert(dataset_id, df, size)
+            return df
+
+        raise KeyError(dataset_id)
+
+    def exists(self, dataset_id):
+        """
+        Whether a dataset ID is stored, in memory or on disk, without loading it
+        """
+        if not DATASET_ID_PATTERN.match(str(dataset_id)):
+            return False
+        with self._lock:
+            if dataset_id in self._datasets:
+                return True
+        return bool(self.spill_path) and os.path.isfile(self._spill_file(dataset_id))
+
+    def info(self, dataset_id):
+        """
+        Describe a stored dataset
+        """
+        df = self.get(dataset_id)
+        return {
+            'dataset_id': dataset_id,
+            'rows': len(df),
+            'columns': list(df.columns),
+            'memory_bytes': self._sizes.get(dataset_id),
+            'in_memory': dataset_id in self._datasets
+        }
+
+    def delete(self, dataset_id):
+        """
+        Remove a dataset from memory and disk. Returns False if it did not exist.
+        """
+        if not DATASET_ID_PATTERN.match(str(dataset_id)):
+            return False
+        found = False
+        with self._lock:
+            if dataset_id in self._datasets:
+                del self._datasets[dataset_id]
+                self.current_bytes -= self._sizes.pop(dataset_id)
+                found = True
+        if self.spill_path and os.path.isfile(self._spill_file(dataset_id)):
+            os.remove(self._spill_file(dataset_id))
+            found = True
+        return found
+
+    def stats(self):
+        """
+        Memory usage of the store
+        """
+        with self._lock:
+            return {
+                'datasets_in_memory': len(self._datasets),
+                'memory_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
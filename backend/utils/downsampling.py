@@ -0,0 +1,168 @@
+import pandas as pd
+import numpy as np
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LINE_METHODS = ('lttb', 'minmax')
+SCATTER_METHODS = ('sample', 'bin')
+
+def _numeric_axis(values):
+    """
+    Numeric positions for an x axis: numbers as-is, datetimes as int64,
+    anything else (e.g. category labels) by row position
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+def _bucket_edges(n, n_buckets):
+    # Buckets over the points between the fixed first and last point
+    return np.linspace(1, n - 1, n_buckets + 1).astype(int)
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last point and, per
+    bucket, the point forming the largest triangle with the previously kept
+    point and the next bucket's average. Preserves peaks and the line shape.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, max_points - 2)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # Twice the triangle areas for every candidate point in the bucket
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax_indices(y, max_points):
+    """
+    Keep the minimum and maximum point of each bucket (plus the endpoints);
+    cheaper than LTTB and keeps every extreme value
+    """
+    n = len(y)
+    if max_points >= n or max_points < 4:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, (max_points - 2) // 2)
+    starts = edges[:-1]
+    # Buckets are contiguous, so reduceat gives each bucket's min and max
+    mins = np.minimum.reduceat(y[1:n - 1], starts - 1)
+    maxs = np.maximum.reduceat(y[1:n - 1], starts - 1)
+    bucket_of = np.repeat(np.arange(len(starts)), np.diff(edges))
+    positions = np.arange(1, n - 1)
+    segment = y[1:n - 1]
+    # First occurrence of each bucket's min / max
+    is_min = segment == mins[bucket_of]
+    is_max = segment == maxs[bucket_of]
+    min_index = positions[is_min][np.unique(bucket_of[is_min], return_index=True)[1]]
+    max_index = positions[is_max][np.unique(bucket_of[is_max], return_index=True)[1]]
+    return np.unique(np.concatenate(([0, n - 1], min_index, max_index)))
+
+def downsample_line(df, x_column, y_column, max_points, method='lttb'):
+    """
+    Reduce a line series to at most max_points points with a shape-preserving
+    method ('lttb' or 'minmax'). Rows are ordered by x first, as a line is
+    drawn in that order. Raises ValueError when y is neither numeric nor
+    datetime. Returns (DataFrame, reduction report).
+    """
+    if method not in LINE_METHODS:
+        raise ValueError(f"Unknown line downsampling method {method}; use one of {list(LINE_METHODS)}")
+
+    original_points = len(df)
+    reduction = {'method': None, 'original_points': original_points, 'points': original_points, 'max_points': max_points}
+    if not max_points or original_points <= max_points:
+        return df, reduction
+
+    series = df.dropna(subset=[y_column])
+    if not (pd.api.types.is_numeric_dtype(series[y_column]) or pd.api.types.is_datetime64_any_dtype(series[y_column])):
+        raise ValueError(f"Column {y_column} must be numeric or datetime to downsample a line chart")
+    if pd.api.types.is_numeric_dtype(series[x_column]) or pd.api.types.is_datetime64_any_dtype(series[x_column]):
+        series = series.sort_values(x_column, kind='stable')
+    x = _numeric_axis(series[x_column])
+    y = _numeric_axis(series[y_column])
+
+    if method == 'lttb':
+        indices = lttb_indices(x, y, max_points)
+    else:
+        indices = minmax_indices(y, max_points)
+
+    reduced = series.iloc[indices]
+    reduction.update({'method': method, 'points': len(reduced)})
+    return reduced, reduction
+
+def downsample_scatter(df, x_column, y_column, max_points, method='sample', color_column=None, random_state=42):
+    """
+    Reduce a scatter plot to roughly max_points points.
+
+    'sample' keeps a uniform random sample. 'bin' lays a grid over the plot
+    (per color group) and keeps one point per occupied cell, which thins
+    dense regions while keeping sparse points and outliers.
+    Returns (DataFrame, reduction report).
+    """
+    if method not in SCATTER_METHODS:
+        raise ValueError(f"Unknown scatter downsampling method {method}; use one of {list(SCATTER_METHODS)}")
+
+    original_points = len(df)
+    reduction = {'method': None, 'original_points': original_points, 'points': original_points, 'max_points': max_points}
+    if not max_points or original_points <= max_points:
+        return df, reduction
+
+    if method == 'sample':
+        reduced = df.sample(n=max_points, random_state=random_state).sort_index()
+    else:
+        df = df.dropna(subset=[x_column, y_column])
+        n_groups = df[color_column].nunique(dropna=False) if color_column else 1
+        axes = []
+        for column in (x_column, y_column):
+            values = _numeric_axis(df[column])
+            low, high = values.min(), values.max()
+            axes.append(((values - low) / (high - low)) if high > low else np.zeros(len(values)))
+        
+        def first_point_per_cell(cells_per_axis):
+            cells = pd.DataFrame({
+                'x_bin': np.minimum((axes[0] * cells_per_axis).astype(int), cells_per_axis - 1),
+                'y_bin': np.minimum((axes[1] * cells_per_axis).astype(int), cells_per_axis - 1)
+            }, index=df.index)
+            if color_column:
+                cells['group'] = df[color_column].to_numpy()
+            return ~cells.duplicated().to_numpy()
+        
+        # Real data leaves many cells empty, so refine the grid while the
+        # occupied cells still fit the budget
+        base = np.sqrt(max_points / n_groups)
+        cells_per_axis = max(1, int(base))
+        keep = first_point_per_cell(cells_per_axis)
+        for factor in (np.sqrt(2), 2, 2 * np.sqrt(2), 4):
+            finer = max(1, int(base * factor))
+            finer_keep = first_point_per_cell(finer)
+            if finer_keep.sum() > max_points:
+                break
+            cells_per_axis, keep = finer, finer_keep
+        reduced = df.loc[keep]
+        reduction['grid'] = [cells_per_axis, cells_per_axis]
+
+    reduction.update({'method': method, 'points': len(reduced)})
+    return reduced, reduction
@@ -1,55 +1,151 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 import pandas as pd
+import numpy as np
 import json
 import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+# Filters that can be combined with the key order of a partitioned read
+PARTITIONED_QUERY_OPERATORS = ('==', 'in', 'array_contains', 'array_contains_any')
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_firestore_client(credentials_path=None):
+    """
+    Return this process's Firestore client, initializing Firebase on first use.
+    The client (and its gRPC channel pool) is shared by every request in the
+    process. A forked process (a gunicorn worker or a job pool process) builds
+    its own, as gRPC channels do not survive fork.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            if not firebase_admin._apps:
+                try:
+                    if credentials_path and os.path.exists(credentials_path):
+                        cred = credentials.Certificate(credentials_path)
+                    else:
+                        # Try to use default credentials
+                        cred = credentials.ApplicationDefault()
+                    firebase_admin.initialize_app(cred)
+                except Exception as e:
+                    # If both methods fail, try without credentials (for development)
+                    try:
+                        firebase_admin.initialize_app()
+                    except Exception as e2:
+                        raise Exception(f"Failed to initialize Firebase: {str(e)} and {str(e2)}")
+            
+            # Not firestore.client(): that returns the client cached on the App,
+            # which a forked process inherits together with the parent's channel
+            app = firebase_admin.get_app()
+            if not app.project_id:
+                raise ValueError('Project ID is required to access Firestore. Set the projectId option, '
+                                 'use service account credentials or set GOOGLE_CLOUD_PROJECT.')
+            _client = firestore.Client(credentials=app.credential.get_credential(), project=app.project_id)
+            _client_pid = os.getpid()
+        return _client
+
+def _reset_client_lock():
+    # A fork while another thread held the lock would leave it locked forever in the child
+    global _client_lock
+    _client_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_client_lock)
+
+def _concat_chunks(chunks):
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
 
 class FirestoreManager:
     def __init__(self, credentials_path=None):
         """
         Initialize Firestore manager
         """
-        if not firebase_admin._apps:
-            try:
-                if credentials_path and os.path.exists(credentials_path):
-                    cred = credentials.Certificate(credentials_path)
-                else:
-                    # Try to use default credentials
-                    cred = credentials.ApplicationDefault()
-                firebase_admin.initialize_app(cred)
-            except Exception as e:
-                # If both methods fail, try without credentials (for development)
-                try:
-                    firebase_admin.initialize_app()
-                except Exception as e2:
-                    raise Exception(f"Failed to initialize Firebase: {str(e)} and {str(e2)}")
-        
-        self.db = firestore.client()
+        self.db = get_firestore_client(credentials_path)
     
-    def upload_dataframe(self, df, collection_name, batch_size=500):
+    def upload_dataframe(self, df, collection_name, batch_size=500, max_in_flight=8):
         """
-        Upload a pandas DataFrame to Firestore
+        Upload a pandas DataFrame to Firestore. Batches of batch_size documents
+        are committed concurrently, at most max_in_flight at a time. Returns
+        the record count with timing and throughput statistics.
         """
-        # Convert DataFrame to dictionary records
-        records = df.to_dict(orient='records')
+        batch_size = max(1, min(int(batch_size), MAX_BATCH_WRITES))
+        max_in_flight = max(1, int(max_in_flight))
+        collection = self.db.collection(collection_name)
+        latencies = []
         
-        # Upload in batches
-        for i in range(0, len(records), batch_size):
-            batch = self.db.batch()
-            batch_records = records[i:i+batch_size]
-            
-            for j, record in enumerate(batch_records):
-                doc_ref = self.db.collection(collection_name).document(f'record_{i+j}')
-                batch.set(doc_ref, record)
-            
+        def commit(batch):
+            started = time.perf_counter()
             batch.commit()
+            return time.perf_counter() - started
         
-        return f"Uploaded {len(records)} records to {collection_name}"
+        started = time.perf_counter()
+        committed = 0
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            in_flight = set()
+            try:
+                for i in range(0, len(df), batch_size):
+                    # Convert one batch at a time so only the batches in flight are held as dicts
+                    batch = self.db.batch()
+                    for j, record in enumerate(df.iloc[i:i+batch_size].to_dict(orient='records')):
+                        batch.set(collection.document(f'record_{i+j}'), record)
+                    
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            latencies.append(future.result())
+                            committed += 1
+                    in_flight.add(executor.submit(commit, batch))
+                
+                for future in in_flight:
+                    latencies.append(future.result())
+                    committed += 1
+            except Exception as e:
+                for future in in_flight:
+                    future.cancel()
+                raise Exception(f"Failed to upload to {collection_name} after {committed} batches: {str(e)}")
+        
+        elapsed = time.perf_counter() - started
+        latencies = np.array(latencies) * 1000
+        return {
+            'message': f"Uploaded {len(df)} records to {collection_name}",
+            'records': len(df),
+            'batches': committed,
+            'batch_size': batch_size,
+            'max_in_flight': max_in_flight,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(len(df) / elapsed, 1) if elapsed > 0 else None,
+            'commit_latency_ms': {
+                'mean': round(float(latencies.mean()), 1),
+                'p95': round(float(np.percentile(latencies, 95)), 1),
+                'max': round(float(latencies.max()), 1)
+            } if len(latencies) else None
+        }
     
-    def download_collection(self, collection_name):
+    def download_collection(self, collection_name, partition_count=1):
         """
-        Download a Firestore collection to a pandas DataFrame
+        Download a Firestore collection to a pandas DataFrame. With
+        partition_count > 1 the collection is read as that many key ranges
+        in parallel (see iter_partitioned_chunks).
         """
+        if partition_count > 1:
+            return _concat_chunks(self.iter_partitioned_chunks(collection_name, partition_count))
         try:
             docs = self.db.collection(collection_name).stream()
             records = []
@@ -64,10 +160,137 @@ class FirestoreManager:
         except Exception as e:
             raise Exception(f"Failed to download collection {collection_name}: {str(e)}")
     
-    def query_collection(self, collection_name, field, operator, value):
+    def iter_collection_chunks(self, collection_name, chunk_size=5000, partition_count=1):
+        """
+        Yield a Firestore collection as DataFrames of at most chunk_size documents,
+        paging with a cursor so only one chunk is held in memory. With
+        partition_count > 1 the chunks come from parallel key-range reads, in
+        completion order.
+        """
+        if partition_count > 1:
+            yield from self.iter_partitioned_chunks(collection_name, partition_count, chunk_size)
+            return
+        try:
+            query = self.db.collection(collection_name).order_by('__name__').limit(chunk_size)
+            last_doc = None
+            while True:
+                page = query.start_after(last_doc) if last_doc is not None else query
+                docs = list(page.stream())
+                if not docs:
+                    break
+                
+                records = []
+                for doc in docs:
+                    record = doc.to_dict()
+                    record['id'] = doc.id
+                    records.append(record)
+                yield pd.DataFrame(records)
+                
+                if len(docs) < chunk_size:
+                    break
+                last_doc = docs[-1]
+        except Exception as e:
+            raise Exception(f"Failed to read collection {collection_name}: {str(e)}")
+    
+    def _partition_queries(self, collection_name, partition_count):
+        """
+        Split a collection into at most partition_count key ranges with
+        Firestore's partition query and return one query per range. Falls back
+        to a single query when the collection cannot be partitioned.
+        """
+        if partition_count <= 1:
+            return [self.db.collection(collection_name)]
+        try:
+            # The count is of split points, one fewer than the number of ranges
+            partitions = list(self.db.collection_group(collection_name).get_partitions(partition_count - 1))
+        except Exception as e:
+            logger.warning(f"Could not partition {collection_name}, reading it with one cursor: {str(e)}")
+            return [self.db.collection(collection_name)]
+        return [partition.query() for partition in partitions]
+    
+    def iter_partitioned_chunks(self, collection_name, partition_count=4, chunk_size=5000, field=None, operator=None,
+                                value=None):
+        """
+        Yield a Firestore collection (optionally filtered on field) as
+        DataFrames of at most chunk_size documents, reading up to
+        partition_count key ranges concurrently. Chunks are yielded as they
+        complete, so their order is not the document order; a bounded queue
+        keeps at most two chunks per range waiting in memory.
+        
+        Partitions come from a collection group query, so documents of
+        subcollections with the same name are read and skipped. A filter needs
+        a collection group index on the field and an equality-style operator.
+        """
+        if field is not None and operator not in PARTITIONED_QUERY_OPERATORS:
+            raise ValueError(f"Partitioned reads support the operators {list(PARTITIONED_QUERY_OPERATORS)}")
+        
+        queries = self._partition_queries(collection_name, partition_count)
+        if field is not None:
+            queries = [query.where(field, operator, value) for query in queries]
+        
+        chunks = queue.Queue(maxsize=2 * len(queries))
+        stop = threading.Event()
+        finished = object()
+        
+        def put(item):
+            # Give up once the consumer has stopped reading
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def read(query):
+            try:
+                records = []
+                for doc in query.stream():
+                    if stop.is_set():
+                        return
+                    if doc.reference.parent.parent is not None:
+                        # Same-named subcollection matched by the collection group query
+                        continue
+                    record = doc.to_dict()
+                    record['id'] = doc.id
+                    records.append(record)
+                    if len(records) >= chunk_size:
+                        if not put(pd.DataFrame(records)):
+                            return
+                        records = []
+                if records:
+                    put(pd.DataFrame(records))
+            except Exception as e:
+                put(e)
+            finally:
+                put(finished)
+        
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            for query in queries:
+                executor.submit(read, query)
+            remaining = len(queries)
+            try:
+                while remaining:
+                    item = chunks.get()
+                    if item is finished:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise Exception(f"Failed to read collection {collection_name}: {str(item)}")
+                    else:
+                        yield item
+            finally:
+                stop.set()
+    
+    def query_collection(self, collection_name, field, operator, value, partition_count=1):
         """
-        Query a Firestore collection
+        Query a Firestore collection. With partition_count > 1 and an
+        equality-style operator, key ranges are queried in parallel (needs a
+        collection group index on field); other operators use one cursor.
         """
+        if partition_count > 1 and operator in PARTITIONED_QUERY_OPERATORS:
+            return _concat_chunks(
+                self.iter_partitioned_chunks(collection_name, partition_count, field=field, operator=operator, value=value)
+            )
         try:
             docs = self.db.collection(collection_name).where(field, operator, value).stream()
             records = []
@@ -86,19 +309,4 @@ def initialize_firebase(credentials_path=None):
     """
     Initialize Firebase Admin SDK
     """
-    if not firebase_admin._apps:
-        try:
-            if credentials_path and os.path.exists(credentials_path):
-                cred = credentials.Certificate(credentials_path)
-            else:
-                # Try to use default credentials
-                cred = credentials.ApplicationDefault()
-            firebase_admin.initialize_app(cred)
-        except Exception as e:
-            # If both methods fail, try without credentials (for development)
-            try:
-                firebase_admin.initialize_app()
-            except Exception as e2:
-                raise Exception(f"Failed to initialize Firebase: {str(e)} and {str(e2)}")
-    
-    return firestore.client()
\ No newline at end of file
+    return get_firestore_client(credentials_path)
\ No newline at end of file
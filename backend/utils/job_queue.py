@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from backend.utils.data_io import to_json_safe
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+
+class JobQueueFull(Exception):
+    """
+    Raised when the queue already holds its maximum number of active jobs
+    """
+    pass
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job when cancellation was requested
+    """
+    pass
+
+def _write_json(path, data):
+    # Atomic replace so readers in other processes never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(to_json_safe(data), f)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class JobContext:
+    """
+    Handle passed to a running job to report progress and observe cancellation.
+    Job state lives in files under state_path, so any API worker process can
+    answer status requests for jobs running in another worker's pool.
+    """
+
+    def __init__(self, state_path, job_id):
+        self.state_path = state_path
+        self.job_id = job_id
+
+    @property
+    def state_file(self):
+        return os.path.join(self.state_path, f"{self.job_id}.json")
+
+    @property
+    def cancel_file(self):
+        return os.path.join(self.state_path, f"{self.job_id}.cancel")
+
+    def update(self, **fields):
+        state = _read_json(self.state_file)
+        state.update(fields)
+        _write_json(self.state_file, state)
+
+    def check_cancelled(self):
+        if os.path.exists(self.cancel_file):
+            raise JobCancelled(self.job_id)
+
+    def report(self, progress, message=None):
+        """
+        Record progress (0-1) and stop the job if cancellation was requested
+        """
+        self.check_cancelled()
+        self.update(progress=float(progress), message=message)
+
+def _run_job(state_path, job_id, fn, kwargs):
+    """
+    Entry point executed in the pool process
+    """
+    context = JobContext(state_path, job_id)
+    try:
+        context.check_cancelled()
+        context.update(state='running', started_at=time.time(), worker_pid=os.getpid())
+        result = fn(context=context, **kwargs)
+        context.check_cancelled()
+        _write_json(os.path.join(state_path, f"{job_id}.result.json"), result)
+        context.update(state='completed', progress=1.0, finished_at=time.time())
+    except JobCancelled:
+        context.update(state='cancelled', finished_at=time.time())
+    except Exception as e:
+        # Library code may wrap JobCancelled in its own exception
+        if os.path.exists(context.cancel_file):
+            context.update(state='cancelled', finished_at=time.time())
+        else:
+            context.update(state='failed', error=str(e), finished_at=time.time())
+
+class JobQueue:
+    """
+    Bounded queue of background jobs executed in a local process pool.
+
+    At most max_pending jobs submitted through this queue may be queued or
+    running at once; further submissions raise JobQueueFull so concurrent
+    training requests cannot starve the API workers. Finished job files are
+    removed after result_ttl seconds.
+    """
+
+    def __init__(self, state_path='jobs/', max_workers=2, max_pending=8, result_ttl=3600):
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(state_path, exist_ok=True)
+
+    def _get_executor(self):
+        # Created on first use so the pool is not forked before the server workers are
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _state_file(self, job_id):
+        return os.path.join(self.state_path, f"{job_id}.json")
+
+    def _valid_id(self, job_id):
+        return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for name in os.listdir(self.state_path):
+            if not name.endswith('.json') or name.endswith('.result.json'):
+                continue
+            path = os.path.join(self.state_path, name)
+            try:
+                state = _read_json(path)
+            except (OSError, ValueError):
+                continue
+            if state.get('finished_at') and state['finished_at'] < cutoff:
+                job_id = name[:-len('.json')]
+                for suffix in ('.json', '.result.json', '.cancel'):
+                    try:
+                        os.remove(os.path.join(self.state_path, f"{job_id}{suffix}"))
+                    except OSError:
+                        pass
+
+    def submit(self, kind, fn, **kwargs):
+        """
+        Queue fn(context=..., **kwargs) and return the job ID
+        """
+        with self._lock:
+            self._futures = {job_id: future for job_id, future in self._futures.items() if not future.done()}
+            if len(self._futures) >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({self.max_pending} active jobs)")
+
+            self._prune()
+            job_id = uuid.uuid4().hex
+            _write_json(self._state_file(job_id), {
+                'job_id': job_id,
+                'kind': kind,
+                'state': 'queued',
+                'progress': 0.0,
+                'message': None,
+                'submitted_at': time.time()
+            })
+            future = self._get_executor().submit(_run_job, self.state_path, job_id, fn, kwargs)
+            self._futures[job_id] = future
+
+        def on_done(done_future):
+            # Jobs cancelled before they started never reach _run_job
+            if done_future.cancelled():
+                JobContext(self.state_path, job_id).update(state='cancelled', finished_at=time.time())
+            elif done_future.exception() is not None:
+                JobContext(self.state_path, job_id).update(state='failed', error=str(done_future.exception()), finished_at=time.time())
+
+        future.add_done_callback(on_done)
+        return job_id
+
+    def status(self, job_id):
+        """
+        Current state of a job, or None if it is unknown
+        """
+        if not self._valid_id(job_id) or not os.path.exists(self._state_file(job_id)):
+            return None
+        state = _read_json(self._state_file(job_id))
+        started = state.get('started_at')
+        if started:
+            state['elapsed_seconds'] = (state.get('finished_at') or time.time()) - started
+        return state
+
+    def result(self, job_id):
+        """
+        Result of a completed job, or None if it is not available
+        """
+        result_file = os.path.join(self.state_path, f"{job_id}.result.json")
+        if not self._valid_id(job_id):
+            return None
+        try:
+            return _read_json(result_file)
+        except (OSError, ValueError):
+            # Missing, or pruned by the TTL sweep while being read
+            return None
+
+    def cancel(self, job_id):
+        """
+        Request cancellation. Queued jobs are dropped; running jobs stop at
+        their next progress report. Returns the job state or None if unknown.
+        """
+        state = self.status(job_id)
+        if state is None:
+            return None
+        if state['state'] in ('completed', 'failed', 'cancelled'):
+            return state
+
+        open(os.path.join(self.state_path, f"{job_id}.cancel"), 'w').close()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return self.status(job_id)
+
+    def stats(self):
+        """
+        Number of active jobs submitted through this process
+        """
+        with self._lock:
+            active = sum(1 for future in self._futures.values() if not future.done())
+        return {'active_jobs': active, 'max_pending': self.max_pending, 'max_workers': self.max_workers}
@@ -1,44 +1,162 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold, ParameterSampler, ParameterGrid
+from sklearn.ensemble import (RandomForestRegressor, RandomForestClassifier, ExtraTreesRegressor, ExtraTreesClassifier,
+                              HistGradientBoostingRegressor, HistGradientBoostingClassifier)
+from sklearn.linear_model import (LinearRegression, LogisticRegression, Ridge, SGDRegressor, SGDClassifier,
+                                  PassiveAggressiveRegressor, PassiveAggressiveClassifier)
 from sklearn.metrics import mean_squared_error, accuracy_score, classification_report, r2_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.base import clone, BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+from scipy import sparse
+from scipy.stats import loguniform
+from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 from sklearn.model_selection import cross_val_score
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
 import joblib
+from joblib import Parallel, delayed
+import time
 import logging
+from backend.utils.model_registry import ModelRegistry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Version of the artifact written by MLModel.save_model. Version 1 artifacts
+# hold a bare estimator trained on scaled features without the scaler.
+MODEL_FORMAT_VERSION = 2
+
+def build_preprocessor(X):
+    """
+    Preprocessing for a feature frame: numeric columns are median-imputed and
+    scaled, categorical columns are mode-imputed and one-hot encoded. Other
+    columns (e.g. datetimes) are dropped.
+    """
+    numeric_columns = list(X.select_dtypes(include=[np.number]).columns)
+    categorical_columns = list(X.select_dtypes(include=['object', 'category', 'bool']).columns)
+
+    transformers = []
+    if numeric_columns:
+        transformers.append(('numeric', Pipeline([
+            ('impute', SimpleImputer(strategy='median')),
+            ('scale', StandardScaler())
+        ]), numeric_columns))
+    if categorical_columns:
+        transformers.append(('categorical', Pipeline([
+            ('impute', SimpleImputer(strategy='most_frequent')),
+            ('encode', OneHotEncoder(handle_unknown='ignore'))
+        ]), categorical_columns))
+    return ColumnTransformer(transformers, remainder='drop')
+
+def build_pipeline(preprocessor, model_type, algorithm, params=None):
+    """
+    Pipeline of a copy of preprocessor and the CANDIDATE_MODELS estimator for
+    algorithm. Estimators in DENSE_INPUT_MODELS get dense features, as one-hot
+    encoding of many categories is otherwise returned as a sparse matrix.
+    """
+    preprocessor = clone(preprocessor)
+    if algorithm in DENSE_INPUT_MODELS:
+        preprocessor.set_params(sparse_threshold=0)
+    _, factory = CANDIDATE_MODELS[model_type][algorithm]
+    return Pipeline([
+        ('preprocess', preprocessor),
+        ('estimator', factory().set_params(**(params or {})))
+    ])
+
+class IncrementalPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Preprocessing that can be fitted one chunk at a time: numeric columns are
+    scaled with running mean/variance (missing values become the running
+    mean), categorical columns are hashed into hash_features columns, so no
+    vocabulary has to be kept. Column roles are taken from the first chunk.
+    """
+
+    def __init__(self, hash_features=1024):
+        self.hash_features = hash_features
+
+    def _split_columns(self, X):
+        numeric = X[self.numeric_columns_].apply(pd.to_numeric, errors='coerce')
+        categorical = X[self.categorical_columns_].astype(str)
+        return numeric, categorical
+
+    def partial_fit(self, X, y=None):
+        if not hasattr(self, 'scaler_'):
+            self.numeric_columns_ = list(X.select_dtypes(include=[np.number]).columns)
+            self.categorical_columns_ = list(X.select_dtypes(include=['object', 'category', 'bool']).columns)
+            self.scaler_ = StandardScaler()
+            self.hasher_ = FeatureHasher(n_features=self.hash_features, input_type='string')
+        X = X.reindex(columns=self.numeric_columns_ + self.categorical_columns_)
+        if self.numeric_columns_:
+            # StandardScaler ignores NaN when updating its statistics
+            self.scaler_.partial_fit(self._split_columns(X)[0].to_numpy(dtype=float))
+        return self
+
+    def fit(self, X, y=None):
+        for attribute in ('scaler_', 'hasher_', 'numeric_columns_', 'categorical_columns_'):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(X, y)
+
+    def transform(self, X):
+        X = X.reindex(columns=self.numeric_columns_ + self.categorical_columns_)
+        numeric, categorical = self._split_columns(X)
+        blocks = []
+        if self.numeric_columns_:
+            scaled = np.nan_to_num(self.scaler_.transform(numeric.to_numpy(dtype=float)), nan=0.0)
+            blocks.append(sparse.csr_matrix(scaled))
+        if self.categorical_columns_:
+            tokens = [[f"{column}={value}" for column, value in zip(self.categorical_columns_, row)]
+                      for row in categorical.itertuples(index=False, name=None)]
+            blocks.append(self.hasher_.transform(tokens))
+        return sparse.hstack(blocks, format='csr')
+
+# Estimators with partial_fit for MLModel.train_incremental
+INCREMENTAL_MODELS = {
+    'regression': {
+        'sgd': lambda: SGDRegressor(random_state=42),
+        'passive_aggressive': lambda: PassiveAggressiveRegressor(random_state=42)
+    },
+    'classification': {
+        'sgd': lambda: SGDClassifier(loss='log_loss', random_state=42),
+        'passive_aggressive': lambda: PassiveAggressiveClassifier(random_state=42)
+    }
+}
+
 class MLModel:
-    def __init__(self, model_type='regression', algorithm='random_forest'):
+    def __init__(self, model_type='regression', algorithm='random_forest', params=None):
         self.model_type = model_type
         self.algorithm = algorithm
+        self.params = params or {}
         self.model = None
         self.is_trained = False
         self.feature_names = None
         
-    def _select_model(self):
-        """Select the appropriate model based on type and algorithm"""
-        if self.model_type == 'regression':
-            if self.algorithm == 'random_forest':
-                return RandomForestRegressor(n_estimators=100, random_state=42)
-            elif self.algorithm == 'linear':
-                return LinearRegression()
-            else:
-                return RandomForestRegressor(n_estimators=100, random_state=42)
-        elif self.model_type == 'classification':
-            if self.algorithm == 'random_forest':
-                return RandomForestClassifier(n_estimators=100, random_state=42)
-            elif self.algorithm == 'logistic':
-                return LogisticRegression(random_state=42, max_iter=1000)
-            else:
-                return RandomForestClassifier(n_estimators=100, random_state=42)
-        else:
+    def missing_features(self, X):
+        """Training feature columns that X does not have"""
+        if self.feature_names is None or not hasattr(X, 'columns'):
+            return []
+        return [name for name in self.feature_names if name not in X.columns]
+    
+    def _align_features(self, X):
+        """Order prediction columns as in training and drop extra ones; missing columns are an error"""
+        if not hasattr(X, 'columns'):
+            return pd.DataFrame(X, columns=self.feature_names)
+        if self.feature_names is None:
+            return X
+        missing = self.missing_features(X)
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        return X[self.feature_names]
+        
+    def _build_pipeline(self, X):
+        """Preprocessing and the model for this type and algorithm, with any tuned parameters"""
+        if self.model_type not in CANDIDATE_MODELS:
             raise ValueError("Model type must be 'regression' or 'classification'")
+        # Unknown algorithms fall back to a random forest
+        algorithm = self.algorithm if self.algorithm in CANDIDATE_MODELS[self.model_type] else 'random_forest'
+        return build_pipeline(build_preprocessor(X), self.model_type, algorithm, self.params)
         
     def train(self, X, y, test_size=0.2):
         """
@@ -46,25 +164,23 @@ class MLModel:
         """
         try:
             # Store feature names
-            self.feature_names = list(X.columns) if hasattr(X, 'columns') else None
+            if not hasattr(X, 'columns'):
+                X = pd.DataFrame(X)
+            self.feature_names = list(X.columns)
             
             # Split the data
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
             
-            # Scale the features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-            
-            # Choose model based on type and algorithm
-            self.model = self._select_model()
+            # Preprocessing and model are fitted together and saved as one pipeline,
+            # so prediction reuses the training imputation, encoding and scaling
+            self.model = self._build_pipeline(X_train)
             
             # Train the model
-            self.model.fit(X_train_scaled, y_train)
+            self.model.fit(X_train, y_train)
             self.is_trained = True
             
             # Evaluate the model
-            y_pred = self.model.predict(X_test_scaled)
+            y_pred = self.model.predict(X_test)
             if self.model_type == 'regression':
                 # For regression, calculate RMSE and R2 score
                 mse = mean_squared_error(y_test, y_pred)
@@ -89,15 +205,119 @@ class MLModel:
             raise ValueError("Model must be trained before making predictions")
             
         try:
+            if isinstance(self.model, Pipeline):
+                return self.model.predict(self._align_features(X))
+            
+            # Version 1 artifacts did not keep their scaler, so it has to be refitted on the batch
+            logger.warning("Model artifact has no preprocessing pipeline; retrain it to get consistent scaling")
             scaler = StandardScaler()
-            # Note: In a real scenario, you would use the same scaler fitted during training
-            X_scaled = scaler.fit_transform(X)
+            X_scaled = scaler.fit_transform(self._align_features(X))
             predictions = self.model.predict(X_scaled)
             return predictions
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error in predict: {str(e)}")
             raise Exception(f"Failed to make predictions: {str(e)}")
     
+    def tune(self, X, y, n_candidates=20, time_budget=60, factor=3, cv=3, n_jobs=-1, progress_callback=None):
+        """
+        Search this algorithm's hyperparameters with successive halving, then
+        train the model with the best parameters found. Returns the search
+        summary with the final hold-out score under 'score'.
+        """
+        search = successive_halving_search(
+            X, y, self.model_type, self.algorithm, n_candidates=n_candidates, time_budget=time_budget,
+            factor=factor, cv=cv, n_jobs=n_jobs, progress_callback=progress_callback
+        )
+        self.params = search['best_params']
+        search['score'] = self.train(X, y)
+        return search
+    
+    def train_incremental(self, chunk_source, target_column, epochs=1, classes=None, hash_features=1024,
+                          progress_callback=None):
+        """
+        Train out of core from a chunk source (a callable returning an iterator
+        of DataFrames), so memory is bounded by the chunk size. Uses the 'sgd'
+        or 'passive_aggressive' estimators, which support partial_fit.
+        
+        Each chunk is scored before the model learns from it (progressive
+        validation), which is reported in place of a hold-out score.
+        progress_callback(chunks_done, rows_done, epoch) is called after each
+        chunk, epoch being the index of the current pass over the source.
+        """
+        try:
+            if self.model_type not in INCREMENTAL_MODELS:
+                raise ValueError("Model type must be 'regression' or 'classification'")
+            if self.algorithm not in INCREMENTAL_MODELS[self.model_type]:
+                raise ValueError(f"Algorithm must be one of {list(INCREMENTAL_MODELS[self.model_type])} for incremental training")
+            
+            # Classifiers need every class on the first partial_fit call, so
+            # collect them with a pass over the target column when not given
+            if self.model_type == 'classification' and classes is None:
+                classes = set()
+                for chunk in chunk_source():
+                    classes.update(chunk[target_column].dropna().unique())
+                classes = sorted(classes)
+            
+            preprocessor = IncrementalPreprocessor(hash_features=hash_features)
+            estimator = INCREMENTAL_MODELS[self.model_type][self.algorithm]().set_params(**self.params)
+            fit_kwargs = {'classes': np.asarray(classes)} if self.model_type == 'classification' else {}
+            
+            chunks = rows = 0
+            scored = correct = 0
+            sum_y = sum_y2 = sum_error2 = 0.0
+            for epoch in range(epochs):
+                for chunk in chunk_source():
+                    chunk = chunk[chunk[target_column].notna()]
+                    if chunk.empty:
+                        continue
+                    X_chunk = chunk.drop(columns=[target_column])
+                    y_chunk = chunk[target_column].to_numpy()
+                    if self.feature_names is None:
+                        self.feature_names = list(X_chunk.columns)
+                    X_chunk = self._align_features(X_chunk)
+                    
+                    preprocessor.partial_fit(X_chunk)
+                    X_encoded = preprocessor.transform(X_chunk)
+                    
+                    # Test-then-train on the first epoch
+                    if epoch == 0 and chunks > 0:
+                        y_pred = estimator.predict(X_encoded)
+                        scored += len(y_chunk)
+                        if self.model_type == 'regression':
+                            y_values = y_chunk.astype(float)
+                            sum_y += y_values.sum()
+                            sum_y2 += (y_values ** 2).sum()
+                            sum_error2 += ((y_values - y_pred) ** 2).sum()
+                        else:
+                            correct += int((y_pred == y_chunk).sum())
+                    
+                    estimator.partial_fit(X_encoded, y_chunk, **fit_kwargs)
+                    fit_kwargs = {}
+                    chunks += 1
+                    rows += len(chunk)
+                    if progress_callback is not None:
+                        progress_callback(chunks, rows, epoch)
+            
+            if chunks == 0:
+                raise ValueError("The chunk source produced no rows with a target value")
+            
+            self.model = Pipeline([('preprocess', preprocessor), ('estimator', estimator)])
+            self.is_trained = True
+            
+            score = {'chunks': chunks, 'rows': rows, 'progressive_rows': scored}
+            if scored and self.model_type == 'regression':
+                total = sum_y2 - sum_y ** 2 / scored
+                score['rmse'] = float(np.sqrt(sum_error2 / scored))
+                score['r2'] = float(1 - sum_error2 / total) if total > 0 else None
+            elif scored:
+                score['accuracy'] = correct / scored
+            return score
+        except Exception as e:
+            logger.error(f"Error in train_incremental: {str(e)}")
+            raise Exception(f"Failed to train model incrementally: {str(e)}")
+    
     def save_model(self, filepath):
         """
         Save the trained model
@@ -111,7 +331,9 @@ class MLModel:
                 'model_type': self.model_type,
                 'algorithm': self.algorithm,
                 'feature_names': self.feature_names,
-                'is_trained': self.is_trained
+                'params': self.params,
+                'is_trained': self.is_trained,
+                'format_version': MODEL_FORMAT_VERSION
             }
             joblib.dump(model_data, filepath)
         except Exception as e:
@@ -127,8 +349,9 @@ class MLModel:
             self.model = model_data['model']
             self.model_type = model_data['model_type']
             self.algorithm = model_data['algorithm']
-            self.feature_names = model_data['feature_names']
-            self.is_trained = model_data['is_trained']
+            self.feature_names = model_data.get('feature_names')
+            self.params = model_data.get('params', {})
+            self.is_trained = model_data.get('is_trained', True)
         except Exception as e:
             logger.error(f"Error in load_model: {str(e)}")
             raise Exception(f"Failed to load model: {str(e)}")
@@ -150,57 +373,330 @@ def evaluate_model(y_true, y_pred, model_type='regression'):
         logger.error(f"Error in evaluate_model: {str(e)}")
         raise Exception(f"Failed to evaluate model: {str(e)}")
 
-def compare_models(X, y, model_type='regression'):
+# Candidates whose estimator does not accept sparse input
+DENSE_INPUT_MODELS = ('gradient_boosting',)
+
+# Candidates evaluated by compare_models, keyed by the name used in requests
+CANDIDATE_MODELS = {
+    'regression': {
+        'random_forest': ('Random Forest', lambda: RandomForestRegressor(n_estimators=100, random_state=42)),
+        'extra_trees': ('Extra Trees', lambda: ExtraTreesRegressor(n_estimators=100, random_state=42)),
+        'gradient_boosting': ('Gradient Boosting', lambda: HistGradientBoostingRegressor(random_state=42)),
+        'linear': ('Linear Regression', lambda: LinearRegression()),
+        'ridge': ('Ridge Regression', lambda: Ridge(random_state=42))
+    },
+    'classification': {
+        'random_forest': ('Random Forest', lambda: RandomForestClassifier(n_estimators=100, random_state=42)),
+        'extra_trees': ('Extra Trees', lambda: ExtraTreesClassifier(n_estimators=100, random_state=42)),
+        'gradient_boosting': ('Gradient Boosting', lambda: HistGradientBoostingClassifier(random_state=42)),
+        'logistic': ('Logistic Regression', lambda: LogisticRegression(random_state=42, max_iter=1000))
+    }
+}
+
+def _cv_splitter(y, model_type, cv):
+    """K-fold splitter; stratified for classification when every class has at least cv rows"""
+    if model_type == 'classification' and pd.Series(y).value_counts().min() >= cv:
+        return StratifiedKFold(n_splits=cv, shuffle=True, random_state=42)
+    return KFold(n_splits=cv, shuffle=True, random_state=42)
+
+def _fit_and_score(key, pipeline, X, y, train_index, test_index, model_type):
+    """Fit one candidate on one fold and time fit and predict (runs in a joblib worker)"""
+    X_train, X_test = X.iloc[train_index], X.iloc[test_index]
+    y_train, y_test = y.iloc[train_index], y.iloc[test_index]
+    
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    y_pred = pipeline.predict(X_test)
+    predict_time = time.perf_counter() - start
+    
+    score = r2_score(y_test, y_pred) if model_type == 'regression' else accuracy_score(y_test, y_pred)
+    return key, score, fit_time, predict_time, len(test_index)
+
+def compare_models(X, y, model_type='regression', progress_callback=None, candidates=None, cv=5, n_jobs=-1):
     """
-    Compare different models and return the best one
+    Compare candidate models with k-fold cross-validation and return the best one.
+    Every (candidate, fold) fit runs as a separate task across n_jobs processes.
+    candidates is a list of CANDIDATE_MODELS keys (default: all for the model type).
+    progress_callback(done, total) is called after each fold is evaluated.
     """
     try:
-        models = []
-        scores = []
+        if model_type not in CANDIDATE_MODELS:
+            raise ValueError("Model type must be 'regression' or 'classification'")
+        available = CANDIDATE_MODELS[model_type]
+        candidates = candidates or list(available)
+        unknown = [key for key in candidates if key not in available]
+        if unknown:
+            raise ValueError(f"Unknown candidate models {unknown}; available: {list(available)}")
         
-        if model_type == 'regression':
-            models.append(('Random Forest', RandomForestRegressor(n_estimators=100, random_state=42)))
-            models.append(('Linear Regression', LinearRegression()))
-        else:
-            models.append(('Random Forest', RandomForestClassifier(n_estimators=100, random_state=42)))
-            models.append(('Logistic Regression', LogisticRegression(random_state=42, max_iter=1000)))
+        if not hasattr(X, 'columns'):
+            X = pd.DataFrame(X)
+        y = pd.Series(np.asarray(y))
+        X = X.reset_index(drop=True)
         
-        # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        # Preprocessing is part of each pipeline so it is fitted on the training folds only
+        preprocessor = build_preprocessor(X)
+        folds = list(_cv_splitter(y, model_type, cv).split(X, y))
+        tasks = [
+            delayed(_fit_and_score)(
+                key, build_pipeline(preprocessor, model_type, key), X, y, train_index, test_index, model_type
+            )
+            for key in candidates
+            for train_index, test_index in folds
+        ]
         
-        # Scale the features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
+        fold_results = {key: [] for key in candidates}
+        for done, (key, score, fit_time, predict_time, n_rows) in enumerate(
+                Parallel(n_jobs=n_jobs, return_as='generator')(tasks), start=1):
+            fold_results[key].append((score, fit_time, predict_time, n_rows))
+            if progress_callback is not None:
+                progress_callback(done, len(tasks))
         
-        best_score = -np.inf if model_type == 'regression' else 0
-        best_model = None
-        best_name = None
+        results = []
+        for key in candidates:
+            scores, fit_times, predict_times, n_rows = map(np.array, zip(*fold_results[key]))
+            results.append({
+                'model': available[key][0],
+                'key': key,
+                'mean_score': float(scores.mean()),
+                'std_score': float(scores.std()),
+                'fold_scores': scores.tolist(),
+                'fit_time': float(fit_times.mean()),
+                'predict_time': float(predict_times.mean()),
+                'predict_time_per_1k_rows': float((predict_times / n_rows).mean() * 1000)
+            })
         
-        for name, model in models:
-            # Train the model
-            model.fit(X_train_scaled, y_train)
-            
-            # Evaluate the model
-            y_pred = model.predict(X_test_scaled)
-            if model_type == 'regression':
-                score = r2_score(y_test, y_pred)
-            else:
-                score = accuracy_score(y_test, y_pred)
+        best = max(results, key=lambda result: result['mean_score'])
+        return {
+            'scores': [(result['model'], result['mean_score']) for result in results],
+            'results': results,
+            'best_model': best['model'],
+            'best_score': best['mean_score'],
+            'cv_folds': len(folds)
+        }
+    except Exception as e:
+        logger.error(f"Error in compare_models: {str(e)}")
+        raise Exception(f"Failed to compare models: {str(e)}")
+
+# Hyperparameter search spaces for successive_halving_search, per algorithm
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 5, 10, 20, 40],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 0.5, 1.0]
+    },
+    'extra_trees': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 5, 10, 20, 40],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 0.5, 1.0]
+    },
+    'gradient_boosting': {
+        'learning_rate': loguniform(0.01, 0.3),
+        'max_iter': [100, 200, 400],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [10, 20, 50],
+        'l2_regularization': [0.0, 0.1, 1.0]
+    },
+    'linear': {
+        'fit_intercept': [True, False]
+    },
+    'ridge': {
+        'alpha': loguniform(1e-3, 1e2)
+    },
+    'logistic': {
+        'C': loguniform(1e-3, 1e2)
+    }
+}
+
+def successive_halving_search(X, y, model_type='regression', algorithm='random_forest', n_candidates=20,
+                              time_budget=60, factor=3, cv=3, n_jobs=-1, progress_callback=None,
+                              random_state=42):
+    """
+    Randomized successive-halving search over SEARCH_SPACES[algorithm].
+
+    n_candidates parameter sets are sampled and cross-validated on a small
+    row sample; the best 1/factor are kept and re-evaluated on factor times
+    more rows, until one candidate is left or all rows are used. Each round's
+    (candidate, fold) fits run in parallel. When time_budget seconds have
+    passed, the search stops and ranks the candidates of the last round in
+    which they were fully evaluated.
+    """
+    try:
+        if model_type not in CANDIDATE_MODELS:
+            raise ValueError("Model type must be 'regression' or 'classification'")
+        if algorithm not in CANDIDATE_MODELS[model_type] or algorithm not in SEARCH_SPACES:
+            raise ValueError(f"No search space for {model_type} algorithm {algorithm}")
+        
+        deadline = time.monotonic() + time_budget
+        started = time.monotonic()
+        if not hasattr(X, 'columns'):
+            X = pd.DataFrame(X)
+        X = X.reset_index(drop=True)
+        y = pd.Series(np.asarray(y))
+        
+        space = SEARCH_SPACES[algorithm]
+        if all(isinstance(values, list) for values in space.values()):
+            # Small discrete spaces (e.g. linear) have fewer distinct candidates
+            n_candidates = min(n_candidates, len(ParameterGrid(space)))
+        candidates = [dict(params) for params in ParameterSampler(space, n_candidates, random_state=random_state)]
+        
+        n_rounds = 1 + int(np.floor(np.log(len(candidates)) / np.log(factor))) if len(candidates) > 1 else 1
+        min_rows = min(len(X), max(cv * 20, len(X) // factor ** (n_rounds - 1)))
+        # Nested row samples: each round's rows include the previous round's
+        row_order = np.random.default_rng(random_state).permutation(len(X))
+        preprocessor = build_preprocessor(X)
+        
+        remaining = list(range(len(candidates)))
+        ranking = None
+        rounds = []
+        timed_out = False
+        for round_number in range(n_rounds):
+            n_rows = len(X) if round_number == n_rounds - 1 else min(len(X), min_rows * factor ** round_number)
+            rows = np.sort(row_order[:n_rows])
+            X_round, y_round = X.iloc[rows].reset_index(drop=True), y.iloc[rows].reset_index(drop=True)
+            folds = list(_cv_splitter(y_round, model_type, cv).split(X_round, y_round))
+            tasks = [
+                delayed(_fit_and_score)(
+                    index, build_pipeline(preprocessor, model_type, algorithm, candidates[index]),
+                    X_round, y_round, train_index, test_index, model_type
+                )
+                for index in remaining
+                for train_index, test_index in folds
+            ]
             
-            scores.append((name, score))
+            fold_scores = {index: [] for index in remaining}
+            for done, (index, score, _, _, _) in enumerate(Parallel(n_jobs=n_jobs, return_as='generator')(tasks), start=1):
+                fold_scores[index].append(score)
+                if progress_callback is not None:
+                    progress_callback(round_number + done / len(tasks), n_rounds)
+                if time.monotonic() > deadline:
+                    timed_out = True
+                    break
             
-            # Update best model
-            if (model_type == 'regression' and score > best_score) or (model_type == 'classification' and score > best_score):
-                best_score = score
-                best_model = model
-                best_name = name
+            complete = {index: float(np.mean(scores)) for index, scores in fold_scores.items() if len(scores) == len(folds)}
+            if complete:
+                ranking = sorted(complete.items(), key=lambda item: item[1], reverse=True)
+            rounds.append({
+                'round': round_number,
+                'n_rows': int(n_rows),
+                'n_candidates': len(remaining),
+                'n_evaluated': len(complete),
+                'best_score': ranking[0][1] if ranking else None,
+                'elapsed_seconds': time.monotonic() - started
+            })
+            if timed_out or n_rows >= len(X) or len(remaining) == 1:
+                break
+            remaining = [index for index, _ in ranking[:max(1, int(np.ceil(len(remaining) / factor)))]]
         
+        if ranking is None:
+            raise ValueError(f"time_budget of {time_budget}s was too short to evaluate any candidate")
+        
+        best_index, best_score = ranking[0]
         return {
-            'scores': scores,
-            'best_model': best_name,
-            'best_score': best_score
+            'algorithm': algorithm,
+            'best_params': candidates[best_index],
+            'best_cv_score': best_score,
+            'rounds': rounds,
+            'n_candidates': len(candidates),
+            'timed_out': timed_out,
+            'elapsed_seconds': time.monotonic() - started
         }
     except Exception as e:
-        logger.error(f"Error in compare_models: {str(e)}")
-        raise Exception(f"Failed to compare models: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error in successive_halving_search: {str(e)}")
+        raise Exception(f"Failed to tune model: {str(e)}")
+
+def train_model_task(context, X, y, model_type='regression', algorithm='random_forest', model_path=None,
+                     model_name=None, registry_path=None):
+    """
+    Background job: train (and optionally save or register) a model. The fit
+    is a single call, so progress jumps from 0 to 0.9 and a cancellation only
+    takes effect once it has finished.
+    """
+    context.report(0.0, 'Training model')
+    model = MLModel(model_type, algorithm)
+    score = model.train(X, y)
+    result = {
+        'score': score,
+        'model_type': model_type,
+        'algorithm': algorithm
+    }
+    if model_path:
+        context.report(0.9, 'Saving model')
+        model.save_model(model_path)
+    if model_name:
+        context.report(0.9, 'Registering model')
+        result['model_name'] = model_name
+        result['model_version'] = ModelRegistry(registry_path).register(model, model_name, {'score': score})
+    return result
+
+def compare_models_task(context, X, y, model_type='regression', candidates=None, cv=5, n_jobs=-1):
+    """
+    Background job: compare models, reporting progress after each fold
+    """
+    context.report(0.0, 'Comparing models')
+    comparison = compare_models(
+        X, y, model_type,
+        progress_callback=lambda done, total: context.report(done / total, f'Evaluated {done} of {total} folds'),
+        candidates=candidates, cv=cv, n_jobs=n_jobs
+    )
+    return {'comparison': comparison}
+
+def tune_model_task(context, X, y, model_type='regression', algorithm='random_forest', n_candidates=20,
+                    time_budget=60, cv=3, n_jobs=-1, model_name=None, registry_path=None):
+    """
+    Background job: tune a model and register the best one
+    """
+    context.report(0.0, 'Tuning model')
+    model = MLModel(model_type, algorithm)
+    search = model.tune(
+        X, y, n_candidates=n_candidates, time_budget=time_budget, cv=cv, n_jobs=n_jobs,
+        progress_callback=lambda rounds_done, total: context.report(
+            min(0.9, 0.9 * rounds_done / total), f'Round {int(rounds_done) + 1} of {total}')
+    )
+    if model_name:
+        context.report(0.95, 'Registering model')
+        search['model_name'] = model_name
+        search['model_version'] = ModelRegistry(registry_path).register(
+            model, model_name, {'score': search['score'], 'params': search['best_params']})
+    return {'tuning': search}
+
+def train_incremental_task(context, source, target_column, model_type='regression', algorithm='sgd',
+                           chunk_size=10000, epochs=1, dataset_spill_path=None, credentials_path=None,
+                           model_name=None, registry_path=None):
+    """
+    Background job: incremental training from a chunk source description
+    """
+    from backend.utils.data_io import open_chunk_source
+    from backend.utils.dataset_store import DatasetStore
+    
+    context.report(0.0, 'Training model incrementally')
+    # A fresh store reads datasets back from the spill directory shared with the API workers
+    dataset_store = DatasetStore(spill_path=dataset_spill_path) if dataset_spill_path else None
+    chunk_source = open_chunk_source(source, chunk_size, dataset_store, credentials_path)
+    
+    # Progress is the share of rows trained on when the source size is known,
+    # otherwise the share of finished epochs
+    total_rows = chunk_source.row_count * epochs if chunk_source.row_count else None
+    
+    def report(chunks, rows, epoch):
+        if total_rows:
+            context.report(0.9 * min(rows / total_rows, 1.0), f'Trained on {rows} of {total_rows} rows ({chunks} chunks)')
+        else:
+            context.report(0.9 * epoch / epochs, f'Epoch {epoch + 1} of {epochs}: trained on {rows} rows ({chunks} chunks)')
+    
+    model = MLModel(model_type, algorithm)
+    score = model.train_incremental(chunk_source, target_column, epochs=epochs, progress_callback=report)
+    result = {
+        'score': score,
+        'model_type': model_type,
+        'algorithm': algorithm
+    }
+    if model_name:
+        context.report(0.95, 'Registering model')
+        result['model_name'] = model_name
+        result['model_version'] = ModelRegistry(registry_path).register(model, model_name, {'score': score})
+    return result
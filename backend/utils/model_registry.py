@@ -0,0 +1,230 @@
+import json
+import os
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from backend.utils.data_io import to_json_safe
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+class ModelNotFound(KeyError):
+    """
+    Raised when a model name or version is not in the registry
+    """
+    pass
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk with a byte-budgeted in-memory LRU.
+
+    Models are stored as <root_path>/<name>/<version>.pkl (MLModel.save_model
+    format) next to a <version>.json metadata file. Versions are integers that
+    only ever increase and artifacts are never rewritten, so a cached
+    (name, version) entry is always current. Every API worker shares the files
+    but keeps its own cache, which holds deserialized models up to max_bytes
+    (estimated from artifact size on disk).
+    """
+
+    def __init__(self, root_path='models/', max_bytes=256 * 1024 * 1024):
+        self.root_path = root_path
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root_path, exist_ok=True)
+
+    def _model_dir(self, name):
+        if not MODEL_NAME_PATTERN.match(str(name)):
+            raise ModelNotFound(name)
+        return os.path.join(self.root_path, name)
+
+    def _artifact_file(self, name, version):
+        return os.path.join(self._model_dir(name), f"{int(version)}.pkl")
+
+    def _metadata_file(self, name, version):
+        return os.path.join(self._model_dir(name), f"{int(version)}.json")
+
+    def versions(self, name):
+        """
+        Registered versions of a model, oldest first
+        """
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(int(f[:-len('.pkl')]) for f in os.listdir(model_dir)
+                      if f.endswith('.pkl') and f[:-len('.pkl')].isdigit())
+
+    def resolve_version(self, name, version=None):
+        """
+        Turn None/'latest' or a version number into an existing version number
+        """
+        versions = self.versions(name)
+        if not versions:
+            raise ModelNotFound(name)
+        if version is None or version == 'latest':
+            return versions[-1]
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            raise ModelNotFound(f"{name}:{version}")
+        if version not in versions:
+            raise ModelNotFound(f"{name}:{version}")
+        return version
+
+    def register(self, model, name, metadata=None):
+        """
+        Save a trained MLModel as the next version of name and return that version
+        """
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        with self._lock:
+            version = (self.versions(name) or [0])[-1] + 1
+            # Reserve the version number before the (slow) dump; O_EXCL makes
+            # concurrent registrations from other workers pick the next one
+            while True:
+                try:
+                    fd = os.open(self._metadata_file(name, version), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    os.close(fd)
+                    break
+                except FileExistsError:
+                    version += 1
+
+        # Write to a temporary file first so other workers never load a partial artifact
+        tmp_file = f"{self._artifact_file(name, version)}.{os.getpid()}.tmp"
+        model.save_model(tmp_file)
+        os.replace(tmp_file, self._artifact_file(name, version))
+
+        info = {
+            'name': name,
+            'version': version,
+            'model_type': model.model_type,
+            'algorithm': model.algorithm,
+            'feature_names': model.feature_names,
+            'created_at': time.time(),
+            'size_bytes': os.path.getsize(self._artifact_file(name, version))
+        }
+        info.update(metadata or {})
+        with open(self._metadata_file(name, version), 'w') as f:
+            json.dump(to_json_safe(info), f)
+
+        logger.info(f"Registered model {name} version {version}")
+        return version
+
+    def info(self, name, version=None):
+        """
+        Metadata of a registered model version
+        """
+        version = self.resolve_version(name, version)
+        try:
+            with open(self._metadata_file(name, version), 'r') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            info = {'name': name, 'version': version}
+        info['cached'] = (name, version) in self._models
+        return info
+
+    def list_models(self):
+        """
+        Names of all registered models with their versions
+        """
+        models = {}
+        for name in sorted(os.listdir(self.root_path)):
+            if MODEL_NAME_PATTERN.match(name) and os.path.isdir(os.path.join(self.root_path, name)):
+                versions = self.versions(name)
+                if versions:
+                    models[name] = versions
+        return models
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            self.misses += 1
+            return None
+
+    def _cache_put(self, key, model, size):
+        with self._lock:
+            if key in self._models:
+                return
+            self._models[key] = model
+            self._sizes[key] = size
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._models) > 1:
+                evicted_key, _ = self._models.popitem(last=False)
+                self.current_bytes -= self._sizes.pop(evicted_key)
+                logger.info(f"Evicted model {evicted_key} from memory")
+
+    def _load_cached(self, key, path):
+        model = self._cache_get(key)
+        if model is not None:
+            return model
+        # Concurrent requests for the same model wait for a single load, so they
+        # share one model object (which the prediction batcher relies on)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                model = self._models.get(key)
+            if model is None:
+                # Imported here so sklearn is only loaded once a model is needed
+                from backend.utils.ml_utils import MLModel
+                model = MLModel()
+                model.load_model(path)
+                self._cache_put(key, model, os.path.getsize(path))
+        with self._lock:
+            self._load_locks.pop(key, None)
+        return model
+
+    def load(self, name, version=None):
+        """
+        Return the MLModel for name and version (default: latest), deserializing
+        it only on the first request
+        """
+        version = self.resolve_version(name, version)
+        return self._load_cached((name, version), self._artifact_file(name, version))
+
+    def load_path(self, path):
+        """
+        Load a model saved at an arbitrary path, cached until the file changes
+        """
+        key = ('path', os.path.abspath(path), os.stat(path).st_mtime_ns)
+        return self._load_cached(key, path)
+
+    def delete(self, name, version):
+        """
+        Remove a model version from disk and memory
+        """
+        version = self.resolve_version(name, version)
+        with self._lock:
+            if (name, version) in self._models:
+                del self._models[(name, version)]
+                self.current_bytes -= self._sizes.pop((name, version))
+        for path in (self._artifact_file(name, version), self._metadata_file(name, version)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self):
+        """
+        Cache usage of the registry in this process
+        """
+        with self._lock:
+            return {
+                'models_in_memory': len(self._models),
+                'memory_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
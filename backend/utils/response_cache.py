@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def request_cache_key(request):
+    """
+    Content hash of everything that determines a response: method, path,
+    query parameters, Accept and Content-Type headers and the body. JSON
+    bodies are canonicalized (sorted keys, no whitespace), so equivalent
+    payloads share a key.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(json.dumps(sorted(request.args.items(multi=True))).encode())
+    digest.update(f"\n{request.headers.get('Accept', '')}\n{request.mimetype}\n".encode())
+
+    if request.mimetype == 'multipart/form-data':
+        # Hash parsed fields and files; reading the raw stream would break form parsing
+        digest.update(json.dumps(sorted(request.form.items(multi=True))).encode())
+        for field, upload in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{field}:{upload.filename}:{upload.mimetype}\n".encode())
+            digest.update(upload.read())
+            upload.seek(0)
+        return digest.hexdigest()
+
+    body = request.get_data(cache=True)
+    payload = request.get_json(silent=True) if request.mimetype == 'application/json' else None
+    if payload is not None:
+        digest.update(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode())
+    else:
+        digest.update(body)
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of response bodies keyed by request content hash.
+
+    The memory tier is a byte-bounded LRU private to each worker process. The
+    optional disk tier (disk_path) is shared by all workers on the host;
+    entries found there are promoted to memory. Entries expire after ttl
+    seconds in both tiers.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, disk_path=None, disk_max_bytes=1024 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+
+    def _disk_file(self, key):
+        return os.path.join(self.disk_path, f"{key}.cache")
+
+    def _remember(self, key, entry):
+        # Caller holds the lock
+        if key in self._entries:
+            self.current_bytes -= len(self._entries.pop(key)['body'])
+        if len(entry['body']) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.current_bytes += len(entry['body'])
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted['body'])
+
+    def get(self, key):
+        """
+        Return (entry, tier) for a cached response, or (None, None)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['created_at'] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits['memory'] += 1
+                return entry, 'memory'
+
+        if self.disk_path and os.path.isfile(self._disk_file(key)):
+            try:
+                with open(self._disk_file(key), 'rb') as f:
+                    entry = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                entry = None
+            if entry is not None and now - entry['created_at'] <= self.ttl:
+                with self._lock:
+                    self._remember(key, entry)
+                    self.hits['disk'] += 1
+                return entry, 'disk'
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, key, body, mimetype, headers=None):
+        """
+        Cache a response body with its mimetype and extra headers
+        """
+        entry = {'body': body, 'mimetype': mimetype, 'headers': headers or {}, 'created_at': time.time()}
+        with self._lock:
+            self._remember(key, entry)
+            self._puts += 1
+            prune = self._puts % 100 == 0
+
+        if self.disk_path:
+            # Atomic replace so other workers never read a partial entry
+            tmp_file = f"{self._disk_file(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self._disk_file(key))
+            if prune:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """
+        Drop expired disk entries, then the oldest ones beyond disk_max_bytes
+        """
+        now = time.time()
+        files = []
+        for name in os.listdir(self.disk_path):
+            if not name.endswith('.cache'):
+                continue
+            path = os.path.join(self.disk_path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """
+        Empty both tiers
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+        if self.disk_path:
+            for name in os.listdir(self.disk_path):
+                if name.endswith('.cache'):
+                    self._remove(os.path.join(self.disk_path, name))
+
+    def stats(self):
+        """
+        Hit/miss counters and memory usage for this worker process
+        """
+        with self._lock:
+            return {
+                'entries_in_memory': len(self._entries),
+                'memory_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'disk': bool(self.disk_path),
+                'hits': dict(self.hits),
+                'misses': self.misses
+            }
@@ -0,0 +1,92 @@
+import importlib
+import os
+import resource
+import time
+import logging
+from contextlib import contextmanager
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Modules the endpoints import on first use; preloading them before the server
+# forks lets every worker share their pages
+PRELOAD_MODULES = [
+    'backend.utils.data_processing',
+    'backend.utils.ml_utils',
+    'backend.utils.visualization',
+    'backend.utils.firebase_utils'
+]
+
+def rss_mb():
+    """
+    Current resident set size of this process in MB
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        # No /proc (e.g. macOS): fall back to the peak, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+class StartupTimer:
+    """
+    Wall-clock duration of each startup phase, reported once the app is ready
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def record(self, name, seconds):
+        self.phases[name] = round(seconds * 1000, 1)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self):
+        return {
+            'total_ms': round(sum(self.phases.values()), 1),
+            'phases_ms': dict(self.phases),
+            'pid': os.getpid(),
+            'rss_mb': round(rss_mb(), 1)
+        }
+
+def preload_modules(modules=PRELOAD_MODULES):
+    """
+    Import the heavy modules now instead of on the first request; returns the
+    import time of each in milliseconds
+    """
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            # An optional dependency missing here only disables its endpoints
+            logger.warning(f"Could not preload {name}: {str(e)}")
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+def warm_up():
+    """
+    Build a tiny figure of each chart type once, so plotly's lazily created
+    figure validators are loaded before the first /visualize request
+    """
+    import pandas as pd
+    from backend.utils.visualization import (create_bar_chart, create_scatter_plot, create_line_chart, create_histogram,
+                                            create_heatmap, create_box_plot)
+
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0, 4.0], 'y': [2.0, 1.0, 4.0, 3.0]})
+    create_bar_chart(df, 'x', 'y')
+    create_scatter_plot(df, 'x', 'y')
+    create_line_chart(df, 'x', 'y')
+    create_histogram(df, 'x')
+    create_heatmap(df)
+    create_box_plot(df, 'y')
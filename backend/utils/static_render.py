@@ -0,0 +1,252 @@
+import hashlib
+import json
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from backend.utils.dataset_store import dataset_fingerprint
+from backend.utils.downsampling import downsample_line, downsample_scatter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RENDER_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+RENDER_CHART_TYPES = ('bar', 'scatter', 'line', 'histogram', 'heatmap', 'box')
+THUMBNAIL_WIDTH = 240
+
+# numpy's binning rules, accepted for `bins` as by the interactive histogram
+HISTOGRAM_BIN_RULES = ('auto', 'fd', 'doane', 'scott', 'stone', 'rice', 'sturges', 'sqrt')
+
+# Options that change the rendered image, with their defaults
+RENDER_OPTIONS = {
+    'chart_type': 'bar',
+    'x_column': None,
+    'y_column': None,
+    'color_column': None,
+    'title': None,
+    'format': 'png',
+    'width': 800,
+    'height': 500,
+    'dpi': 100,
+    'thumbnail_width': None,
+    'max_points': 20000,
+    'bins': 'auto',
+    'top_k': 60,
+    'cluster': True,
+    'max_outliers': 1000
+}
+
+def render_options(params):
+    """
+    Fill in defaults for the render options found in request parameters
+    """
+    options = {key: params.get(key, default) for key, default in RENDER_OPTIONS.items()}
+    if params.get('thumbnail') in (True, 'true') and not options['thumbnail_width']:
+        options['thumbnail_width'] = THUMBNAIL_WIDTH
+    # Form fields arrive as strings
+    for key in ('width', 'height', 'dpi', 'thumbnail_width', 'max_points', 'top_k', 'max_outliers'):
+        if options[key] is not None:
+            options[key] = int(options[key])
+    options['cluster'] = options['cluster'] in (True, 'true')
+    if options['bins'] not in HISTOGRAM_BIN_RULES:
+        try:
+            options['bins'] = int(options['bins'])
+        except (TypeError, ValueError):
+            raise ValueError(f"bins must be a number of bins or one of {list(HISTOGRAM_BIN_RULES)}")
+        if options['bins'] < 1:
+            raise ValueError('bins must be at least 1')
+    if not 0 < options['width'] <= 4000 or not 0 < options['height'] <= 4000:
+        raise ValueError('width and height must be between 1 and 4000 pixels')
+    if options['chart_type'] not in RENDER_CHART_TYPES:
+        raise ValueError(f"chart_type must be one of {list(RENDER_CHART_TYPES)}")
+    if options['format'] not in RENDER_FORMATS:
+        raise ValueError(f"format must be one of {list(RENDER_FORMATS)}")
+    if options['chart_type'] in ('bar', 'scatter', 'line') and (not options['x_column'] or not options['y_column']):
+        raise ValueError('x_column and y_column are required for this chart type')
+    if options['chart_type'] in ('histogram', 'box') and not options['x_column']:
+        raise ValueError(f"x_column is required for {options['chart_type']}")
+    return options
+
+def chart_columns(df, options):
+    """
+    Columns of df the chart reads; only these are sent to the render process
+    """
+    if options['chart_type'] == 'heatmap':
+        return list(df.select_dtypes(include=['number']).columns)
+    columns = [options['x_column']]
+    if options['chart_type'] in ('bar', 'scatter', 'line'):
+        columns.append(options['y_column'])
+    if options['chart_type'] == 'scatter' and options['color_column']:
+        columns.append(options['color_column'])
+    columns = list(dict.fromkeys(columns))
+    for column in columns:
+        if column not in df.columns:
+            raise ValueError(f"Column {column} not found in data")
+    return columns
+
+def render_cache_key(fingerprint, options):
+    """
+    Hash of the data's fingerprint (see dataset_fingerprint) and the render options
+    """
+    digest = hashlib.sha256(fingerprint.encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def _init_worker():
+    # Non-interactive backend in every render process
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _draw(ax, df, options):
+    # Imported here (in the render process) so the API process does not load plotly and scipy for it
+    from backend.utils.visualization import histogram_counts, select_correlations, box_statistics
+
+    chart_type = options['chart_type']
+    x_column, y_column = options['x_column'], options['y_column']
+
+    if chart_type == 'bar':
+        ax.bar(df[x_column].astype(str), df[y_column])
+        ax.set_xlabel(x_column)
+        ax.set_ylabel(y_column)
+        if len(df) > 20:
+            ax.tick_params(axis='x', labelrotation=90)
+    elif chart_type == 'scatter':
+        df, _ = downsample_scatter(df, x_column, y_column, options['max_points'], 'sample', options['color_column'])
+        if options['color_column']:
+            for group, rows in df.groupby(options['color_column']):
+                ax.scatter(rows[x_column], rows[y_column], s=8, label=str(group))
+            ax.legend(title=options['color_column'])
+        else:
+            ax.scatter(df[x_column], df[y_column], s=8)
+        ax.set_xlabel(x_column)
+        ax.set_ylabel(y_column)
+    elif chart_type == 'line':
+        df, _ = downsample_line(df, x_column, y_column, options['max_points'])
+        ax.plot(df[x_column], df[y_column])
+        ax.set_xlabel(x_column)
+        ax.set_ylabel(y_column)
+    elif chart_type == 'histogram':
+        histogram = histogram_counts(df[x_column], options['bins'])
+        if histogram['kind'] == 'categorical':
+            ax.bar(histogram['labels'], histogram['counts'])
+            if len(histogram['labels']) > 20:
+                ax.tick_params(axis='x', labelrotation=90)
+        elif histogram['kind'] == 'datetime':
+            # Bars on a date axis, as stairs cannot take timestamp edges
+            edges = histogram['edges']
+            ax.bar(edges[:-1], histogram['counts'], width=edges[1:] - edges[:-1], align='edge')
+        else:
+            ax.stairs(histogram['counts'], histogram['edges'], fill=True)
+        ax.set_xlabel(x_column)
+        ax.set_ylabel('count')
+    elif chart_type == 'heatmap':
+        import seaborn as sns
+        correlations = select_correlations(df, options['top_k'], options['cluster'])
+        sns.heatmap(correlations, ax=ax, vmin=-1, vmax=1, cmap='viridis',
+                    annot=len(correlations) <= 12, fmt='.2f', square=True)
+    elif chart_type == 'box':
+        try:
+            stats = box_statistics(df[x_column], options['max_outliers'])
+        except ValueError:
+            raise ValueError(f"Column {x_column} has no numeric values")
+        # Draw from precomputed statistics, as the interactive box plot does
+        ax.bxp([{'label': x_column, 'q1': stats['q1'], 'med': stats['median'], 'q3': stats['q3'],
+                 'whislo': stats['lower_fence'], 'whishi': stats['upper_fence'], 'fliers': stats['outliers'],
+                 'mean': stats['mean']}], showmeans=True)
+
+def render_chart(df, options):
+    """
+    Render one chart to PNG or SVG bytes with matplotlib (runs in a pool process)
+    """
+    from matplotlib.figure import Figure
+
+    width, height, dpi = options['width'], options['height'], options['dpi']
+    if options['thumbnail_width']:
+        # Same layout at a lower resolution
+        dpi = dpi * options['thumbnail_width'] / width
+    fig = Figure(figsize=(width / options['dpi'], height / options['dpi']), dpi=dpi)
+    ax = fig.add_subplot()
+    _draw(ax, df, options)
+    if options['title']:
+        ax.set_title(options['title'])
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format=options['format'], dpi=dpi)
+    return buffer.getvalue()
+
+class RenderPool:
+    """
+    Renders static charts in a process pool with matplotlib's Agg backend.
+
+    Images are cached by a hash of the data and render options in a
+    ResponseCache (memory tier per worker, optional disk tier shared by all
+    workers), so a report that repeats charts only renders them once.
+    """
+
+    def __init__(self, cache, max_workers=2):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so the pool is not forked before the server workers are
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            return self._executor
+
+    def render_many(self, charts):
+        """
+        Render (df, options, fingerprint) tuples concurrently, where fingerprint
+        is dataset_fingerprint(df) computed once per frame by the caller.
+        Returns one dict per chart, in order, with 'image', 'mimetype' and
+        'cache' ('HIT' or 'MISS'), or with 'error' holding the exception if
+        that chart failed.
+        """
+        results = [None] * len(charts)
+        pending = {}
+        for index, (df, options, fingerprint) in enumerate(charts):
+            key = render_cache_key(fingerprint, options)
+            entry, _ = self.cache.get(key) if self.cache is not None else (None, None)
+            if entry is not None:
+                results[index] = {'image': entry['body'], 'mimetype': entry['mimetype'], 'cache': 'HIT'}
+            elif key in pending:
+                # Same chart twice in one batch renders once
+                pending[key][1].append(index)
+            else:
+                try:
+                    # Only the chart's columns are pickled to the render process
+                    chart_df = df[chart_columns(df, options)]
+                except ValueError as e:
+                    results[index] = {'error': e}
+                    continue
+                pending[key] = (self._get_executor().submit(render_chart, chart_df, options), [index])
+
+        for key, (future, indices) in pending.items():
+            try:
+                image = future.result()
+            except Exception as e:
+                logger.error(f"Error rendering chart: {str(e)}")
+                for index in indices:
+                    results[index] = {'error': e}
+                continue
+            mimetype = RENDER_FORMATS[charts[indices[0]][1]['format']]
+            if self.cache is not None:
+                self.cache.put(key, image, mimetype)
+            for index in indices:
+                results[index] = {'image': image, 'mimetype': mimetype, 'cache': 'MISS'}
+        return results
+
+    def render(self, df, options, fingerprint=None):
+        """
+        Render a single chart; raises the rendering error if it fails
+        """
+        if fingerprint is None:
+            fingerprint = dataset_fingerprint(df)
+        result = self.render_many([(df, options, fingerprint)])[0]
+        if 'error' in result:
+            raise result['error']
+        return result
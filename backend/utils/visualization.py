@@ -1,59 +1,337 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+import json
 import base64
-from io import BytesIO
 import pandas as pd
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
 
-def create_bar_chart(df, x_column, y_column, title="Bar Chart"):
+# Histograms never send more bins than this, whatever the binning rule asks for
+MAX_HISTOGRAM_BINS = 200
+
+# Categorical histograms show the most frequent categories and one bucket for the rest
+MAX_HISTOGRAM_CATEGORIES = 50
+
+# Figure encodings: 'string' is fig.to_json() text, 'object' the same figure as
+# a nested JSON object, 'typed' a nested object with numeric arrays as base64
+# typed arrays ({"dtype", "bdata", "shape"}, plotly.js >= 2.28)
+FIGURE_ENCODINGS = ('string', 'object', 'typed')
+
+# Numeric arrays shorter than this stay as plain JSON lists
+TYPED_ARRAY_MIN_LENGTH = 8
+
+def _typed_array(values):
+    """
+    Encode a numeric array as a plotly.js typed array, using the smallest
+    integer type that holds integer data (plotly.js has no 64-bit integers)
+    """
+    if values.dtype.kind == 'b':
+        values = values.astype(np.uint8)
+    elif values.dtype.kind in 'iu':
+        low, high = (values.min(), values.max()) if values.size else (0, 0)
+        for dtype in (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                values = values.astype(dtype)
+                break
+        else:
+            values = values.astype(np.float64)
+    elif values.dtype != np.float32:
+        values = values.astype(np.float64)
+        # float32 when rounding moves no value by more than a millionth of the
+        # data range, far below what a chart can show
+        as_float32 = values.astype(np.float32)
+        data_range = values.max() - values.min() if values.size else 0.0
+        if np.abs(as_float32 - values).max(initial=0.0) <= 1e-6 * data_range:
+            values = as_float32
+    
+    # plotly.js reads typed arrays as little-endian
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    encoded = {'dtype': values.dtype.str[1:], 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        encoded['shape'] = ','.join(str(size) for size in values.shape)
+    return encoded
+
+def _encode_typed_arrays(value):
+    if isinstance(value, dict):
+        return {key: _encode_typed_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, (int, float, list, tuple)) and not isinstance(item, bool) for item in value):
+            # Numeric lists and rectangular lists of lists (e.g. heatmap z)
+            try:
+                values = np.asarray(value)
+            except ValueError:
+                values = None
+            if values is not None and values.dtype.kind in 'iuf' and values.ndim <= 2:
+                return _encode_typed_arrays(values)
+        return [_encode_typed_arrays(item) for item in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'biuf' and value.size >= TYPED_ARRAY_MIN_LENGTH and np.isfinite(value).all():
+            return _typed_array(value)
+        return value
+    return value
+
+def serialize_figure(fig, encoding='string'):
+    """
+    Serialize a Plotly figure in one of FIGURE_ENCODINGS
+    """
+    if encoding == 'string':
+        return fig.to_json()
+    if encoding not in FIGURE_ENCODINGS:
+        raise ValueError(f"Unknown figure encoding {encoding}; use one of {list(FIGURE_ENCODINGS)}")
+    figure = fig.to_plotly_json()
+    if encoding == 'typed':
+        figure = _encode_typed_arrays(figure)
+    # Round trip through the Plotly encoder for dates, NaN and remaining numpy values
+    return json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))
+
+def create_bar_chart(df, x_column, y_column, title="Bar Chart", encoding='string'):
     """
     Create a bar chart using Plotly
     """
     fig = px.bar(df, x=x_column, y=y_column, title=title)
-    return fig.to_json()
+    return serialize_figure(fig, encoding)
 
-def create_scatter_plot(df, x_column, y_column, color_column=None, title="Scatter Plot"):
+def create_scatter_plot(df, x_column, y_column, color_column=None, title="Scatter Plot", encoding='string'):
     """
     Create a scatter plot using Plotly
     """
     fig = px.scatter(df, x=x_column, y=y_column, color=color_column, title=title)
-    return fig.to_json()
+    return serialize_figure(fig, encoding)
 
-def create_line_chart(df, x_column, y_column, title="Line Chart"):
+def create_line_chart(df, x_column, y_column, title="Line Chart", encoding='string'):
     """
     Create a line chart using Plotly
     """
     fig = px.line(df, x=x_column, y=y_column, title=title)
-    return fig.to_json()
+    return serialize_figure(fig, encoding)
+
+def histogram_counts(values, bins='auto', max_categories=MAX_HISTOGRAM_CATEGORIES):
+    """
+    Bin counts for a histogram whose size does not depend on the number of rows.
+    Numeric and datetime values are binned with numpy (`bins` is a count or a
+    numpy rule such as 'auto'), capped at MAX_HISTOGRAM_BINS bins; datetimes
+    are binned as int64 nanoseconds and their edges returned as timestamps.
+    Other values are counted per category, keeping the max_categories most
+    frequent ones and summing the rest into an "Other" bucket.
+    Returns a dict with 'kind' ('numeric', 'datetime' or 'categorical'),
+    'counts' and either 'edges' or 'labels'.
+    """
+    values = values.dropna()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        kind = 'datetime'
+        tz = values.dt.tz
+        numbers = values.astype('int64').to_numpy(dtype=float)
+    elif pd.api.types.is_numeric_dtype(values):
+        kind = 'numeric'
+        numbers = values.to_numpy(dtype=float)
+    else:
+        counts = values.astype(str).value_counts(sort=False)
+        if len(counts) > max_categories:
+            counts = counts.sort_values(ascending=False, kind='stable')
+            other = counts.iloc[max_categories:]
+            counts = counts.iloc[:max_categories]
+            counts[f'Other ({len(other)} categories)'] = other.sum()
+        return {'kind': 'categorical', 'labels': counts.index.tolist(), 'counts': counts.to_numpy()}
+    
+    edges = np.histogram_bin_edges(numbers, bins=bins)
+    if len(edges) - 1 > MAX_HISTOGRAM_BINS:
+        edges = np.histogram_bin_edges(numbers, bins=MAX_HISTOGRAM_BINS)
+    counts, edges = np.histogram(numbers, bins=edges)
+    if kind == 'datetime':
+        edges = pd.to_datetime(edges.astype('int64'), utc=tz is not None)
+        if tz is not None:
+            edges = edges.tz_convert(tz)
+    return {'kind': kind, 'edges': edges, 'counts': counts}
+
+def create_histogram(df, column, title="Histogram", bins='auto', encoding='string'):
+    """
+    Create a histogram using Plotly. Bin counts are computed here with numpy
+    and drawn as bars, so the figure size depends on the number of bins,
+    not on the number of rows.
+    """
+    histogram = histogram_counts(df[column], bins)
+    if histogram['kind'] == 'categorical':
+        fig = go.Figure(go.Bar(x=histogram['labels'], y=histogram['counts']))
+        fig.update_layout(title=title, xaxis_title=column, yaxis_title='count')
+        return serialize_figure(fig, encoding)
+    
+    edges, counts = histogram['edges'], histogram['counts']
+    if histogram['kind'] == 'datetime':
+        # Date axes take bar widths in milliseconds
+        fig = go.Figure(go.Bar(
+            x=edges[:-1] + (edges[1:] - edges[:-1]) / 2,
+            y=counts,
+            width=(edges[1:] - edges[:-1]).total_seconds() * 1000,
+            customdata=np.column_stack([edges[:-1].astype(str), edges[1:].astype(str)]),
+            hovertemplate='%{customdata[0]} to %{customdata[1]}<br>count: %{y}<extra></extra>'
+        ))
+    else:
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate='%{customdata[0]:.4g} to %{customdata[1]:.4g}<br>count: %{y}<extra></extra>'
+        ))
+    fig.update_layout(title=title, xaxis_title=column, yaxis_title='count', bargap=0)
+    return serialize_figure(fig, encoding)
+
+def correlation_matrix(df, chunk_size=50000):
+    """
+    Pearson correlations of the numeric columns, accumulated over row chunks
+    in float32 so memory stays bounded for wide and long frames. Like
+    DataFrame.corr, each pair uses the rows where both values are present
+    (pairs with fewer than two such rows are NaN); constant columns are
+    dropped. Returns a DataFrame.
+    """
+    numeric_df = df.select_dtypes(include=['number'])
+    stds = numeric_df.std()
+    numeric_df = numeric_df.loc[:, stds > 0]
+    means = numeric_df.mean().to_numpy(dtype=np.float32)
+    stds = stds[numeric_df.columns].to_numpy(dtype=np.float32)
+    
+    # Per pair (i, j), over the rows where both are present: row counts, sums and
+    # sums of squares of column i, and cross products. Values are standardized
+    # with the overall mean and std first, which keeps float32 sums accurate.
+    n_columns = numeric_df.shape[1]
+    counts, sums, squares, products = (np.zeros((n_columns, n_columns), dtype=np.float64) for _ in range(4))
+    for start in range(0, len(numeric_df), chunk_size):
+        chunk = numeric_df.iloc[start:start + chunk_size].to_numpy(dtype=np.float32)
+        present = (~np.isnan(chunk)).astype(np.float32)
+        standardized = np.nan_to_num((chunk - means) / stds, nan=0.0)
+        counts += present.T @ present
+        sums += standardized.T @ present
+        squares += (standardized * standardized).T @ present
+        products += standardized.T @ standardized
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = products - sums * sums.T / counts
+        variance = squares - sums ** 2 / counts
+        correlations = covariance / np.sqrt(variance * variance.T)
+    correlations[(counts < 2) | (variance <= 0) | (variance.T <= 0)] = np.nan
+    correlations = np.clip(correlations, -1.0, 1.0)
+    return pd.DataFrame(correlations, index=numeric_df.columns, columns=numeric_df.columns)
 
-def create_histogram(df, column, title="Histogram"):
+def cluster_order(correlations):
     """
-    Create a histogram using Plotly
+    Column order from average-linkage hierarchical clustering on 1 - |r|,
+    which puts strongly correlated columns next to each other
     """
-    fig = px.histogram(df, x=column, title=title)
-    return fig.to_json()
+    if len(correlations) < 3:
+        return list(correlations.columns)
+    # Pairs without a correlation (too few shared rows) count as uncorrelated
+    distances = 1.0 - np.abs(np.nan_to_num(correlations.to_numpy()))
+    np.fill_diagonal(distances, 0.0)
+    tree = linkage(squareform(distances, checks=False), method='average')
+    return [correlations.columns[i] for i in leaves_list(tree)]
 
-def create_heatmap(df, title="Correlation Heatmap"):
+def select_correlations(df, top_k=None, cluster=True):
     """
-    Create a correlation heatmap using Plotly
+    Correlation matrix for a heatmap: top_k keeps the columns with the
+    strongest correlation to any other column; cluster orders columns by
+    hierarchical clustering
     """
-    # Select only numerical columns
-    numerical_df = df.select_dtypes(include=['number'])
-    correlation_matrix = numerical_df.corr()
+    correlations = correlation_matrix(df)
+    
+    if top_k and len(correlations) > top_k:
+        strength = correlations.abs().fillna(0.0).to_numpy()
+        np.fill_diagonal(strength, 0.0)
+        keep = correlations.columns[np.argsort(-strength.max(axis=1), kind='stable')[:top_k]]
+        correlations = correlations.loc[keep, keep]
+    
+    if cluster:
+        order = cluster_order(correlations)
+        correlations = correlations.loc[order, order]
+    return correlations
+
+def create_heatmap(df, title="Correlation Heatmap", top_k=None, cluster=True, encoding='string'):
+    """
+    Create a correlation heatmap using Plotly.
+    top_k keeps the columns with the strongest correlation to any other
+    column; cluster orders columns by hierarchical clustering.
+    """
+    correlation_matrix_df = select_correlations(df, top_k, cluster)
     
     fig = go.Figure(data=go.Heatmap(
-        z=correlation_matrix.values,
-        x=correlation_matrix.columns,
-        y=correlation_matrix.columns,
+        z=np.round(correlation_matrix_df.values, 3),
+        x=correlation_matrix_df.columns,
+        y=correlation_matrix_df.columns,
+        zmin=-1,
+        zmax=1,
         colorscale='Viridis'
     ))
     fig.update_layout(title=title)
-    return fig.to_json()
+    return serialize_figure(fig, encoding)
 
-def create_box_plot(df, column, title="Box Plot"):
+def box_statistics(values, max_outliers=1000):
     """
-    Create a box plot using Plotly
+    Quartiles, mean, 1.5 IQR whiskers (as Plotly draws them) and outliers of
+    a column. Outliers are capped at max_outliers points that always include
+    the most extreme ones on both sides.
     """
-    fig = px.box(df, y=column, title=title)
-    return fig.to_json()
\ No newline at end of file
+    values = pd.to_numeric(values, errors='coerce').dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        raise ValueError('No numeric values')
+    
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lower_fence, upper_fence = inside.min(), inside.max()
+    outliers = values[(values < lower_fence) | (values > upper_fence)]
+    
+    if len(outliers) > max_outliers:
+        # Keep the most extreme points on both sides and an even sample of the rest
+        outliers = np.sort(outliers)
+        keep = np.unique(np.concatenate([
+            np.arange(min(max_outliers // 4, len(outliers))),
+            np.arange(len(outliers) - min(max_outliers // 4, len(outliers)), len(outliers)),
+            np.linspace(0, len(outliers) - 1, max_outliers - 2 * (max_outliers // 4)).astype(int)
+        ]))
+        outliers = outliers[keep]
+    
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lower_fence': lower_fence,
+        'upper_fence': upper_fence,
+        'mean': values.mean(),
+        'outliers': outliers
+    }
+
+def create_box_plot(df, column, title="Box Plot", max_outliers=1000, encoding='string'):
+    """
+    Create a box plot using Plotly from precomputed quartiles and whiskers
+    (1.5 IQR, as Plotly draws them). Outliers are drawn as a separate marker
+    trace, capped at max_outliers points that always include the extremes.
+    """
+    try:
+        stats = box_statistics(df[column], max_outliers)
+    except ValueError:
+        raise ValueError(f"Column {column} has no numeric values")
+    outliers = stats['outliers']
+    
+    fig = go.Figure(go.Box(
+        x=[column],
+        q1=[stats['q1']],
+        median=[stats['median']],
+        q3=[stats['q3']],
+        lowerfence=[stats['lower_fence']],
+        upperfence=[stats['upper_fence']],
+        mean=[stats['mean']],
+        name=column,
+        boxpoints=False
+    ))
+    if len(outliers):
+        fig.add_trace(go.Scatter(
+            x=[column] * len(outliers),
+            y=outliers,
+            mode='markers',
+            name='outliers',
+            marker=dict(size=4)
+        ))
+    fig.update_layout(title=title, yaxis_title=column, showlegend=False)
+    return serialize_figure(fig, encoding)
@@ -7,8 +7,8 @@ compliant servers to serve the application.
 import os
 import sys
 
-# Add the backend directory to the Python path
-sys.path.insert(0, os.path.dirname(__file__))
+# Add the directory containing the backend package to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend import create_app
 
@@ -4,12 +4,16 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.preprocessing import LabelEncoder
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction import FeatureHasher
 import firebase_admin
 from firebase_admin import credentials, firestore
 import json
 import os
+import re
 from datetime import datetime, timedelta
+from collections import Counter
+import joblib
 from fuzzywuzzy import fuzz, process
 
 # Initialize Firebase Admin SDK
@@ -49,6 +53,37 @@ def fetch_firestore_data(db, collection_names):
             data[collection_name] = pd.DataFrame()
     return data
 
+# Fetch a Firestore collection in fixed-size chunks
+def stream_firestore_data(db, collection_name, chunk_size=1000):
+    """
+    Yield a Firestore collection as DataFrame chunks of at most chunk_size
+    documents, paging with a cursor so only one chunk is held in memory
+    """
+    query = db.collection(collection_name).order_by('__name__').limit(chunk_size)
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page.stream())
+        if not docs:
+            break
+        records = []
+        for doc in docs:
+            doc_data = doc.to_dict()
+            doc_data['id'] = doc.id
+            records.append(doc_data)
+        yield pd.DataFrame(records)
+        if len(docs) < chunk_size:
+            break
+        last_doc = docs[-1]
+
+# Split an in-memory DataFrame into chunks
+def iter_dataframe_chunks(df, chunk_size=1000):
+    """
+    Yield consecutive row chunks of a DataFrame
+    """
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
 # Correlation analysis between different safety datasets
 def perform_correlation_analysis(data_dict):
     """
@@ -119,8 +154,463 @@ def perform_correlation_analysis(data_dict):
     
     return results
 
+# Near-duplicate detection for incident and near-miss reports
+def _find_text_columns(df):
+    """
+    Find free-text columns describing a report
+    """
+    text_columns = [col for col in df.columns if any(key in col.lower() for key in ['description', 'details', 'summary', 'narrative', 'title'])]
+    if not text_columns:
+        excluded = {'id', 'location', 'department', 'duplicate_cluster_id'}
+        text_columns = [col for col in df.select_dtypes(include=['object']).columns
+                        if col.lower() not in excluded and 'date' not in col.lower() and 'time' not in col.lower()]
+    return text_columns
+
+def detect_duplicate_reports(df, date_window_days=3, similarity_threshold=85, ngram_size=3,
+                             min_ngram_overlap=0.5, max_ngram_frequency=0.5):
+    """
+    Assign a duplicate cluster ID to every report. Candidate pairs are generated
+    only inside blocking keys (location + date window) and must share enough
+    character n-grams in an inverted index before they are scored with fuzzy
+    matching, so the number of comparisons grows with block size, not with n^2.
+    Returns a Series of cluster IDs aligned with df.index; the ID of a cluster
+    is the id (or index label) of its first report.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    n = len(df)
+    labels = df['id'].astype(str).to_numpy() if 'id' in df.columns else df.index.astype(str).to_numpy()
+    if n < 2:
+        return pd.Series(labels, index=df.index, name='duplicate_cluster_id')
+    
+    # Normalized report text
+    text_columns = _find_text_columns(df)
+    if not text_columns:
+        return pd.Series(labels, index=df.index, name='duplicate_cluster_id')
+    text = df[text_columns].fillna('').astype(str).agg(' '.join, axis=1)
+    text = text.str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip().to_numpy()
+    
+    # Blocking keys: normalized location and a date bucket of date_window_days
+    if 'location' in df.columns:
+        locations = df['location'].fillna('').astype(str).str.strip().str.lower()
+    else:
+        locations = pd.Series('', index=df.index)
+    location_codes = pd.factorize(locations)[0]
+    
+    date_columns = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    if date_columns:
+        dates = pd.to_datetime(df[date_columns[0]], errors='coerce')
+        days = ((dates - pd.Timestamp('1970-01-01')) / pd.Timedelta(days=1)).to_numpy()
+    else:
+        days = np.full(n, np.nan)
+    has_date = ~np.isnan(days)
+    buckets = np.where(has_date, np.floor(np.nan_to_num(days) / max(date_window_days, 1)), -1).astype(np.int64)
+    
+    # Character n-gram index over all reports. N-grams present in most reports
+    # carry no signal and would only inflate the posting lists.
+    vectorizer = CountVectorizer(analyzer='char_wb', ngram_range=(ngram_size, ngram_size), binary=True,
+                                 max_df=max_ngram_frequency if n > 10 else 1.0, dtype=np.int32)
+    try:
+        ngrams = vectorizer.fit_transform(text).tocoo()
+    except ValueError:
+        # Every report text is empty or only made of common n-grams
+        return pd.Series(labels, index=df.index, name='duplicate_cluster_id')
+    ngram_counts = np.bincount(ngrams.row, minlength=n)
+    
+    # Posting lists keyed by blocking key and n-gram
+    postings = pd.DataFrame({
+        'location': location_codes[ngrams.row].astype(np.int32),
+        'bucket': buckets[ngrams.row],
+        'ngram': ngrams.col.astype(np.int32),
+        'position': ngrams.row.astype(np.int32)
+    })
+    
+    # Candidate pairs share an n-gram inside the same block, or inside the next
+    # date bucket so reports either side of a bucket boundary can still match
+    same_block = postings.merge(postings, on=['location', 'bucket', 'ngram'], suffixes=('_left', '_right'))
+    same_block = same_block.loc[same_block['position_left'] < same_block['position_right'], ['position_left', 'position_right']]
+    dated = postings[postings['bucket'] >= 0]
+    next_block = dated.merge(dated.assign(bucket=dated['bucket'] - 1), on=['location', 'bucket', 'ngram'], suffixes=('_left', '_right'))
+    next_block = pd.DataFrame({
+        'position_left': np.minimum(next_block['position_left'], next_block['position_right']),
+        'position_right': np.maximum(next_block['position_left'], next_block['position_right'])
+    })
+    shared = pd.concat([same_block, next_block]).groupby(['position_left', 'position_right']).size()
+    left = shared.index.get_level_values('position_left').to_numpy()
+    right = shared.index.get_level_values('position_right').to_numpy()
+    shared = shared.to_numpy()
+    
+    # Candidates must share enough n-grams relative to the longer report, so a
+    # short report is not a candidate for every longer one containing it, and
+    # fall inside the actual date window (buckets only approximate it)
+    keep = shared >= min_ngram_overlap * np.maximum(np.maximum(ngram_counts[left], ngram_counts[right]), 1)
+    both_dated = has_date[left] & has_date[right]
+    keep &= ~both_dated | (np.abs(days[left] - days[right]) <= date_window_days)
+    left, right = left[keep], right[keep]
+    
+    # Fuzzy scoring only runs on the candidate pairs. token_sort_ratio compares
+    # the whole texts; token_set_ratio would score a subset of words as 100.
+    pair_rows = []
+    pair_cols = []
+    for i, j in zip(left, right):
+        if fuzz.token_sort_ratio(text[i], text[j]) >= similarity_threshold:
+            pair_rows.append(i)
+            pair_cols.append(j)
+    candidate_pairs = len(left)
+    
+    # Clusters are the connected components of the duplicate pair graph
+    graph = coo_matrix((np.ones(len(pair_rows), dtype=np.int8), (pair_rows, pair_cols)), shape=(n, n))
+    _, components = connected_components(graph, directed=False)
+    first_position = pd.Series(np.arange(n)).groupby(components).transform('min').to_numpy()
+    
+    cluster_ids = pd.Series(labels[first_position], index=df.index, name='duplicate_cluster_id')
+    cluster_ids.attrs['candidate_pairs'] = candidate_pairs
+    cluster_ids.attrs['duplicate_pairs'] = len(pair_rows)
+    return cluster_ids
+
+def deduplicate_reports(df, **kwargs):
+    """
+    Tag reports with duplicate cluster IDs and keep one report per cluster.
+    Returns the deduplicated DataFrame and a summary of what was merged.
+    """
+    if df.empty:
+        return df, {'total_reports': 0, 'unique_reports': 0, 'duplicates_removed': 0}
+    
+    cluster_ids = detect_duplicate_reports(df, **kwargs)
+    tagged = df.assign(duplicate_cluster_id=cluster_ids)
+    deduplicated = tagged.drop_duplicates(subset='duplicate_cluster_id', keep='first')
+    
+    cluster_sizes = cluster_ids.value_counts()
+    stats = {
+        'total_reports': len(df),
+        'unique_reports': len(deduplicated),
+        'duplicates_removed': len(df) - len(deduplicated),
+        'duplicate_clusters': int((cluster_sizes > 1).sum()),
+        'candidate_pairs_scored': cluster_ids.attrs.get('candidate_pairs', 0)
+    }
+    return deduplicated, stats
+
+# Near-miss precursors of incidents
+def _report_times(df):
+    """
+    Parse the first date/time column of a report collection
+    """
+    date_columns = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    if not date_columns:
+        return None
+    return pd.to_datetime(df[date_columns[0]], errors='coerce')
+
+def link_near_miss_precursors(incidents_df, near_miss_df, window_days=30):
+    """
+    Link every incident to the near-misses reported at the same location in the
+    window_days before it. Both collections are sorted by (location, time) and
+    each incident's window is found with binary search, so the cost is
+    O((n + m) log m + links) and no cross join is ever built.
+    Returns one row per (incident, near-miss) link with the lead time in days.
+    """
+    columns = ['incident_id', 'near_miss_id', 'location', 'incident_time', 'near_miss_time', 'lead_time_days']
+    if incidents_df.empty or near_miss_df.empty or 'location' not in incidents_df.columns or 'location' not in near_miss_df.columns:
+        return pd.DataFrame(columns=columns)
+    incident_times = _report_times(incidents_df)
+    near_miss_times = _report_times(near_miss_df)
+    if incident_times is None or near_miss_times is None:
+        return pd.DataFrame(columns=columns)
+    
+    incidents = pd.DataFrame({
+        'id': incidents_df['id'].astype(str).to_numpy() if 'id' in incidents_df.columns else incidents_df.index.astype(str),
+        'location': incidents_df['location'].to_numpy(),
+        'time': incident_times.to_numpy()
+    }).dropna(subset=['location', 'time'])
+    near_misses = pd.DataFrame({
+        'id': near_miss_df['id'].astype(str).to_numpy() if 'id' in near_miss_df.columns else near_miss_df.index.astype(str),
+        'location': near_miss_df['location'].to_numpy(),
+        'time': near_miss_times.to_numpy()
+    }).dropna(subset=['location', 'time'])
+    if incidents.empty or near_misses.empty:
+        return pd.DataFrame(columns=columns)
+    
+    # Composite (location, seconds) sort key shared by both collections
+    location_codes, _ = pd.factorize(pd.concat([incidents['location'], near_misses['location']]).astype(str))
+    origin = min(incidents['time'].min(), near_misses['time'].min())
+    incident_keys = (location_codes[:len(incidents)].astype(np.int64) << 32) + ((incidents['time'] - origin) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    near_miss_keys = (location_codes[len(incidents):].astype(np.int64) << 32) + ((near_misses['time'] - origin) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    
+    order = np.argsort(near_miss_keys, kind='stable')
+    near_miss_keys = near_miss_keys[order]
+    near_misses = near_misses.iloc[order].reset_index(drop=True)
+    
+    # Window [incident - window_days, incident) for every incident
+    window_seconds = int(window_days * 86400)
+    starts = np.searchsorted(near_miss_keys, incident_keys - window_seconds, side='left')
+    ends = np.searchsorted(near_miss_keys, incident_keys, side='left')
+    counts = ends - starts
+    
+    # Expand the windows into link rows without materializing any other pairs
+    incident_positions = np.repeat(np.arange(len(incidents)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    near_miss_positions = np.repeat(starts, counts) + offsets
+    
+    incident_rows = incidents.iloc[incident_positions]
+    near_miss_rows = near_misses.iloc[near_miss_positions]
+    links = pd.DataFrame({
+        'incident_id': incident_rows['id'].to_numpy(),
+        'near_miss_id': near_miss_rows['id'].to_numpy(),
+        'location': incident_rows['location'].to_numpy(),
+        'incident_time': incident_rows['time'].to_numpy(),
+        'near_miss_time': near_miss_rows['time'].to_numpy()
+    })
+    links['lead_time_days'] = (links['incident_time'] - links['near_miss_time']) / pd.Timedelta(days=1)
+    return links
+
+def perform_precursor_analysis(incidents_df, near_miss_df, window_days=30):
+    """
+    Summarize near-miss precursors per location: how many incidents had a
+    precursor, how many precursors each had, and the distribution of lead times
+    from the most recent precursor (found with an as-of merge) to the incident
+    """
+    results = {'window_days': window_days}
+    links = link_near_miss_precursors(incidents_df, near_miss_df, window_days)
+    results['total_links'] = len(links)
+    if links.empty:
+        results['incidents_with_precursors'] = 0
+        return results
+    
+    # Most recent precursor per incident via a backward as-of merge on location
+    incidents = pd.DataFrame({
+        'id': incidents_df['id'].astype(str).to_numpy() if 'id' in incidents_df.columns else incidents_df.index.astype(str),
+        'location': incidents_df['location'].astype(str).to_numpy(),
+        'time': _report_times(incidents_df).to_numpy()
+    }).dropna(subset=['time']).sort_values('time')
+    near_misses = pd.DataFrame({
+        'location': near_miss_df['location'].astype(str).to_numpy(),
+        'near_miss_time': _report_times(near_miss_df).to_numpy()
+    }).dropna(subset=['near_miss_time']).sort_values('near_miss_time')
+    nearest = pd.merge_asof(
+        incidents, near_misses,
+        left_on='time', right_on='near_miss_time', by='location',
+        direction='backward', allow_exact_matches=False,
+        tolerance=pd.Timedelta(days=window_days)
+    ).dropna(subset=['near_miss_time'])
+    nearest['lead_time_days'] = (nearest['time'] - nearest['near_miss_time']) / pd.Timedelta(days=1)
+    
+    results['incidents_with_precursors'] = int(links['incident_id'].nunique())
+    results['share_of_incidents_with_precursors'] = results['incidents_with_precursors'] / len(incidents) if len(incidents) else 0
+    
+    lead_times = nearest.groupby('location')['lead_time_days'].describe(percentiles=[0.25, 0.5, 0.75, 0.9])
+    precursor_counts = links.groupby(['location', 'incident_id']).size().groupby(level='location').mean()
+    results['lead_time_distribution_by_location'] = {
+        str(location): {
+            'incidents_with_precursors': int(row['count']),
+            'mean_days': float(row['mean']),
+            'p25_days': float(row['25%']),
+            'median_days': float(row['50%']),
+            'p75_days': float(row['75%']),
+            'p90_days': float(row['90%']),
+            'min_days': float(row['min']),
+            'max_days': float(row['max']),
+            'mean_precursors_per_incident': float(precursor_counts.get(location, 0))
+        }
+        for location, row in lead_times.iterrows()
+    }
+    return results
+
+# Maintenance windows and overdue equipment intervals joined to incidents
+def _name_tokens(col):
+    """
+    Lower-case words of a column name: 'EndDate' and 'end_date' give ['end', 'date']
+    """
+    return re.findall(r'[a-z0-9]+', re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', str(col)).lower())
+
+def _first_date_column(df, include, exclude=()):
+    """
+    First column with a word starting with one of `include` (and none starting
+    with one of `exclude`) that parses as dates. Matching words rather than
+    substrings keeps 'end' from matching 'spend' or 'vendor', and 'time' from
+    matching 'downtime_hours'; numeric columns are never read as dates.
+    """
+    for col in df.columns:
+        tokens = _name_tokens(col)
+        matches = lambda keys: any(token.startswith(key) for token in tokens for key in keys)
+        if not matches(include) or matches(exclude):
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        parsed = pd.to_datetime(df[col], errors='coerce')
+        if parsed.notna().any():
+            return parsed
+    return None
+
+def _find_join_key(incidents_df, other_df):
+    """
+    Pick the column linking incidents to maintenance/equipment rows: an asset
+    or equipment identifier when both sides have one, else the location
+    """
+    def asset_column(df):
+        columns = [col for col in df.columns if any(key in col.lower() for key in ['asset', 'equipment', 'machine'])]
+        return columns[0] if columns else None
+    
+    incident_asset, other_asset = asset_column(incidents_df), asset_column(other_df)
+    if incident_asset and other_asset:
+        return incident_asset, other_asset
+    if 'location' in incidents_df.columns and 'location' in other_df.columns:
+        return 'location', 'location'
+    return None, None
+
+def _merge_intervals(keys, starts, ends):
+    """
+    Merge overlapping intervals per key into disjoint intervals
+    """
+    frame = pd.DataFrame({'key': keys, 'start': starts, 'end': ends}).dropna()
+    frame = frame[frame['end'] >= frame['start']].sort_values(['key', 'start'])
+    if frame.empty:
+        return frame
+    
+    # A new merged interval starts whenever an interval begins after every
+    # earlier interval of the same key has ended
+    running_end = frame.groupby('key')['end'].cummax()
+    previous_end = running_end.groupby(frame['key']).shift()
+    new_group = previous_end.isna() | (frame['start'] > previous_end)
+    group_ids = new_group.cumsum()
+    return frame.groupby(group_ids).agg(key=('key', 'first'), start=('start', 'min'), end=('end', 'max')).reset_index(drop=True)
+
+def join_incidents_to_intervals(incident_keys, incident_times, interval_keys, interval_starts, interval_ends):
+    """
+    Find, for every incident, the merged interval on the same key that contains
+    it, using an IntervalIndex over disjoint (key, time) ranges. Returns the
+    merged intervals and the matched interval position per incident (-1 if none).
+    """
+    merged = _merge_intervals(interval_keys, interval_starts, interval_ends)
+    if merged.empty:
+        return merged, np.full(len(incident_keys), -1)
+    
+    # Encode (key, seconds) on one axis so a single index covers every key
+    key_codes, key_values = pd.factorize(merged['key'])
+    origin = min(merged['start'].min(), incident_times.min())
+    
+    def encode(codes, times):
+        return (codes.astype(np.int64) << 32) + ((times - origin) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    
+    interval_index = pd.IntervalIndex.from_arrays(
+        encode(key_codes, merged['start']), encode(key_codes, merged['end']), closed='both'
+    )
+    incident_codes = pd.Index(key_values).get_indexer(incident_keys)
+    matched = np.full(len(incident_keys), -1)
+    known = (incident_codes >= 0) & incident_times.notna().to_numpy()
+    if known.any():
+        matched[known] = interval_index.get_indexer(encode(incident_codes[known], incident_times[known]))
+    return merged, matched
+
+def _interval_incident_rates(incidents_df, incident_key, intervals, matched):
+    """
+    Compare incident rates inside and outside the merged intervals, per key-day
+    of exposure over the analysis period
+    """
+    incident_times = _report_times(incidents_df)
+    keys = incidents_df[incident_key].astype(str)
+    covered = keys.isin(set(intervals['key'])) & incident_times.notna()
+    
+    period_start = min(intervals['start'].min(), incident_times.min())
+    period_end = max(intervals['end'].max(), incident_times.max())
+    period_days = max((period_end - period_start) / pd.Timedelta(days=1), 1)
+    
+    window_days = ((intervals['end'] - intervals['start']) / pd.Timedelta(days=1)).groupby(intervals['key']).sum()
+    inside = pd.Series(matched >= 0, index=incidents_df.index)
+    inside_counts = inside[covered].groupby(keys[covered]).sum()
+    total_counts = covered[covered].groupby(keys[covered]).size()
+    
+    inside_days = float(window_days.sum())
+    outside_days = float(period_days * len(window_days) - inside_days)
+    incidents_inside = int(inside[covered].sum())
+    incidents_outside = int(covered.sum()) - incidents_inside
+    inside_rate = incidents_inside / inside_days if inside_days > 0 else None
+    outside_rate = incidents_outside / outside_days if outside_days > 0 else None
+    
+    by_key = {}
+    for key, days in window_days.items():
+        key_inside = int(inside_counts.get(key, 0))
+        key_outside = int(total_counts.get(key, 0)) - key_inside
+        key_outside_days = period_days - days
+        by_key[str(key)] = {
+            'window_days': float(days),
+            'incidents_inside': key_inside,
+            'incidents_outside': key_outside,
+            'inside_rate_per_day': key_inside / days if days > 0 else None,
+            'outside_rate_per_day': key_outside / key_outside_days if key_outside_days > 0 else None
+        }
+    
+    return {
+        'merged_intervals': len(intervals),
+        'incidents_considered': int(covered.sum()),
+        'incidents_without_matching_key': int(len(incidents_df) - covered.sum()),
+        'incidents_inside': incidents_inside,
+        'incidents_outside': incidents_outside,
+        'window_key_days': inside_days,
+        'outside_key_days': outside_days,
+        'inside_rate_per_day': inside_rate,
+        'outside_rate_per_day': outside_rate,
+        'rate_ratio': inside_rate / outside_rate if inside_rate is not None and outside_rate else None,
+        'by_key': by_key
+    }
+
+def perform_maintenance_interval_analysis(incidents_df, maintenance_df, equipment_df=None):
+    """
+    Match incidents to open maintenance windows and overdue equipment intervals
+    on the same asset (or location) and compare incident rates inside and
+    outside those intervals
+    """
+    results = {}
+    incident_times = _report_times(incidents_df) if not incidents_df.empty else None
+    if incident_times is None or incident_times.notna().sum() == 0:
+        return results
+    
+    # Maintenance windows: start/end of each maintenance job
+    if maintenance_df is not None and not maintenance_df.empty:
+        incident_key, maintenance_key = _find_join_key(incidents_df, maintenance_df)
+        starts = _first_date_column(maintenance_df, ['start'])
+        if starts is None:
+            starts = _first_date_column(maintenance_df, ['date', 'time'], exclude=['end', 'complet', 'finish', 'due'])
+        ends = _first_date_column(maintenance_df, ['end', 'complet', 'finish'])
+        if incident_key and starts is not None:
+            if ends is None:
+                # Without an end date treat the maintenance day itself as the window
+                ends = starts + pd.Timedelta(days=1)
+            # Jobs without an end date are still open
+            ends = ends.fillna(max(incident_times.max(), starts.max()))
+            intervals, matched = join_incidents_to_intervals(
+                incidents_df[incident_key].astype(str), incident_times,
+                maintenance_df[maintenance_key].astype(str), starts, ends
+            )
+            if not intervals.empty:
+                results['maintenance_windows'] = {'join_key': incident_key, 'intervals': len(maintenance_df)}
+                results['maintenance_windows'].update(_interval_incident_rates(incidents_df, incident_key, intervals, matched))
+    
+    # Overdue equipment: from the due date until the service actually happened
+    if equipment_df is not None and not equipment_df.empty:
+        incident_key, equipment_key = _find_join_key(incidents_df, equipment_df)
+        due = _first_date_column(equipment_df, ['due', 'next'])
+        serviced = _first_date_column(equipment_df, ['service', 'inspect', 'complet', 'last'], exclude=['due', 'next'])
+        if incident_key and due is not None:
+            if serviced is None:
+                serviced = pd.Series(pd.NaT, index=equipment_df.index)
+            # Items serviced before their due date were never overdue; items not
+            # serviced yet are overdue until the end of the data
+            serviced = serviced.where(serviced.isna() | (serviced >= due), due)
+            serviced = serviced.fillna(max(incident_times.max(), due.max()))
+            overdue = serviced > due
+            intervals, matched = join_incidents_to_intervals(
+                incidents_df[incident_key].astype(str), incident_times,
+                equipment_df.loc[overdue, equipment_key].astype(str), due[overdue], serviced[overdue]
+            )
+            if not intervals.empty:
+                results['overdue_equipment'] = {'join_key': incident_key, 'intervals': int(overdue.sum())}
+                results['overdue_equipment'].update(_interval_incident_rates(incidents_df, incident_key, intervals, matched))
+    
+    return results
+
 # Root cause analysis using near-miss reports and incident data
-def perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audit_df=None, violations_df=None):
+def perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audit_df=None, violations_df=None, precursor_window_days=30, equipment_df=None):
     """
     Perform root cause analysis by tracing incident precursors
     """
@@ -176,12 +666,17 @@ def perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audi
                     ratio = near_miss_count / incident_count
                     location_ratios[location] = ratio
             results['near_miss_to_incident_ratios'] = location_ratios
+            
+            # Link incidents to the near-misses that preceded them at the same location
+            results['near_miss_precursors'] = perform_precursor_analysis(incidents_df, near_miss_df, precursor_window_days)
         
-        # If we have maintenance data, check for maintenance-related incidents
-        if not maintenance_df.empty:
-            # This would require linking maintenance records to incidents
-            # For now, we'll just note that both datasets exist
-            results['maintenance_data_available'] = True
+        # If we have maintenance or equipment data, check for incidents during
+        # maintenance windows and overdue equipment intervals
+        if not maintenance_df.empty or (equipment_df is not None and not equipment_df.empty):
+            results['maintenance_data_available'] = not maintenance_df.empty
+            interval_results = perform_maintenance_interval_analysis(incidents_df, maintenance_df, equipment_df)
+            if interval_results:
+                results['maintenance_interval_analysis'] = interval_results
         
         # If we have audit data, check for compliance-related incidents
         if audit_df is not None and not audit_df.empty:
@@ -201,6 +696,330 @@ def perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audi
     
     return results
 
+# Status categories shared by the compliance scorecard and the forecasting risk factors
+COMPLIANCE_CATEGORIES = ['compliant', 'non_compliant', 'unknown']
+TRAINING_CATEGORIES = ['completed', 'incomplete', 'unknown']
+
+def _classify_status(value, kind):
+    """
+    Classify a single distinct status string into a scorecard category
+    """
+    text = str(value).strip().lower()
+    if kind == 'compliance':
+        if 'non' in text or 'fail' in text:
+            return 'non_compliant'
+        if 'complian' in text or 'pass' in text:
+            return 'compliant'
+        return 'unknown'
+    if 'incomplet' in text or 'not ' in text or 'progress' in text:
+        return 'incomplete'
+    if 'complet' in text:
+        return 'completed'
+    return 'unknown'
+
+def encode_status_column(series, kind):
+    """
+    Encode a raw status column as a categorical column of scorecard categories.
+    Each distinct status string is classified once and the codes are mapped back
+    to the rows with a single vectorized take.
+    """
+    categories = COMPLIANCE_CATEGORIES if kind == 'compliance' else TRAINING_CATEGORIES
+    raw_codes, uniques = pd.factorize(series)
+
+    # One lookup slot per distinct value plus a trailing slot for missing values (-1)
+    lookup = np.array([categories.index(_classify_status(value, kind)) for value in uniques] + [categories.index('unknown')], dtype=np.int8)
+    codes = lookup[raw_codes]
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def _find_status_column(df, kind):
+    """
+    Find the status column used for compliance or training completion
+    """
+    if kind == 'compliance':
+        columns = [col for col in df.columns if 'compliance' in col.lower() or 'status' in col.lower()]
+    else:
+        columns = [col for col in df.columns if 'complet' in col.lower() or 'status' in col.lower()]
+    return columns[0] if columns else None
+
+def _find_month_column(df):
+    """
+    Derive a month period column from the first parseable date column
+    """
+    date_columns = [col for col in df.columns if 'date' in col.lower() and 'due' not in col.lower() and 'expir' not in col.lower()]
+    for date_col in date_columns:
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        if dates.notna().any():
+            return dates.dt.to_period('M').astype(str).where(dates.notna())
+    return None
+
+def compute_status_rates(df, kind, positive_category):
+    """
+    Compute global, per-department, per-location and per-month rates of a status
+    category in a single pass. Rows are aggregated once at the finest grain
+    (department x location x month) and each dimension is rolled up from that cube.
+    """
+    status_col = _find_status_column(df, kind)
+    if status_col is None:
+        return None
+
+    codes = encode_status_column(df[status_col], kind)
+    frame = pd.DataFrame({
+        'positive': np.asarray(codes == positive_category, dtype=np.int64),
+        'total': np.ones(len(df), dtype=np.int64)
+    }, index=df.index)
+
+    dimensions = []
+    for dimension, column in [('department', 'department'), ('location', 'location')]:
+        if column in df.columns:
+            frame[dimension] = df[column].fillna('Unknown').astype(str).astype('category')
+            dimensions.append(dimension)
+    months = _find_month_column(df)
+    if months is not None:
+        frame['month'] = months.fillna('Unknown').astype('category')
+        dimensions.append('month')
+
+    rates = {
+        'status_column': status_col,
+        'total': int(frame['total'].sum()),
+        'positive': int(frame['positive'].sum())
+    }
+    rates['rate'] = (rates['positive'] / rates['total']) * 100 if rates['total'] > 0 else 0
+
+    if dimensions:
+        cube = frame.groupby(dimensions, observed=True)[['positive', 'total']].sum()
+        for dimension in dimensions:
+            rolled = cube.groupby(level=dimension, observed=True).sum()
+            rolled['rate'] = rolled['positive'] / rolled['total'] * 100
+            rates[f'by_{dimension}'] = {
+                str(key): {'total': int(row.total), 'positive': int(row.positive), 'rate': float(row.rate)}
+                for key, row in rolled.iterrows()
+            }
+
+    return rates
+
+# Incident hotspot clustering. The fitted model is kept next to this module
+# (not in the working directory) unless HOTSPOT_MODEL_PATH names another file.
+HOTSPOT_MODEL_PATH = os.getenv('HOTSPOT_MODEL_PATH',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hotspot_model.joblib'))
+HOTSPOT_HASH_FEATURES = 16
+SEVERITY_LEVELS = {
+    'low': 1, 'minor': 1,
+    'medium': 2, 'moderate': 2,
+    'high': 3, 'major': 3, 'serious': 3,
+    'critical': 4, 'severe': 4, 'fatal': 4
+}
+
+def _report_hours(df):
+    """
+    Hour of day for each report, from a time column or the report date
+    """
+    time_columns = [col for col in df.columns if 'time' in col.lower()]
+    date_columns = [col for col in df.columns if 'date' in col.lower()]
+    for col in time_columns + date_columns:
+        values = df[col]
+        parsed = pd.to_datetime(values, errors='coerce')
+        if parsed.isna().all() and values.dtype == object:
+            # Plain "HH:MM" strings
+            parsed = pd.to_datetime(values, format='%H:%M', errors='coerce')
+        if parsed.notna().any():
+            return parsed.dt.hour
+    return pd.Series(np.nan, index=df.index)
+
+def _report_severity(df):
+    """
+    Ordinal severity (1-4) for each report, NaN when unknown
+    """
+    severity_columns = [col for col in df.columns if 'severity' in col.lower() or 'level' in col.lower()]
+    if not severity_columns:
+        return pd.Series(np.nan, index=df.index)
+    codes, uniques = pd.factorize(df[severity_columns[0]])
+    lookup = np.array([
+        next((level for key, level in SEVERITY_LEVELS.items() if key in str(value).lower()), np.nan)
+        for value in uniques
+    ] + [np.nan], dtype=np.float64)
+    return pd.Series(lookup[codes], index=df.index)
+
+def _report_categories(df):
+    category_columns = [col for col in df.columns if 'category' in col.lower() or col.lower() == 'type']
+    if category_columns:
+        return df[category_columns[0]]
+    return pd.Series('unknown', index=df.index)
+
+def encode_hotspot_features(df, n_hash_features=HOTSPOT_HASH_FEATURES):
+    """
+    Encode reports into a fixed-width feature matrix. Location, department and
+    category are hashed so every chunk maps to the same columns without a
+    shared vocabulary; time of day is encoded cyclically and severity on a 0-1 scale.
+    """
+    hasher = FeatureHasher(n_features=n_hash_features, input_type='string', alternate_sign=False)
+    blocks = []
+    for name, values in [('location', df['location'] if 'location' in df.columns else None),
+                         ('department', df['department'] if 'department' in df.columns else None),
+                         ('category', _report_categories(df))]:
+        if values is None:
+            values = pd.Series('unknown', index=df.index)
+        tokens = values.fillna('unknown').astype(str).str.strip().str.lower()
+        blocks.append(hasher.transform([[f"{name}={token}"] for token in tokens]).toarray())
+    
+    hours = _report_hours(df).to_numpy(dtype=np.float64)
+    angle = 2 * np.pi * np.nan_to_num(hours, nan=12.0) / 24
+    known_hour = ~np.isnan(hours)
+    blocks.append(np.column_stack([np.sin(angle) * known_hour, np.cos(angle) * known_hour]))
+    
+    severity = _report_severity(df).to_numpy(dtype=np.float64)
+    blocks.append(np.nan_to_num(severity / 4, nan=0.5).reshape(-1, 1))
+    
+    return np.hstack(blocks)
+
+def load_hotspot_model(model_path=HOTSPOT_MODEL_PATH):
+    """
+    Load persisted hotspot centroids, or None if no model has been fitted yet
+    """
+    if not os.path.exists(model_path):
+        return None
+    return joblib.load(model_path)
+
+def save_hotspot_model(state, model_path=HOTSPOT_MODEL_PATH):
+    """
+    Persist the fitted hotspot model and its encoding parameters
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump(state, tmp_path)
+    os.replace(tmp_path, model_path)
+
+def firestore_chunk_source(db, collection_names, chunk_size=1000):
+    """
+    Build a chunk source over Firestore collections for perform_hotspot_analysis
+    """
+    def source():
+        for collection_name in collection_names:
+            for chunk in stream_firestore_data(db, collection_name, chunk_size):
+                yield collection_name, chunk
+    return source
+
+def dataframe_chunk_source(data, collection_names, chunk_size=1000):
+    """
+    Build a chunk source over already loaded DataFrames for perform_hotspot_analysis
+    """
+    def source():
+        for collection_name in collection_names:
+            df = data.get(collection_name, pd.DataFrame())
+            for chunk in iter_dataframe_chunks(df, chunk_size):
+                yield collection_name, chunk
+    return source
+
+def perform_hotspot_analysis(chunk_source, model_path=HOTSPOT_MODEL_PATH, n_clusters=8, refit=False, update=False):
+    """
+    Cluster incidents and near-misses into hotspots with mini-batch k-means.
+    chunk_source is a callable returning an iterator of (collection_name, DataFrame)
+    chunks, so memory is bounded by the chunk size rather than the history.
+    When persisted centroids exist they are reused and reports are only assigned
+    (optionally nudging the centroids with partial_fit when update=True);
+    otherwise, or with refit=True, the model is fitted from scratch first.
+    """
+    results = {}
+    state = None if refit else load_hotspot_model(model_path)
+    
+    if state is None:
+        model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=1024)
+        pending = []
+        pending_rows = 0
+        samples_seen = 0
+        for _, chunk in chunk_source():
+            if chunk.empty:
+                continue
+            pending.append(encode_hotspot_features(chunk))
+            pending_rows += len(chunk)
+            # partial_fit needs at least n_clusters samples in its first batch
+            if pending_rows >= n_clusters:
+                model.partial_fit(np.vstack(pending))
+                samples_seen += pending_rows
+                pending, pending_rows = [], 0
+        if pending and samples_seen > 0:
+            model.partial_fit(np.vstack(pending))
+            samples_seen += pending_rows
+        if samples_seen == 0:
+            results['error'] = 'Not enough reports to fit hotspot clusters'
+            return results
+        
+        state = {
+            'model': model,
+            'n_hash_features': HOTSPOT_HASH_FEATURES,
+            'samples_seen': samples_seen,
+            'fitted_at': datetime.now().isoformat()
+        }
+        save_hotspot_model(state, model_path)
+        results['model_refit'] = True
+    else:
+        results['model_refit'] = False
+    
+    model = state['model']
+    cluster_count = model.n_clusters
+    sizes = np.zeros(cluster_count, dtype=np.int64)
+    severity_sums = np.zeros(cluster_count)
+    severity_counts = np.zeros(cluster_count, dtype=np.int64)
+    hour_histograms = np.zeros((cluster_count, 24), dtype=np.int64)
+    sources = [Counter() for _ in range(cluster_count)]
+    locations = [Counter() for _ in range(cluster_count)]
+    departments = [Counter() for _ in range(cluster_count)]
+    categories = [Counter() for _ in range(cluster_count)]
+    
+    # Assignment pass: summaries are accumulated per chunk so nothing is retained
+    for collection_name, chunk in chunk_source():
+        if chunk.empty:
+            continue
+        features = encode_hotspot_features(chunk, state['n_hash_features'])
+        if update and not results['model_refit']:
+            model.partial_fit(features)
+            state['samples_seen'] += len(chunk)
+        labels = model.predict(features)
+        
+        sizes += np.bincount(labels, minlength=cluster_count)
+        severity = _report_severity(chunk).to_numpy()
+        known = ~np.isnan(severity)
+        severity_sums += np.bincount(labels[known], weights=severity[known], minlength=cluster_count)
+        severity_counts += np.bincount(labels[known], minlength=cluster_count)
+        hours = _report_hours(chunk).to_numpy(dtype=np.float64)
+        known = ~np.isnan(hours)
+        np.add.at(hour_histograms, (labels[known], hours[known].astype(int)), 1)
+        
+        for label, count in zip(*np.unique(labels, return_counts=True)):
+            sources[label][collection_name] += int(count)
+        for counters, column in [(locations, 'location'), (departments, 'department')]:
+            if column in chunk.columns:
+                grouped = pd.Series(chunk[column].to_numpy()).groupby(labels).value_counts()
+                for (label, value), count in grouped.items():
+                    counters[label][str(value)] += int(count)
+        grouped = pd.Series(_report_categories(chunk).to_numpy()).groupby(labels).value_counts()
+        for (label, value), count in grouped.items():
+            categories[label][str(value)] += int(count)
+    
+    if update and not results['model_refit']:
+        save_hotspot_model(state, model_path)
+    
+    clusters = []
+    for label in np.argsort(-sizes):
+        if sizes[label] == 0:
+            continue
+        clusters.append({
+            'cluster_id': int(label),
+            'size': int(sizes[label]),
+            'by_collection': dict(sources[label]),
+            'top_locations': dict(locations[label].most_common(5)),
+            'top_departments': dict(departments[label].most_common(5)),
+            'top_categories': dict(categories[label].most_common(5)),
+            'mean_severity': float(severity_sums[label] / severity_counts[label]) if severity_counts[label] else None,
+            'peak_hour': int(hour_histograms[label].argmax()) if hour_histograms[label].any() else None
+        })
+    
+    results['n_clusters'] = cluster_count
+    results['samples_assigned'] = int(sizes.sum())
+    results['model_samples_seen'] = int(state['samples_seen'])
+    results['model_fitted_at'] = state['fitted_at']
+    results['clusters'] = clusters
+    return results
+
 # Predictive forecasting for risk levels
 def perform_predictive_forecasting(incidents_df, inspections_df, trainings_df, maintenance_df=None, environmental_df=None):
     """
@@ -308,22 +1127,20 @@ def perform_predictive_forecasting(incidents_df, inspections_df, trainings_df, m
         risk_factors['inspection_count'] = len(inspections_df)
         
         # Compliance-based risk factors
-        compliance_columns = [col for col in inspections_df.columns if 'compliance' in col.lower() or 'status' in col.lower()]
-        if compliance_columns:
-            compliance_col = compliance_columns[0]
-            non_compliant_count = len(inspections_df[inspections_df[compliance_col].str.lower().str.contains('non', na=False)])
-            risk_factors['non_compliant_inspections'] = non_compliant_count
+        compliance_col = _find_status_column(inspections_df, 'compliance')
+        if compliance_col:
+            compliance_codes = encode_status_column(inspections_df[compliance_col], 'compliance')
+            risk_factors['non_compliant_inspections'] = int((compliance_codes == 'non_compliant').sum())
     
     # Training-based risk factors
     if not trainings_df.empty:
         risk_factors['training_count'] = len(trainings_df)
         
         # Training completion risk factors
-        completion_columns = [col for col in trainings_df.columns if 'complet' in col.lower() or 'status' in col.lower()]
-        if completion_columns:
-            completion_col = completion_columns[0]
-            incomplete_count = len(trainings_df[~trainings_df[completion_col].str.lower().str.contains('complet', na=False)])
-            risk_factors['incomplete_trainings'] = incomplete_count
+        completion_col = _find_status_column(trainings_df, 'training')
+        if completion_col:
+            completion_codes = encode_status_column(trainings_df[completion_col], 'training')
+            risk_factors['incomplete_trainings'] = int((completion_codes != 'completed').sum())
     
     # Calculate composite risk score
     composite_risk_score = 0
@@ -366,7 +1183,8 @@ def perform_predictive_forecasting(incidents_df, inspections_df, trainings_df, m
 # Compliance scorecard generation
 def generate_compliance_scorecard(inspections_df, trainings_df):
     """
-    Generate compliance scorecard based on inspection results and training completion
+    Generate compliance scorecard based on inspection results and training completion,
+    broken down per department, location and month
     """
     results = {}
     
@@ -375,43 +1193,31 @@ def generate_compliance_scorecard(inspections_df, trainings_df):
         total_inspections = len(inspections_df)
         results['total_inspections'] = total_inspections
         
-        # Look for compliance status columns
-        compliance_columns = [col for col in inspections_df.columns if 'compliance' in col.lower() or 'status' in col.lower()]
-        
-        if compliance_columns:
-            # Assume first compliance column contains pass/fail or compliant/non-compliant values
-            compliance_col = compliance_columns[0]
-            if compliance_col in inspections_df.columns:
-                # Count compliant vs non-compliant
-                compliant_count = len(inspections_df[inspections_df[compliance_col].str.lower().str.contains('complian', na=False)])
-                non_compliant_count = total_inspections - compliant_count
-                
-                compliance_rate = (compliant_count / total_inspections) * 100 if total_inspections > 0 else 0
-                
-                results['compliance_rate'] = compliance_rate
-                results['compliant_inspections'] = compliant_count
-                results['non_compliant_inspections'] = non_compliant_count
+        compliance = compute_status_rates(inspections_df, 'compliance', 'compliant')
+        if compliance is not None:
+            results['compliance_rate'] = compliance['rate']
+            results['compliant_inspections'] = compliance['positive']
+            results['non_compliant_inspections'] = total_inspections - compliance['positive']
+            
+            # Per-dimension breakdowns from the same aggregation pass
+            for dimension in ['department', 'location', 'month']:
+                if f'by_{dimension}' in compliance:
+                    results[f'compliance_by_{dimension}'] = compliance[f'by_{dimension}']
     
     if not trainings_df.empty:
         # Calculate training completion rates
         total_trainings = len(trainings_df)
         results['total_trainings'] = total_trainings
         
-        # Look for completion status columns
-        completion_columns = [col for col in trainings_df.columns if 'complet' in col.lower() or 'status' in col.lower()]
-        
-        if completion_columns:
-            completion_col = completion_columns[0]
-            if completion_col in trainings_df.columns:
-                # Count completed vs incomplete
-                completed_count = len(trainings_df[trainings_df[completion_col].str.lower().str.contains('complet', na=False)])
-                incomplete_count = total_trainings - completed_count
-                
-                completion_rate = (completed_count / total_trainings) * 100 if total_trainings > 0 else 0
-                
-                results['training_completion_rate'] = completion_rate
-                results['completed_trainings'] = completed_count
-                results['incomplete_trainings'] = incomplete_count
+        completion = compute_status_rates(trainings_df, 'training', 'completed')
+        if completion is not None:
+            results['training_completion_rate'] = completion['rate']
+            results['completed_trainings'] = completion['positive']
+            results['incomplete_trainings'] = total_trainings - completion['positive']
+            
+            for dimension in ['department', 'location', 'month']:
+                if f'by_{dimension}' in completion:
+                    results[f'training_completion_by_{dimension}'] = completion[f'by_{dimension}']
     
     return results
 
@@ -455,10 +1261,180 @@ def perform_benchmarking_analysis(incidents_df, inspections_df, trainings_df):
     
     return results
 
+# Analytics results storage
+RESULTS_JSON_PATH = 'safety_analytics_results.json'
+RESULTS_INDEX_PATH = 'safety_analytics_results.index.json'
+RESULTS_ARRAYS_PATH = 'safety_analytics_results.npz'
+
+# Numeric dicts/lists smaller than this stay inline in the JSON index
+MIN_BLOCK_SIZE = 8
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+def _to_serializable(value):
+    """
+    Convert analytics results into plain JSON types (string keys, Python scalars)
+    """
+    if isinstance(value, dict):
+        return {str(key): _to_serializable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_serializable(item) for item in value]
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def _pack_numeric_blocks(value, path, arrays):
+    """
+    Replace numeric blocks (matrices, series, numeric lists) with references to
+    typed arrays collected in `arrays`. Everything else is returned as plain JSON.
+    """
+    if isinstance(value, dict) and len(value) >= 1:
+        items = list(value.values())
+        
+        # Dict of equally keyed numeric dicts, e.g. DataFrame.to_dict() of a correlation matrix
+        if all(isinstance(item, dict) and item for item in items):
+            row_keys = list(items[0].keys())
+            if all(list(item.keys()) == row_keys and all(_is_number(v) for v in item.values()) for item in items) \
+                    and len(row_keys) * len(items) >= MIN_BLOCK_SIZE:
+                # Rows whose values are all integers (counts next to rates) are
+                # recorded so they load back as ints from a float matrix
+                integer_rows = [key for key in row_keys if all(isinstance(item[key], (int, np.integer)) for item in items)]
+                is_integer = len(integer_rows) == len(row_keys)
+                matrix = np.array([[item[key] for item in items] for key in row_keys],
+                                  dtype=np.int64 if is_integer else np.float64)
+                arrays[path] = matrix
+                block = {
+                    '__block__': 'matrix',
+                    'key': path,
+                    'index': [str(key) for key in row_keys],
+                    'columns': [str(key) for key in value.keys()]
+                }
+                if integer_rows and not is_integer:
+                    block['integer_rows'] = [str(key) for key in integer_rows]
+                return block
+        
+        # Flat numeric dict, e.g. counts per location or a monthly trend
+        if len(items) >= MIN_BLOCK_SIZE and all(_is_number(item) for item in items):
+            is_integer = all(isinstance(item, (int, np.integer)) for item in items)
+            arrays[path] = np.array(items, dtype=np.int64 if is_integer else np.float64)
+            return {'__block__': 'series', 'key': path, 'index': [str(key) for key in value.keys()]}
+        
+        return {str(key): _pack_numeric_blocks(item, f"{path}/{key}", arrays) for key, item in value.items()}
+    
+    if isinstance(value, (list, tuple)):
+        if len(value) >= MIN_BLOCK_SIZE and all(_is_number(item) for item in value):
+            is_integer = all(isinstance(item, (int, np.integer)) for item in value)
+            arrays[path] = np.array(value, dtype=np.int64 if is_integer else np.float64)
+            return {'__block__': 'array', 'key': path}
+        return [_pack_numeric_blocks(item, f"{path}/{i}", arrays) for i, item in enumerate(value)]
+    
+    return _to_serializable(value)
+
+def _unpack_numeric_blocks(value, arrays, as_frames=False):
+    """
+    Resolve block references in an index skeleton against the array container.
+    Arrays are only read from disk when a reference to them is reached.
+    """
+    if isinstance(value, dict):
+        block_type = value.get('__block__')
+        if block_type == 'matrix':
+            matrix = pd.DataFrame(arrays[value['key']], index=value['index'], columns=value['columns'])
+            if as_frames:
+                return matrix
+            integer_rows = set(value.get('integer_rows', ()))
+            return {column: {key: int(item) if key in integer_rows else item for key, item in row.items()}
+                    for column, row in matrix.to_dict().items()}
+        if block_type == 'series':
+            series = pd.Series(arrays[value['key']], index=value['index'])
+            return series if as_frames else series.to_dict()
+        if block_type == 'array':
+            array = arrays[value['key']]
+            return array if as_frames else array.tolist()
+        return {key: _unpack_numeric_blocks(item, arrays, as_frames) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack_numeric_blocks(item, arrays, as_frames) for item in value]
+    return value
+
+def save_analytics_results(results, output_format='binary', json_path=RESULTS_JSON_PATH,
+                           index_path=RESULTS_INDEX_PATH, arrays_path=RESULTS_ARRAYS_PATH):
+    """
+    Save analytics results as a compact binary container (typed arrays in a
+    compressed .npz plus a small JSON index), as JSON, or both
+    """
+    if output_format not in ('binary', 'json', 'both'):
+        raise ValueError("output_format must be 'binary', 'json' or 'both'")
+    
+    saved = []
+    if output_format in ('binary', 'both'):
+        arrays = {}
+        sections = {section: _pack_numeric_blocks(value, section, arrays) for section, value in results.items()}
+        
+        # Write to temporary files first so readers never see a half-written pair
+        tmp_arrays_path = f"{arrays_path}.tmp.npz"
+        np.savez_compressed(tmp_arrays_path, **arrays)
+        index = {
+            'format': 'safety-analytics-binary',
+            'version': 1,
+            'arrays_file': os.path.basename(arrays_path),
+            'sections': sections
+        }
+        tmp_index_path = f"{index_path}.tmp"
+        with open(tmp_index_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_arrays_path, arrays_path)
+        os.replace(tmp_index_path, index_path)
+        saved.extend([index_path, arrays_path])
+    
+    if output_format in ('json', 'both'):
+        with open(json_path, 'w') as f:
+            json.dump(_to_serializable(results), f, indent=2)
+        saved.append(json_path)
+    
+    return saved
+
+def load_analytics_section(section, index_path=RESULTS_INDEX_PATH, as_frames=False):
+    """
+    Load a single section of the binary analytics results. Only the arrays the
+    section references are decompressed. With as_frames=True numeric blocks are
+    returned as DataFrames/Series/arrays instead of dicts and lists.
+    """
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    if section not in index['sections']:
+        raise KeyError(f"Section {section} not found in analytics results")
+    
+    arrays_path = os.path.join(os.path.dirname(index_path), index['arrays_file'])
+    with np.load(arrays_path, allow_pickle=False) as arrays:
+        return _unpack_numeric_blocks(index['sections'][section], arrays, as_frames)
+
+def load_analytics_results(index_path=RESULTS_INDEX_PATH, sections=None, as_frames=False):
+    """
+    Load all (or the selected) sections of the binary analytics results
+    """
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    
+    selected = sections if sections is not None else list(index['sections'].keys())
+    arrays_path = os.path.join(os.path.dirname(index_path), index['arrays_file'])
+    with np.load(arrays_path, allow_pickle=False) as arrays:
+        return {
+            section: _unpack_numeric_blocks(index['sections'][section], arrays, as_frames)
+            for section in selected if section in index['sections']
+        }
+
 # Main function to run all analytics
-def run_safety_analytics():
+def run_safety_analytics(output_format='binary', hotspot_model_path=HOTSPOT_MODEL_PATH):
     """
-    Main function to run all safety analytics and save results
+    Main function to run all safety analytics and save results.
+    output_format is 'binary' (default), 'json' or 'both'; hotspot_model_path
+    is where the fitted hotspot clusters are kept between runs.
     """
     # Initialize Firestore
     db = initialize_firebase()
@@ -480,6 +1456,14 @@ def run_safety_analytics():
     all_collections = core_collections + extended_collections
     data = fetch_firestore_data(db, all_collections)
     
+    # Collapse duplicate reports logged from several site workbooks so every
+    # downstream count works on one report per duplicate cluster
+    print("Detecting duplicate reports...")
+    deduplication_results = {}
+    for collection_name in ['Incidents', 'Near-Miss Reports']:
+        if collection_name in data and not data[collection_name].empty:
+            data[collection_name], deduplication_results[collection_name] = deduplicate_reports(data[collection_name])
+    
     # Separate core and extended data
     core_data = {k: v for k, v in data.items() if k in core_collections}
     extended_data = {k: v for k, v in data.items() if k in extended_collections}
@@ -488,7 +1472,8 @@ def run_safety_analytics():
     analytics_results = {
         'timestamp': datetime.now().isoformat(),
         'core_collections_analyzed': list(core_data.keys()),
-        'extended_collections_analyzed': list(extended_data.keys())
+        'extended_collections_analyzed': list(extended_data.keys()),
+        'deduplication': deduplication_results
     }
     
     # Run correlation analysis
@@ -503,7 +1488,8 @@ def run_safety_analytics():
     maintenance_df = data.get('Maintenance Records', pd.DataFrame())
     audit_df = data.get('Audit Results', pd.DataFrame())
     violations_df = data.get('Safety Violations', pd.DataFrame())
-    root_cause_results = perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audit_df, violations_df)
+    equipment_df = data.get('Equipment Logs', pd.DataFrame())
+    root_cause_results = perform_root_cause_analysis(incidents_df, near_miss_df, maintenance_df, audit_df, violations_df, equipment_df=equipment_df)
     analytics_results['root_cause_analysis'] = root_cause_results
     
     # Run predictive forecasting
@@ -525,28 +1511,39 @@ def run_safety_analytics():
     benchmarking_results = perform_benchmarking_analysis(incidents_df, inspections_df, trainings_df)
     analytics_results['benchmarking_analysis'] = benchmarking_results
     
+    # Cluster incidents and near-misses into hotspots
+    print("Running hotspot analysis...")
+    hotspot_source = dataframe_chunk_source(data, ['Incidents', 'Near-Miss Reports'])
+    analytics_results['hotspot_analysis'] = perform_hotspot_analysis(hotspot_source, hotspot_model_path)
+    
     # Save results to file
     try:
-        with open('safety_analytics_results.json', 'w') as f:
-            json.dump(analytics_results, f, indent=2, default=str)
-        print("Analytics results saved to safety_analytics_results.json")
+        saved_paths = save_analytics_results(analytics_results, output_format)
+        print(f"Analytics results saved to {', '.join(saved_paths)}")
     except Exception as e:
         print(f"Error saving analytics results: {str(e)}")
     
     return analytics_results
 
 # Function to get analytics results for the dashboard
-def get_analytics_for_dashboard():
+def get_analytics_for_dashboard(section=None):
     """
-    Get analytics results in a format suitable for the React dashboard
+    Get analytics results in a format suitable for the React dashboard.
+    Reads the binary results when available (optionally a single section),
+    falling back to the JSON export.
     """
     try:
-        with open('safety_analytics_results.json', 'r') as f:
-            return json.load(f)
+        if os.path.exists(RESULTS_INDEX_PATH):
+            if section is not None:
+                return load_analytics_section(section)
+            return load_analytics_results()
+        with open(RESULTS_JSON_PATH, 'r') as f:
+            results = json.load(f)
+        return results.get(section, {}) if section is not None else results
     except FileNotFoundError:
         # If file doesn't exist, run analytics first
         results = run_safety_analytics()
-        return results
+        return _to_serializable(results.get(section, {}) if section is not None else results)
     except Exception as e:
         print(f"Error loading analytics results: {str(e)}")
         return {}